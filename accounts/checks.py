@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+CACHED_AUTH_MIDDLEWARE = "accounts.middleware.CachedAuthenticationMiddleware"
+CACHED_SESSION_ENGINES = ("django.contrib.sessions.backends.cache", "django.contrib.sessions.backends.cached_db")
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Cached users and sessions are invalidated in one cache, which every process must share."""
+
+    users_cached = CACHED_AUTH_MIDDLEWARE in settings.MIDDLEWARE
+    sessions_cached = settings.SESSION_ENGINE in CACHED_SESSION_ENGINES
+    if (users_cached or sessions_cached) and isinstance(caches["default"], LocMemCache):
+        return [
+            Warning(
+                "Users or sessions are cached in a per-process LocMemCache.",
+                hint=(
+                    "Logouts and password changes only reach the process that handled them. "
+                    "Use a cache shared by all processes, such as DJANGO_CACHE_DIR."
+                ),
+                id="accounts.W001",
+            )
+        ]
+    return []
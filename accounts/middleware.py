@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+USER_CACHE_KEY = "accounts:user:{user_id}:{session_hash}"
+
+
+def get_cached_field_names():
+    # everything but the password hash, which is read from the database if ever needed
+    return [field.attname for field in get_user_model()._meta.concrete_fields if field.attname != "password"]
+
+
+def invalidate_cached_user(user_id, *session_hashes):
+    cache.delete_many([USER_CACHE_KEY.format(user_id=user_id, session_hash=hash) for hash in session_hashes if hash])
+
+
+def get_cached_user(request):
+    """
+    ``django.contrib.auth.get_user`` served from the cache, under the user id and the auth
+    hash of the session. A session still carrying the hash of an old password never finds
+    the user cached under the new one. Only the values of the user's fields are cached,
+    without the password hash, and the user is rebuilt from them with the password deferred.
+    """
+
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    user_id = request.session.get(auth.SESSION_KEY)
+    if not session_hash or user_id is None:
+        return auth.get_user(request)
+
+    key = USER_CACHE_KEY.format(user_id=user_id, session_hash=session_hash)
+    field_names = get_cached_field_names()
+    cached = cache.get(key)
+    if cached is not None:
+        db, values = cached
+        return get_user_model().from_db(db, field_names, values)
+
+    # verifies the session against the current password, and flushes it on a mismatch
+    user = auth.get_user(request)
+    if user.is_authenticated and request.session.get(auth.HASH_SESSION_KEY) == session_hash:
+        values = tuple(getattr(user, name) for name in field_names)
+        cache.set(key, (user._state.db, values), getattr(settings, "ACCOUNTS_USER_CACHE_TIMEOUT", 300))
+    return user
+
+
+def get_user(request):
+    if not hasattr(request, "_cached_user"):
+        request._cached_user = get_cached_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    ``AuthenticationMiddleware`` reading the user of every request from the cache.
+    Saving, deleting or logging out a user drops the cached copies, so the cache has to be
+    shared by all the processes, see ``accounts.checks``.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,33 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .middleware import invalidate_cached_user
+from .models import Account
+
+
+@receiver(pre_save, sender=Account)
+def account_saving(sender, instance, update_fields=None, **kwargs):
+    # sessions still carry the auth hash of the previous password
+    instance._previous_session_hash = None
+    if instance._state.adding or (update_fields is not None and "password" not in update_fields):
+        return
+    password = Account.objects.filter(pk=instance.pk).values_list("password", flat=True).first()
+    if password is not None and password != instance.password:
+        instance._previous_session_hash = Account(password=password).get_session_auth_hash()
+
+
+@receiver(post_save, sender=Account)
+def account_saved(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk, instance.get_session_auth_hash(), instance._previous_session_hash)
+
+
+@receiver(post_delete, sender=Account)
+def account_deleted(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk, instance.get_session_auth_hash())
+
+
+@receiver(user_logged_out)
+def account_logged_out(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate_cached_user(user.pk, user.get_session_auth_hash())
@@ -1,3 +1,90 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .checks import check_shared_cache
+from .middleware import USER_CACHE_KEY
+from .models import Account
+
+CACHED_AUTHENTICATION = override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    MIDDLEWARE=[
+        "accounts.middleware.CachedAuthenticationMiddleware"
+        if middleware == "django.contrib.auth.middleware.AuthenticationMiddleware"
+        else middleware
+        for middleware in settings.MIDDLEWARE
+    ],
+)
+
+
+@CACHED_AUTHENTICATION
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = Account.objects.create_user(username="student", email="student@example.com", password="secret")
+        self.client.login(username="student", password="secret")
+        self.url = reverse("quiz:progress")
+        self.key = USER_CACHE_KEY.format(user_id=self.user.pk, session_hash=self.user.get_session_auth_hash())
+
+    def test_user_read_from_the_cache(self):
+        self.client.get(self.url)
+        self.assertIsNotNone(cache.get(self.key))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        tables = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("django_session", tables)
+        self.assertNotIn("accounts_account", tables)
+
+        user = response.wsgi_request.user
+        self.assertEqual((user.pk, user.username, user.email), (self.user.pk, "student", "student@example.com"))
+        self.assertEqual(user.get_deferred_fields(), {"password"})
+        self.assertEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
+
+    def test_password_hash_not_cached(self):
+        self.client.get(self.url)
+        self.assertNotIn(self.user.password, repr(cache.get(self.key)))
+
+    def test_password_change_logs_out(self):
+        self.client.get(self.url)
+        user = Account.objects.get(pk=self.user.pk)
+        user.set_password("changed")
+        user.save()
+        self.assertIsNone(cache.get(self.key))
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_deactivation_logs_out(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_logout(self):
+        self.client.get(self.url)
+        self.client.logout()
+        self.assertIsNone(cache.get(self.key))
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_local_memory_cache_warning(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ["accounts.W001"])
+
+
+class PurgeSessionsTests(TestCase):
+    def test_purge(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(session_key=f"expired{number:025d}", session_data="", expire_date=now - timedelta(days=1))
+            for number in range(5)
+        )
+        Session.objects.create(session_key="live" + "0" * 28, session_data="", expire_date=now + timedelta(days=1))
+        call_command("purge_sessions", batch_size=2, stdout=StringIO())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live" + "0" * 28])
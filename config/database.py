@@ -0,0 +1,110 @@
+"""
+Primary/replica routing.
+
+The aliases listed in ``DATABASE_REPLICAS`` serve the reads of the quiz catalogue
+during requests, and everything else, writes included, goes to ``default``. A client
+whose request wrote anything is pinned to ``default`` for ``DATABASE_REPLICA_PIN_SECONDS``,
+through a cookie, so they read their own writes while the replicas catch up.
+
+Pages answered with ``304 Not Modified`` read from the primary with ``using()``: their
+validators are stamped when the primary commits, and a lagging replica rendered under
+them would stay cached until the next change.
+"""
+
+import contextvars
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+
+PIN_COOKIE = "db_pin_until"
+
+# models whose reads may be served by a replica
+REPLICA_MODELS = {"quiz.category", "quiz.quiz", "quiz.question", "quiz.answer"}
+
+
+class RoutingState:
+    """Routing decisions of the current request: whether it may read replicas, and whether it wrote."""
+
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# unset outside requests, where every query goes to the primary
+routing_state = contextvars.ContextVar("routing_state", default=None)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if state is None or state.pinned or not replicas or model._meta.label_lower not in REPLICA_MODELS:
+            return "default"
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            # read the rest of the request, and the next ones, from the primary
+            state.wrote = state.pinned = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {"default", *getattr(settings, "DATABASE_REPLICAS", [])}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema with the data they copy from the primary
+        return db == "default"
+
+
+class ReplicaPinningMiddleware:
+    """Set up the routing state of every request, and pin clients that wrote to the primary."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        # the state is shared with the threads of sync_to_async, which copy the context
+        state, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        try:
+            pinned = float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        state = RoutingState(pinned)
+        return state, routing_state.set(state)
+
+    def finish(self, state, response):
+        if state.wrote:
+            seconds = getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+            response.set_cookie(
+                PIN_COOKIE, f"{time.time() + seconds:.3f}", max_age=seconds, httponly=True, samesite="Lax"
+            )
+        return response
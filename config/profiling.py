@@ -0,0 +1,270 @@
+"""
+Lightweight request profiling that is cheap enough to leave on in production.
+
+``RequestProfilingMiddleware`` measures the SQL query count and time, the template
+render time and the total time of a sample of the requests. It logs slow requests and
+feeds rolling per-URL-name histograms that staff can read from ``request_stats``.
+The measures are added to the response as a ``Server-Timing`` header only with
+``DEBUG`` on or for staff users.
+
+Templates are timed by the ``ProfilingDjangoTemplates`` backend, so the time counts
+whether a view renders a ``TemplateResponse`` or calls ``render()``.
+"""
+
+import bisect
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import JsonResponse
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in milliseconds of the histogram buckets, the last one is open ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+
+
+class RequestTimings:
+    __slots__ = ("queries", "db_ms", "template_ms")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper counting and timing every query."""
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_ms += (time.perf_counter() - started) * 1000
+
+
+# timings of the request being profiled, if it is sampled
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+class ProfiledTemplate:
+    """Template of ``ProfilingDjangoTemplates``, adding its render time to the profiled request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timings = current_timings.get()
+        if timings is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings.template_ms += (time.perf_counter() - started) * 1000
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """``DjangoTemplates`` backend whose top-level renders are timed; included templates are part of them."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name))
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms", "queries")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.queries = 0
+
+    def add(self, duration_ms, queries):
+        self.counts[bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.queries += queries
+
+    def merge(self, other):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.queries += other.queries
+
+    def percentile(self, percent):
+        """Upper bound of the bucket holding the given percentile."""
+
+        threshold = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= threshold:
+                return bound if bound != float("inf") else self.max_ms
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": round(self.max_ms, 3),
+            "mean_queries": round(self.queries / self.count, 2) if self.count else 0,
+        }
+
+
+class RollingHistograms:
+    """
+    Per-URL-name histograms over the last ``PROFILING_WINDOWS`` windows of
+    ``PROFILING_WINDOW_SECONDS`` seconds, so old traffic ages out.
+    """
+
+    def __init__(self):
+        self._windows = []  # (window start, {url name: Histogram}), oldest first
+        self._lock = threading.Lock()
+
+    def add(self, url_name, duration_ms, queries):
+        window_seconds = getattr(settings, "PROFILING_WINDOW_SECONDS", 300)
+        window = int(time.time() // window_seconds * window_seconds)
+        with self._lock:
+            if not self._windows or self._windows[-1][0] != window:
+                self._windows.append((window, {}))
+                del self._windows[:-getattr(settings, "PROFILING_WINDOWS", 12)]
+            histograms = self._windows[-1][1]
+            histogram = histograms.get(url_name)
+            if histogram is None:
+                histogram = histograms[url_name] = Histogram()
+            histogram.add(duration_ms, queries)
+
+    def snapshot(self):
+        merged = {}
+        with self._lock:
+            for _, histograms in self._windows:
+                for url_name, histogram in histograms.items():
+                    merged.setdefault(url_name, Histogram()).merge(histogram)
+        return {url_name: histogram.as_dict() for url_name, histogram in sorted(merged.items())}
+
+
+request_histograms = RollingHistograms()
+
+
+class RequestProfilingMiddleware:
+    # async capable, so that async views keep running on the event loop under ASGI
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= getattr(settings, "PROFILING_SAMPLE_RATE", 0.01):
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with self.wrap_connections(timings):
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings, started, self.shows_timings(request))
+
+    async def __acall__(self, request):
+        if random.random() >= getattr(settings, "PROFILING_SAMPLE_RATE", 0.01):
+            return await self.get_response(request)
+
+        timings = RequestTimings()
+        # the threads of sync_to_async copy the context, and with it the timings
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        # connections are thread-local, and the async ORM queries from the request's sync thread
+        wrappers = await sync_to_async(self.wrap_connections)(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+            current_timings.reset(token)
+        # the user may not be loaded yet
+        shows_timings = await sync_to_async(self.shows_timings)(request)
+        return self.finish(request, response, timings, started, shows_timings)
+
+    def shows_timings(self, request):
+        """Whether the client may see the timings: with ``DEBUG`` on, or for staff."""
+
+        if settings.DEBUG:
+            return True
+        user = getattr(request, "user", None)
+        return user is not None and user.is_staff
+
+    def wrap_connections(self, timings):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timings))
+        return stack
+
+    def finish(self, request, response, timings, started, shows_timings):
+        total_ms = (time.perf_counter() - started) * 1000
+
+        if shows_timings:
+            response["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={timings.db_ms:.1f};desc="{timings.queries} queries"',
+                    f"tpl;dur={timings.template_ms:.1f}",
+                    f"total;dur={total_ms:.1f}",
+                ]
+            )
+
+        match = request.resolver_match
+        url_name = match.view_name if match else "<unresolved>"
+        request_histograms.add(url_name, total_ms, timings.queries)
+        if total_ms >= getattr(settings, "PROFILING_SLOW_REQUEST_MS", 500):
+            logger.warning(
+                "Slow request %s %s (%s): %.1fms total, %.1fms in %d queries, %.1fms rendering templates",
+                request.method,
+                request.path,
+                url_name,
+                total_ms,
+                timings.db_ms,
+                timings.queries,
+                timings.template_ms,
+            )
+        return response
+
+
+@staff_member_required
+def request_stats(request):
+    """Expose the rolling request histograms of this process to staff as JSON."""
+
+    return JsonResponse(
+        {
+            "sample_rate": getattr(settings, "PROFILING_SAMPLE_RATE", 0.01),
+            "window_seconds": getattr(settings, "PROFILING_WINDOW_SECONDS", 300),
+            "windows": getattr(settings, "PROFILING_WINDOWS", 12),
+            "views": request_histograms.snapshot(),
+        }
+    )
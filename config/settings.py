@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,12 +45,13 @@ INSTALLED_APPS = [
     # third-party packages
     "crispy_forms",
     "crispy_bootstrap5",
-    "debug_toolbar",
     "django_filters",
     "django_extensions",
 ]
 
 MIDDLEWARE = [
+    "config.profiling.RequestProfilingMiddleware",
+    "config.database.ReplicaPinningMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -57,14 +59,20 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",  # debug-toolbar
 ]
 
+# debug-toolbar is for local development only, it cannot run under real load, in tests or in benchmarks
+ENABLE_DEBUG_TOOLBAR = DEBUG and not {"test", "benchmark", "benchmark_concurrency"} & set(sys.argv)
+if ENABLE_DEBUG_TOOLBAR:
+    INSTALLED_APPS += ["debug_toolbar"]
+    MIDDLEWARE += ["debug_toolbar.middleware.DebugToolbarMiddleware"]
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates, timing renders for config.profiling
+        "BACKEND": "config.profiling.ProfilingDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -84,13 +92,62 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# WAL lets reads run alongside the writer, "timeout" is the busy timeout in seconds
+SQLITE_OPTIONS = {
+    "timeout": 20,
+    "pragmas": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size": -20000,  # KiB
+        "mmap_size": 128 * 1024 * 1024,
+    },
+}
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "config.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": SQLITE_OPTIONS,
+        # persistent connections, except under ASGI where every request runs in a new thread
+        "CONN_MAX_AGE": int(
+            os.environ.get("DJANGO_CONN_MAX_AGE", 0 if os.environ.get("QUIZ_ASYNC_VIEWS", "") == "1" else 60)
+        ),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# read replicas of the quiz catalogue, as comma-separated SQLite files refreshed by sync_replicas
+DATABASE_REPLICAS = []
+for index, name in enumerate(filter(None, os.environ.get("DJANGO_DB_REPLICAS", "").split(",")), start=1):
+    DATABASES[f"replica{index}"] = {**DATABASES["default"], "NAME": name, "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(f"replica{index}")
+
+DATABASE_ROUTERS = ["config.database.PrimaryReplicaRouter"]
+# how long a client that wrote reads everything from the primary
+DATABASE_REPLICA_PIN_SECONDS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Set DJANGO_CACHE_DIR to share the cache between processes through the filesystem.
+
+if os.environ.get("DJANGO_CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["DJANGO_CACHE_DIR"],
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -139,6 +196,16 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # custom user model configuration
 AUTH_USER_MODEL = "accounts.Account"
 
+# with a cache shared by all processes (DJANGO_CACHE_DIR), read the sessions from the cache,
+# writing them through to the database, and the user of every request; both are invalidated
+# in the cache, so a per-process cache would miss the logouts of the other processes
+if os.environ.get("DJANGO_CACHE_DIR"):
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+    MIDDLEWARE[MIDDLEWARE.index("django.contrib.auth.middleware.AuthenticationMiddleware")] = (
+        "accounts.middleware.CachedAuthenticationMiddleware"
+    )
+ACCOUNTS_USER_CACHE_TIMEOUT = 60 * 5  # seconds
+
 # django flash messages configuration
 from django.contrib.messages import constants as messages
 
@@ -164,5 +231,53 @@ LOGIN_URL = "accounts:login"
 LOGIN_REDIRECT_URL = "quiz:quiz_list"
 LOGOUT_REDIRECT_URL = "quiz:quiz_list"
 
+# request profiling (config.profiling)
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0.01))  # share of the requests measured
+PROFILING_SLOW_REQUEST_MS = 500  # log requests slower than this
+PROFILING_WINDOW_SECONDS = 300
+PROFILING_WINDOWS = 12  # windows kept in the rolling histograms
+
 # print SQL queries in shell_plus
-SHELL_PLUS_PRINT_SQL = True
\ No newline at end of file
+SHELL_PLUS_PRINT_SQL = True
+
+# quiz popularity write-behind buffer
+QUIZ_POPULARITY_FLUSH_INTERVAL = 10  # seconds
+QUIZ_POPULARITY_FLUSH_THRESHOLD = 500  # pending increments
+# flush from a thread of every process too, not only after requests; opt in for long-running servers
+QUIZ_POPULARITY_FLUSH_TIMER = os.environ.get("QUIZ_POPULARITY_FLUSH_TIMER", "") == "1"
+
+# route the async quiz views, for deployments served by config.asgi
+QUIZ_ASYNC_VIEWS = os.environ.get("QUIZ_ASYNC_VIEWS", "") == "1"
+
+# queue submissions for the grade_submissions worker instead of grading them in the request
+QUIZ_GRADING_QUEUE = False
+
+# quiz list pagination: "offset" (page numbers) or "cursor" (keyset)
+QUIZ_LIST_PAGINATION = "offset"
+# serve a cached, possibly stale row count on numbered pages
+QUIZ_LIST_ESTIMATE_COUNT = False
+QUIZ_LIST_COUNT_CACHE_TIMEOUT = 60  # seconds
+
+# cached question and answer snapshots, invalidated by content version
+QUIZ_QUESTION_BANK_CACHE_TIMEOUT = 60 * 60 * 24  # seconds
+QUIZ_QUESTION_BANK_LOCAL_CACHE_SIZE = 128  # banks kept per process
+
+# question draws: larger banks only read the drawn questions of an attempt
+QUIZ_SAMPLING_FULL_BANK_SIZE = 200  # questions
+# keep the mix of question types of the bank in every draw
+QUIZ_STRATIFIED_SAMPLING = False
+
+# category list with its counters, whose attempt counts may lag by this much
+QUIZ_CATEGORY_LIST_CACHE_TIMEOUT = 60  # seconds
+
+# seconds shared caches may serve anonymous catalogue pages before revalidating their ETag
+QUIZ_PUBLIC_CACHE_MAX_AGE = 0
+
+# leaderboards: entries shown, and how long a top slice may stay cached between results
+QUIZ_LEADERBOARD_SIZE = 20
+QUIZ_LEADERBOARD_CACHE_TIMEOUT = 60 * 5  # seconds
+
+# JSON API: quizzes per list page, and how long encoded quiz details stay cached
+QUIZ_API_PAGE_SIZE = 50
+QUIZ_API_CACHE_TIMEOUT = 60 * 60  # seconds
+QUIZ_API_TOKEN_MAX_AGE = 60 * 60 * 24 * 30  # seconds a bearer token stays valid
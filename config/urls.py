@@ -3,11 +3,16 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from .profiling import request_stats
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("quiz.urls", namespace="quiz")),
     path("accounts/", include("accounts.urls", namespace="accounts")),
-    path("__debug__/", include("debug_toolbar.urls")),
+    path("__stats__/", request_stats, name="request_stats"),
 ]
 
+if settings.ENABLE_DEBUG_TOOLBAR:
+    urlpatterns += [path("__debug__/", include("debug_toolbar.urls"))]
+
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
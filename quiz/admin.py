@@ -1,9 +1,39 @@
-from django.contrib import admin
+import io
 
-from .models import Category, Quiz, Question, Answer, Result
+from django.contrib import admin, messages
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 
+from .bank_io import QuestionBankImporter, export_lines, export_records, read_records
+from .forms import QuestionBankImportForm, ResultExportForm
+from .analytics import with_metrics
+from .models import (
+    Answer,
+    AnswerStats,
+    Attempt,
+    Category,
+    GradingJob,
+    Question,
+    QuestionStats,
+    Quiz,
+    Result,
+    UserCategorySummary,
+    UserQuizSummary,
+    UserScore,
+)
+from .result_export import (
+    encode_chunks,
+    export_lines as export_result_lines,
+    export_records as export_result_records,
+)
 
-admin.site.register(Category)
+
+@admin.register(Category)
+class CategoryModelAdmin(admin.ModelAdmin):
+    list_display = ["name", "quiz_count", "question_count", "attempt_count"]
 
 
 @admin.register(Quiz)
@@ -21,6 +51,68 @@ class QuizModelAdmin(admin.ModelAdmin):
     list_filter = ["difficulty_level"]
     search_fields = ["name"]
     ordering = ["id"]
+    actions = ["export_questions_jsonl", "export_questions_csv"]
+
+    def get_urls(self):
+        urls = [
+            path(
+                "import-questions/",
+                self.admin_site.admin_view(self.import_questions_view),
+                name="quiz_quiz_import_questions",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_questions_view(self, request):
+        """Import a JSON Lines or CSV question bank upload."""
+
+        if not self.has_add_permission(request):
+            return redirect("admin:quiz_quiz_changelist")
+
+        form = QuestionBankImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            lines = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+            importer = QuestionBankImporter()
+            stats = importer.run(read_records(lines, form.cleaned_data["format"]))
+            self.message_user(
+                request,
+                f"Imported {stats['quizzes']} quizzes, {stats['questions']} questions and "
+                f"{stats['answers']} answers ({stats['skipped']} existing questions skipped).",
+                messages.SUCCESS,
+            )
+            for number, error in importer.errors[:20]:
+                self.message_user(
+                    request,
+                    f"Line {number}: {'; '.join(getattr(error, 'messages', [str(error)]))}",
+                    messages.WARNING,
+                )
+            for warning in importer.warnings[:20]:
+                self.message_user(request, warning, messages.WARNING)
+            return redirect("admin:quiz_quiz_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "form": form,
+            "title": "Import questions",
+        }
+        return TemplateResponse(request, "admin/quiz/quiz/import_questions.html", context)
+
+    def export_questions(self, queryset, format, content_type):
+        response = StreamingHttpResponse(
+            export_lines(export_records(queryset), format), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="questions.{format}"'
+        return response
+
+    @admin.action(description="Export questions of selected quizzes as JSON Lines")
+    def export_questions_jsonl(self, request, queryset):
+        return self.export_questions(queryset, "jsonl", "application/jsonl")
+
+    @admin.action(description="Export questions of selected quizzes as CSV")
+    def export_questions_csv(self, request, queryset):
+        return self.export_questions(queryset, "csv", "text/csv")
 
 
 class AnswerInline(admin.TabularInline):
@@ -42,3 +134,131 @@ class AnswerModelAdmin(admin.ModelAdmin):
 @admin.register(Result)
 class ResultModelAdmin(admin.ModelAdmin):
     list_display = ["quiz", "user", "score", "submitted_date"]
+    list_select_related = ["quiz", "user"]
+    raw_id_fields = ["attempt"]
+
+    def get_urls(self):
+        urls = [
+            path(
+                "export/",
+                self.admin_site.admin_view(self.export_view),
+                name="quiz_result_export",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def export_view(self, request):
+        """Stream the results matching the GET filters, or show the filter form."""
+
+        if not self.has_view_permission(request):
+            return redirect("admin:index")
+
+        form = ResultExportForm(request.GET or None)
+        if form.is_valid():
+            format = form.cleaned_data["format"]
+            compress = form.cleaned_data["compress"]
+            lines = export_result_lines(export_result_records(form.filter_results()), format)
+            filename = f"results.{format}"
+            if compress:
+                response = StreamingHttpResponse(encode_chunks(lines, compress=True), content_type="application/gzip")
+                filename += ".gz"
+            else:
+                content_type = "text/csv" if format == "csv" else "application/jsonl"
+                response = StreamingHttpResponse(encode_chunks(lines), content_type=content_type)
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "form": form,
+            "title": "Export results",
+        }
+        return TemplateResponse(request, "admin/quiz/result/export.html", context)
+
+
+@admin.register(Attempt)
+class AttemptModelAdmin(admin.ModelAdmin):
+    list_display = ["id", "quiz", "user", "started_at", "submitted_at"]
+    list_select_related = ["quiz", "user"]
+
+
+@admin.register(UserQuizSummary)
+class UserQuizSummaryModelAdmin(admin.ModelAdmin):
+    list_display = ["quiz", "user", "best_score", "last_score", "attempt_count", "last_attempt_at", "passed"]
+    list_select_related = ["quiz", "user"]
+
+
+@admin.register(UserCategorySummary)
+class UserCategorySummaryModelAdmin(admin.ModelAdmin):
+    list_display = ["category", "user", "quizzes_taken", "quizzes_passed", "attempt_count", "last_attempt_at"]
+    list_select_related = ["category", "user"]
+
+
+@admin.register(GradingJob)
+class GradingJobModelAdmin(admin.ModelAdmin):
+    list_display = ["attempt", "status", "tries", "worker", "created_at", "finished_at", "score_percentage"]
+    list_filter = ["status"]
+    list_select_related = ["attempt__quiz", "attempt__user"]
+    raw_id_fields = ["attempt", "result"]
+
+
+class ReadOnlyModelAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(QuestionStats)
+class QuestionStatsModelAdmin(ReadOnlyModelAdmin):
+    """
+    Item analytics report. Sort by difficulty to find questions that are too easy or too hard,
+    and by discrimination to find broken ones, which score near zero or negative.
+    """
+
+    list_display = ["question", "quiz", "times_shown", "times_correct", "difficulty", "discrimination"]
+    list_select_related = ["question__quiz"]
+    list_filter = ["question__quiz__category", "question__question_type"]
+    search_fields = ["question__text", "question__quiz__name"]
+
+    def get_queryset(self, request):
+        # least discriminating questions first
+        return with_metrics(super().get_queryset(request)).order_by(F("discrimination").asc(nulls_last=True))
+
+    @admin.display(ordering="question__quiz")
+    def quiz(self, obj):
+        return obj.question.quiz
+
+    @admin.display(ordering="difficulty")
+    def difficulty(self, obj):
+        return None if obj.difficulty is None else round(obj.difficulty, 3)
+
+    @admin.display(ordering="discrimination")
+    def discrimination(self, obj):
+        return None if obj.discrimination is None else round(obj.discrimination, 3)
+
+
+@admin.register(AnswerStats)
+class AnswerStatsModelAdmin(ReadOnlyModelAdmin):
+    list_display = ["answer", "question", "is_correct", "times_selected"]
+    list_select_related = ["answer__question"]
+    search_fields = ["answer__text", "answer__question__text"]
+    ordering = ["-times_selected"]
+
+    @admin.display(ordering="answer__question")
+    def question(self, obj):
+        return obj.answer.question
+
+    @admin.display(boolean=True, ordering="answer__is_correct")
+    def is_correct(self, obj):
+        return obj.answer.is_correct
+
+
+@admin.register(UserScore)
+class UserScoreModelAdmin(ReadOnlyModelAdmin):
+    list_display = ["user", "total_score", "quizzes_taken", "quizzes_passed"]
+    list_select_related = ["user"]
+    search_fields = ["user__username"]
+    ordering = ["-total_score"]
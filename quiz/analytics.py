@@ -0,0 +1,95 @@
+"""
+Item analytics: how hard every question is and how well it tells strong and weak
+quiz takers apart.
+
+Each result records a ``QuestionResponse`` per question and adds to the running
+sums of ``QuestionStats`` and ``AnswerStats``. Difficulty and point-biserial
+discrimination are derived from those sums when the stats are read, so reports
+never go back to the responses.
+"""
+
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import Cast, NullIf, Sqrt
+
+from .grading import grade_answers
+from .models import AnswerStats, QuestionResponse, QuestionStats
+from .question_bank import get_question_bank
+
+
+def record_responses(result, answers, bank=None):
+    """
+    Record the responses of a new result and fold them into the question and answer stats.
+    Runs a fixed number of queries whatever the number of questions; call it in the
+    transaction that saves the result. Pass the attempt's ``bank`` to skip the whole one.
+    """
+
+    if bank is None:
+        bank = get_question_bank(result.quiz_id)
+    questions_by_id = bank.questions_by_id
+    responses = []
+    for question_id, selected_answers_ids, is_correct in grade_answers(bank.answer_key, answers):
+        question = questions_by_id.get(question_id)
+        if question is None:
+            # deleted since the attempt started
+            continue
+        answer_ids = {answer.id for answer in question.answers}
+        selected_answers_ids = sorted(set(selected_answers_ids) & answer_ids)
+        responses.append(
+            QuestionResponse(
+                result=result,
+                question_id=question_id,
+                selected_answers_ids=selected_answers_ids,
+                is_correct=is_correct,
+            )
+        )
+    if not responses:
+        return []
+
+    QuestionResponse.objects.bulk_create(responses)
+    # rounded half up like SQL's ROUND, which recompute_item_stats uses
+    score = int(result.score + 0.5)
+    QuestionStats.objects.bulk_create(
+        [QuestionStats(question_id=response.question_id) for response in responses], ignore_conflicts=True
+    )
+    # every response adds the same score, so one UPDATE covers the correct ones and one the others
+    for is_correct in (True, False):
+        question_ids = [response.question_id for response in responses if response.is_correct == is_correct]
+        if not question_ids:
+            continue
+        increments = {
+            "times_shown": F("times_shown") + 1,
+            "score_sum": F("score_sum") + score,
+            "score_square_sum": F("score_square_sum") + score * score,
+        }
+        if is_correct:
+            increments["times_correct"] = F("times_correct") + 1
+            increments["correct_score_sum"] = F("correct_score_sum") + score
+        QuestionStats.objects.filter(question_id__in=question_ids).update(**increments)
+
+    selected_answers_ids = [answer_id for response in responses for answer_id in response.selected_answers_ids]
+    if selected_answers_ids:
+        AnswerStats.objects.bulk_create(
+            [AnswerStats(answer_id=answer_id) for answer_id in selected_answers_ids], ignore_conflicts=True
+        )
+        AnswerStats.objects.filter(answer_id__in=selected_answers_ids).update(times_selected=F("times_selected") + 1)
+    return responses
+
+
+def with_metrics(queryset):
+    """
+    Annotate question stats with ``difficulty``, the share of correct responses, and
+    ``discrimination``, the point-biserial correlation between answering the question
+    correctly and the score of the result. Both are null when undefined.
+    """
+
+    n = F("times_shown")
+    n1 = F("times_correct")
+    # r = (n * S1 - n1 * S) / sqrt(n1 * (n - n1) * (n * SS - S * S)), in exact integers under the root
+    numerator = n * F("correct_score_sum") - n1 * F("score_sum")
+    denominator = Sqrt(NullIf(n1 * (n - n1), 0)) * Sqrt(
+        NullIf(n * F("score_square_sum") - F("score_sum") * F("score_sum"), 0)
+    )
+    return queryset.annotate(
+        difficulty=ExpressionWrapper(Cast(n1, FloatField()) / NullIf(n, 0), output_field=FloatField()),
+        discrimination=ExpressionWrapper(Cast(numerator, FloatField()) / denominator, output_field=FloatField()),
+    )
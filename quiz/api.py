@@ -0,0 +1,476 @@
+"""
+JSON API of the quizzes and attempts, for clients that render locally.
+
+Responses are serialized from ``values()`` rows and question bank snapshots, never from
+model instances. ``fields`` narrows quizzes to a comma separated subset of their fields,
+lists are paginated with signed cursors, and GET responses carry the validators of
+``ConditionalGetMixin``. Quiz details are cached already encoded, under their ETag.
+
+Clients authenticate with a bearer token from ``TokenView``, or with the session of the
+HTML pages. Session writes need its CSRF token, token requests need none.
+"""
+
+import json
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.datastructures import MultiValueDict
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic.base import View
+
+from .conditional import (
+    ConditionalGetMixin,
+    get_catalogue_modified,
+    get_popularity_modified,
+    get_quiz_modified,
+    get_summary_version,
+    make_etag,
+)
+from .filters import QuizApiFilter
+from .forms import QuizForm, QuizSearchForm
+from .models import Attempt, GradingJob, QuestionResponse, Quiz, Result, UserQuizSummary
+from .pagination import CursorPaginator, InvalidCursor, ResultPaginator
+from .question_bank import get_content_version
+from .sampling import draw_questions, get_questions
+
+API_QUIZ_KEY = "quiz:api-quiz:{etag}"
+API_TOKEN_SALT = "quiz.api.token"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+# field of the API: column of the values() rows it is read from
+QUIZ_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "category": "category_id",
+    "category_name": "category__name",
+    "difficulty_level": "difficulty_level",
+    "number_of_questions": "number_of_questions",
+    "duration_in_minutes": "duration_in_minutes",
+    "pass_percentage": "pass_percentage",
+    "popularity": "popularity",
+    "updated_at": "updated_at",
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.details = details
+
+
+def encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(encode(data), content_type="application/json", status=status)
+
+
+def serialize_question(question):
+    """Serialize a question snapshot for an attempt, without telling which answers are correct."""
+
+    return {
+        "id": question.id,
+        "text": question.text,
+        "question_type": question.question_type,
+        "answers": [{"id": answer.id, "text": answer.text} for answer in question.answers],
+    }
+
+
+def serialize_graded_questions(questions, submitted_answers_ids):
+    submitted_answers_ids = set(submitted_answers_ids)
+    return [
+        {
+            "id": question.id,
+            "answers": [
+                {
+                    "id": answer.id,
+                    "is_selected": answer.id in submitted_answers_ids,
+                    "is_correct": answer.is_correct,
+                }
+                for answer in question.answers
+            ],
+        }
+        for question in questions
+    ]
+
+
+def get_token_max_age():
+    return getattr(settings, "QUIZ_API_TOKEN_MAX_AGE", 60 * 60 * 24 * 30)
+
+
+def token_check(user):
+    # changes with the password, which revokes the tokens issued before
+    return salted_hmac(API_TOKEN_SALT, user.get_session_auth_hash()).hexdigest()[:32]
+
+
+def make_token(user):
+    """Sign a token of the user, valid for ``QUIZ_API_TOKEN_MAX_AGE`` seconds."""
+
+    return signing.dumps({"u": user.pk, "c": token_check(user)}, salt=API_TOKEN_SALT)
+
+
+def get_token_user(token):
+    """Return the active user of a token, or ``None`` if it is forged, expired or revoked."""
+
+    try:
+        payload = signing.loads(token, salt=API_TOKEN_SALT, max_age=get_token_max_age())
+    except signing.BadSignature:
+        return None
+    user = get_user_model().objects.filter(pk=payload.get("u"), is_active=True).first()
+    if user is None or not constant_time_compare(payload.get("c", ""), token_check(user)):
+        return None
+    return user
+
+
+class CsrfCheck(CsrfViewMiddleware):
+    def _reject(self, request, reason):
+        # hand the reason back instead of a 403 page
+        return reason
+
+
+class ApiMixin:
+    """Answer errors in JSON, authenticate clients, and read the parameters and bodies of the API."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # token requests need no CSRF token, get_user checks the one of session writes
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({"error": error.message, **error.details}, status=error.status)
+        except Http404:
+            return json_response({"error": "Not found."}, status=404)
+
+    def get_user(self):
+        """Return the user of the bearer token of the request, or of its session."""
+
+        if "Authorization" in self.request.headers:
+            scheme, _, token = self.request.headers["Authorization"].partition(" ")
+            user = get_token_user(token.strip()) if scheme.lower() == "bearer" else None
+            if user is None:
+                raise ApiError("Invalid or expired token.", status=401)
+            # responses for the user are private
+            self.request.user = user
+            return user
+        if not self.request.user.is_authenticated:
+            raise ApiError("Authentication required.", status=401)
+        if self.request.method not in SAFE_METHODS:
+            self.enforce_csrf()
+        return self.request.user
+
+    def enforce_csrf(self):
+        check = CsrfCheck(lambda request: None)
+        check.process_request(self.request)
+        reason = check.process_view(self.request, None, (), {})
+        if reason:
+            raise ApiError(f"CSRF failed: {reason}", status=403)
+
+    def get_fields(self):
+        """Return the quiz fields named by the ``fields`` parameter, all of them by default."""
+
+        if not self.request.GET.get("fields"):
+            return list(QUIZ_FIELDS)
+        fields = list(dict.fromkeys(self.request.GET["fields"].split(",")))
+        unknown = [field for field in fields if field not in QUIZ_FIELDS]
+        if unknown:
+            raise ApiError(f"Unknown fields: {', '.join(unknown)}.", allowed=list(QUIZ_FIELDS))
+        return fields
+
+    def read_json(self):
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            raise ApiError("The body is not valid JSON.")
+        if not isinstance(data, dict):
+            raise ApiError("The body must be a JSON object.")
+        return data
+
+
+def quiz_rows(queryset, fields, extra=()):
+    """Read the given fields of a quiz queryset as ``values()`` rows, keeping the ``extra`` columns too."""
+
+    return queryset.values(*dict.fromkeys([*(QUIZ_FIELDS[field] for field in fields), *extra]))
+
+
+def project(row, fields):
+    return {field: row[QUIZ_FIELDS[field]] for field in fields}
+
+
+class TokenView(ApiMixin, View):
+    """Exchanges ``{"username": ..., "password": ...}`` for a bearer token of the API."""
+
+    def post(self, request, *args, **kwargs):
+        data = self.read_json()
+        username, password = data.get("username"), data.get("password")
+        if not isinstance(username, str) or not isinstance(password, str):
+            raise ApiError('"username" and "password" are required.')
+        user = authenticate(request, username=username, password=password)
+        if user is None:
+            raise ApiError("Invalid credentials.", status=401)
+        return json_response({"token": make_token(user), "expires_in": get_token_max_age()}, status=201)
+
+
+class QuizListView(ApiMixin, ConditionalGetMixin, View):
+    """
+    Lists quizzes ``id`` first, or by ``o``: ``name``, ``-name`` or ``-popularity``.
+    Filtered by ``category``, ``difficulty_level`` and the search query ``q``, whose
+    matches are listed best first unless ``o`` is given.
+    """
+
+    def get_ordering(self, searching):
+        orderings = [ordering for ordering in CursorPaginator.orderings if searching or ordering != "search_rank"]
+        ordering = self.request.GET.get("o") or ("search_rank" if searching else "id")
+        if ordering not in orderings:
+            raise ApiError("Unsupported ordering.", allowed=orderings)
+        return ordering
+
+    def get_validators(self):
+        category = self.request.GET.get("category", "")
+        modified = max(get_catalogue_modified(category if category.isdigit() else None), get_popularity_modified())
+        return make_etag("api-quizzes", modified, self.request.get_full_path()), int(modified)
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+
+        # validated by stamps set on the primary, so never read from a lagging replica
+        filterset = QuizApiFilter(request.GET, queryset=Quiz.objects.using(DEFAULT_DB_ALIAS))
+        if not filterset.is_valid():
+            raise ApiError("Invalid filters.", errors=filterset.errors.get_json_data())
+        queryset = filterset.qs
+        search_form = QuizSearchForm(request.GET)
+        searching = search_form.is_valid() and bool(search_form.cleaned_data["q"])
+        if searching:
+            queryset = search_form.search(queryset)
+
+        ordering = self.get_ordering(searching)
+        ordering_columns = [field.lstrip("-") for field in CursorPaginator.orderings[ordering]]
+        rows = quiz_rows(queryset, fields, extra=ordering_columns)
+        paginator = CursorPaginator(rows, getattr(settings, "QUIZ_API_PAGE_SIZE", 50), ordering)
+        try:
+            page = paginator.page(request.GET.get("cursor"))
+        except InvalidCursor as exc:
+            raise ApiError(str(exc))
+        return json_response(
+            {
+                "results": [project(row, fields) for row in page],
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
+            }
+        )
+
+
+class QuizDetailView(ApiMixin, ConditionalGetMixin, View):
+    """
+    Serves a quiz from its encoded response, cached under an ETag of the content version
+    and the stamp of that quiz, so changes to other quizzes leave it valid.
+    """
+
+    def get_validators(self):
+        quiz_id = self.kwargs["pk"]
+        self.fields = self.get_fields()
+        modified = get_quiz_modified(quiz_id)
+        self.etag = make_etag("api-quiz", quiz_id, get_content_version(quiz_id), modified, ",".join(self.fields))
+        return self.etag, int(modified)
+
+    def get(self, request, *args, **kwargs):
+        key = API_QUIZ_KEY.format(etag=self.etag.strip('"'))
+        body = cache.get(key)
+        if body is None:
+            # the key changes with every write, so never fill it from a lagging replica
+            queryset = Quiz.objects.using(DEFAULT_DB_ALIAS).filter(pk=self.kwargs["pk"])
+            row = quiz_rows(queryset, self.fields).first()
+            if row is None:
+                raise Http404
+            body = encode(project(row, self.fields))
+            cache.set(key, body, getattr(settings, "QUIZ_API_CACHE_TIMEOUT", 60 * 60))
+        return HttpResponse(body, content_type="application/json")
+
+
+class AttemptStartView(ApiMixin, View):
+    """Draws the questions of a new attempt of the current user, without their answer key."""
+
+    def post(self, request, *args, **kwargs):
+        user = self.get_user()
+        quiz_id = self.kwargs["pk"]
+        number_of_questions = Quiz.objects.filter(pk=quiz_id).values_list("number_of_questions", flat=True).first()
+        if number_of_questions is None:
+            raise Http404
+        questions = draw_questions(quiz_id, number_of_questions)
+        attempt = Attempt.objects.create(
+            quiz_id=quiz_id, user=user, question_ids=[question.id for question in questions]
+        )
+        return json_response(
+            {
+                "id": attempt.id,
+                "quiz": quiz_id,
+                "started_at": attempt.started_at,
+                "questions": [serialize_question(question) for question in questions],
+            },
+            status=201,
+        )
+
+
+class AttemptView(ApiMixin, View):
+    """
+    Submits the answers of an attempt, ``{"answers": {"<question id>": [<answer id>, ...]}}``,
+    and reports its grade, which GET reads back. Attempts queued for the grading worker are
+    graded later, and an attempt is graded only once: replays are redirected to its grade.
+    """
+
+    def get(self, request, *args, **kwargs):
+        user = self.get_user()
+        attempt = (
+            Attempt.objects.filter(pk=self.kwargs["attempt_id"], quiz_id=self.kwargs["pk"], user=user)
+            .values(
+                "id",
+                "quiz_id",
+                "started_at",
+                "question_ids",
+                "grading_job__status",
+                "grading_job__score",
+                "grading_job__score_percentage",
+                "grading_job__passed",
+                "grading_job__submitted_answers_ids",
+                "result__id",
+                "result__score",
+                "quiz__pass_percentage",
+            )
+            .first()
+        )
+        if attempt is None:
+            raise Http404
+        data = {
+            "id": attempt["id"],
+            "quiz": attempt["quiz_id"],
+            "started_at": attempt["started_at"],
+            # unset until the attempt is submitted
+            "status": attempt["grading_job__status"],
+        }
+        if attempt["grading_job__status"] is None and attempt["result__id"] is not None:
+            # graded in the request: the responses recorded with the result hold the answers
+            responses = list(
+                QuestionResponse.objects.filter(result_id=attempt["result__id"]).values_list(
+                    "selected_answers_ids", "is_correct"
+                )
+            )
+            questions = get_questions(attempt["quiz_id"], attempt["question_ids"])
+            data.update(
+                status=GradingJob.Status.DONE,
+                score=sum(is_correct for _, is_correct in responses),
+                score_percentage=attempt["result__score"],
+                passed=attempt["result__score"] >= attempt["quiz__pass_percentage"],
+                questions=serialize_graded_questions(
+                    questions, [answer_id for answer_ids, _ in responses for answer_id in answer_ids]
+                ),
+            )
+        elif attempt["grading_job__status"] == GradingJob.Status.DONE:
+            questions = get_questions(attempt["quiz_id"], attempt["question_ids"])
+            data.update(
+                score=attempt["grading_job__score"],
+                score_percentage=attempt["grading_job__score_percentage"],
+                passed=attempt["grading_job__passed"],
+                questions=serialize_graded_questions(questions, attempt["grading_job__submitted_answers_ids"]),
+            )
+        return json_response(data)
+
+    def post(self, request, *args, **kwargs):
+        user = self.get_user()
+        attempt = (
+            Attempt.objects.select_related("quiz")
+            .filter(pk=self.kwargs["attempt_id"], quiz_id=self.kwargs["pk"], user=user)
+            .first()
+        )
+        if attempt is None:
+            raise Http404
+        if attempt.submitted_at is not None:
+            return self.see_grade()
+        questions = attempt.get_questions()
+        form = QuizForm(self.get_form_data(), questions=questions)
+        if not form.is_valid():
+            errors = {name.removeprefix("question_"): messages for name, messages in form.errors.items()}
+            raise ApiError("Invalid answers.", errors=errors)
+
+        if getattr(settings, "QUIZ_GRADING_QUEUE", False):
+            GradingJob.enqueue(attempt, form.cleaned_data)
+            return json_response({"id": attempt.id, "status": GradingJob.Status.PENDING}, status=202)
+
+        quiz = attempt.quiz
+        score, score_percentage, passed, submitted_answers_ids = quiz.calculate_score(
+            form.cleaned_data, attempt=attempt
+        )
+        if quiz.save_result(user=user, score=score_percentage, answers=form.cleaned_data, attempt=attempt) is None:
+            return self.see_grade()
+        quiz.increment_popularity()
+        return json_response(
+            {
+                "id": attempt.id,
+                "status": GradingJob.Status.DONE,
+                "score": score,
+                "score_percentage": score_percentage,
+                "passed": passed,
+                "questions": serialize_graded_questions(questions, submitted_answers_ids),
+            }
+        )
+
+    def see_grade(self):
+        # 303 makes clients read the grade with a GET of the attempt
+        return HttpResponseRedirect(self.request.path, status=303)
+
+    def get_form_data(self):
+        """Turn the submitted answers into the data of a ``QuizForm``."""
+
+        answers = self.read_json().get("answers")
+        if not isinstance(answers, dict):
+            raise ApiError('"answers" must map question ids to answer ids.')
+        data = MultiValueDict()
+        for question_id, answer_ids in answers.items():
+            if not isinstance(answer_ids, list):
+                answer_ids = [answer_ids]
+            data.setlist(f"question_{question_id}", [str(answer_id) for answer_id in answer_ids])
+        return data
+
+
+class QuizResultsView(ApiMixin, ConditionalGetMixin, View):
+    """Lists the results of the current user on a quiz, last first, with their summary."""
+
+    def get_validators(self):
+        user = self.get_user()
+        quiz_id = self.kwargs["pk"]
+        version = get_summary_version(user.pk, quiz_id)
+        return make_etag("api-results", quiz_id, user.pk, version, self.request.get_full_path()), None
+
+    def get(self, request, *args, **kwargs):
+        user = self.get_user()
+        quiz_id = self.kwargs["pk"]
+        summary = (
+            UserQuizSummary.objects.filter(user=user, quiz_id=quiz_id)
+            .values("best_score", "last_score", "attempt_count", "last_attempt_at", "passed")
+            .first()
+        )
+        rows = Result.objects.filter(user=user, quiz_id=quiz_id).values("id", "score", "submitted_date")
+        paginator = ResultPaginator(rows, getattr(settings, "QUIZ_API_PAGE_SIZE", 50), "-submitted_date")
+        try:
+            page = paginator.page(request.GET.get("cursor"))
+        except InvalidCursor as exc:
+            raise ApiError(str(exc))
+        return json_response(
+            {
+                "summary": summary,
+                "results": list(page),
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
+            }
+        )
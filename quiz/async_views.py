@@ -0,0 +1,193 @@
+"""
+Async versions of the quiz views, routed instead of ``quiz.views`` when
+``QUIZ_ASYNC_VIEWS`` is set. They only pay off when the project is served by
+``config.asgi`` with async-capable middleware; under WSGI Django runs them in an
+event loop per request.
+
+Queries go through the async ORM. What only has a sync API (transactions, the
+question bank cache, the search backend, the cursor paginator) runs in
+``sync_to_async``. Views return ``TemplateResponse`` so Django renders the
+templates off the event loop.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.http import Http404, HttpResponseForbidden
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.views.generic.base import View
+
+from . import views
+from .models import Attempt, GradingJob, UserQuizSummary
+
+
+async def aget_user(request):
+    """Resolve ``request.user``, which reads the session and the user from the database."""
+
+    def resolve():
+        # evaluates the lazy user set by whichever authentication middleware is installed
+        request.user.is_authenticated
+        return request.user
+
+    return await sync_to_async(resolve)()
+
+
+class AsyncSingleObjectMixin:
+    async def aget_object(self):
+        queryset = self.get_queryset()
+        try:
+            return await queryset.aget(pk=self.kwargs["pk"])
+        except queryset.model.DoesNotExist:
+            raise Http404(f"No {queryset.model._meta.verbose_name} found matching the query")
+
+
+class CategoryListView(views.CategoryListView):
+    async def get(self, request, *args, **kwargs):
+        self.object_list = await sync_to_async(self.get_queryset)()
+        return self.render_to_response(self.get_context_data())
+
+
+class QuizListView(views.QuizListView):
+    async def get(self, request, *args, **kwargs):
+        # the search backend may look up its index table the first time
+        self.filterset = await sync_to_async(self.get_filterset)(self.get_filterset_class())
+        if not self.filterset.is_bound or self.filterset.is_valid() or not self.get_strict():
+            self.object_list = self.filterset.qs
+        else:
+            self.object_list = self.filterset.queryset.none()
+
+        self.pagination = await self.apaginate_queryset(self.object_list, self.get_paginate_by(self.object_list))
+        context = self.get_context_data(filter=self.filterset, object_list=self.object_list)
+        return self.render_to_response(context)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """Paginate like ``QuizListView.paginate_queryset``, reading the page asynchronously."""
+
+        if self.uses_cursor_pagination():
+            # a cursor page is read with a single query
+            return await sync_to_async(super().paginate_queryset)(queryset, page_size)
+
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(), allow_empty_first_page=self.get_allow_empty()
+        )
+        # the paginator caches its count, so paging below runs no query
+        await sync_to_async(lambda: paginator.count)()
+        page_number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        try:
+            page_number = int(page_number)
+        except ValueError:
+            if page_number != "last":
+                raise Http404("Page is not “last”, nor can it be converted to an int.")
+            page_number = paginator.num_pages
+        try:
+            page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise Http404(f"Invalid page ({page_number}): {exc}")
+        page.object_list = [quiz async for quiz in page.object_list]
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def paginate_queryset(self, queryset, page_size):
+        return self.pagination
+
+
+class QuizAssessmentResultView(AsyncSingleObjectMixin, views.QuizAssessmentResultView):
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        user = await aget_user(request)
+        self.summary = None
+        if user.is_authenticated:
+            self.summary = await UserQuizSummary.objects.filter(quiz=self.object, user=user).afirst()
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+    def get_summary(self):
+        return self.summary
+
+
+class QuizAssessmentAttemptView(AsyncSingleObjectMixin, views.QuizAssessmentAttemptView):
+    async def get(self, request, *args, **kwargs):
+        self.object = await self.aget_object()
+        user = await aget_user(request)
+        # the question bank is cached, and read from the database on a miss
+        questions = await sync_to_async(self.object.get_questions)()
+        attempt = await Attempt.objects.acreate(
+            quiz=self.object, user=user, question_ids=[question.id for question in questions]
+        )
+        self.started_attempt = questions, attempt
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+    def start_attempt(self):
+        return self.started_attempt
+
+
+class QuizAssessmentSubmissionFormView(AsyncSingleObjectMixin, views.QuizAssessmentSubmissionFormView):
+    # FormView's sync get would make the handlers a mix of sync and async
+    http_method_names = ["post"]
+
+    async def post(self, request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        self.object = await self.aget_object()
+        try:
+            self.attempt = await Attempt.objects.aget(pk=request.POST.get("attempt"), quiz=self.object, user=user)
+        except (Attempt.DoesNotExist, ValidationError):
+            # unknown or tampered attempt, start over with a new one
+            return redirect(self.object.get_assessment_attempt_url())
+        if self.attempt.submitted_at is not None:
+            # a replayed submission, show the result saved the first time
+            return redirect(self.attempt.get_result_url())
+        self.questions = await sync_to_async(self.attempt.get_questions)()
+
+        form = self.get_form()
+        if form.is_valid():
+            return await self.aform_valid(form)
+        return self.form_invalid(form)
+
+    async def aform_valid(self, form):
+        quiz = self.object
+        if getattr(settings, "QUIZ_GRADING_QUEUE", False):
+            # acknowledge right away, a grade_submissions worker grades and saves the result
+            await sync_to_async(GradingJob.enqueue)(self.attempt, form.cleaned_data)
+            return redirect(self.attempt.get_result_url())
+
+        score, score_percentage, passed, submitted_answers_ids = await sync_to_async(quiz.calculate_score)(
+            form.cleaned_data, attempt=self.attempt
+        )
+        # the result and the summary are saved in one transaction, once per attempt
+        result = await sync_to_async(quiz.save_result)(
+            user=self.request.user, score=score_percentage, answers=form.cleaned_data, attempt=self.attempt
+        )
+        if result is None:
+            return redirect(self.attempt.get_result_url())
+        quiz.increment_popularity()
+
+        context = self.get_result_context(score, score_percentage, passed, submitted_answers_ids)
+        return TemplateResponse(self.request, "quiz/quiz_result.html", context)
+
+
+# shows a saved result, or is polled while a queued submission is graded; a sync view is fine
+QuizAttemptResultView = views.QuizAttemptResultView
+# served from the cache, apart from one rank lookup
+QuizLeaderboardView = views.QuizLeaderboardView
+LeaderboardView = views.LeaderboardView
+# reads a fixed number of rows from the summary tables
+ProgressView = views.ProgressView
+
+
+class QuizView(LoginRequiredMixin, View):
+    async def dispatch(self, request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return self.handle_no_permission()
+        return await View.dispatch(self, request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        view = QuizAssessmentAttemptView.as_view()
+        return await view(request, *args, **kwargs)
+
+    async def post(self, request, *args, **kwargs):
+        view = QuizAssessmentSubmissionFormView.as_view()
+        return await view(request, *args, **kwargs)
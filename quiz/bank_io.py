@@ -0,0 +1,267 @@
+"""
+Import and export of whole question banks as JSON Lines or CSV.
+
+Both formats hold one question per record together with its quiz, category and
+answers. A JSON Lines record looks like::
+
+    {"category": "Science", "quiz": "Physics", "number_of_questions": 10,
+     "duration_in_minutes": 15, "pass_percentage": 60, "difficulty_level": "MEDIUM",
+     "question": "What is...?", "question_type": "MC",
+     "answers": [{"text": "...", "is_correct": true}, ...]}
+
+CSV files have one row per answer with the ``CSV_COLUMNS`` header; consecutive rows
+of the same question are grouped together. ``is_correct`` is a JSON boolean, or
+``true``/``false`` in CSV files.
+
+The settings of a quiz that already exists are kept unless the importer is told to
+update them; records that differ from them are reported in ``warnings``.
+"""
+
+import csv
+import itertools
+import json
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .category_counters import add_to_category
+from .conditional import touch_catalogue
+from .models import Answer, Category, Question, Quiz
+from .question_bank import bump_content_version
+from .search import get_search_backend
+
+FORMATS = ("jsonl", "csv")
+QUIZ_FIELDS = ("number_of_questions", "duration_in_minutes", "pass_percentage", "difficulty_level")
+CSV_COLUMNS = ("category", "quiz", *QUIZ_FIELDS, "question", "question_type", "answer", "is_correct")
+
+
+def read_jsonl(lines):
+    """Yield ``(line number, record)`` pairs from an iterable of JSON lines."""
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield number, ValidationError(f"Invalid JSON: {exc}")
+
+
+def read_csv(lines):
+    """Yield ``(line number, record)`` pairs, grouping the answer rows of each question."""
+
+    reader = csv.DictReader(lines)
+    rows = ((reader.line_num, row) for row in reader)
+    question_key = lambda item: (item[1]["category"], item[1]["quiz"], item[1]["question"])  # noqa: E731
+    for _, group in itertools.groupby(rows, key=question_key):
+        group = list(group)
+        number, first = group[0]
+        record = {field: first[field] for field in ("category", "quiz", *QUIZ_FIELDS, "question", "question_type")}
+        record["answers"] = [
+            {"text": row["answer"], "is_correct": row["is_correct"]}
+            for _, row in group
+        ]
+        yield number, record
+
+
+def parse_is_correct(value):
+    """Accept a JSON boolean, or the strings ``true`` and ``false`` in any case."""
+
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise ValidationError(f"is_correct must be true or false, not {value!r}.")
+
+
+def read_records(lines, format):
+    if format == "csv":
+        return read_csv(lines)
+    return read_jsonl(lines)
+
+
+class QuestionBankImporter:
+    """
+    Stream question records into the database.
+    Quizzes are validated with ``Quiz.full_clean`` when they are first seen, and
+    questions and answers are inserted with ``bulk_create`` in transactional batches.
+    Questions already present in a quiz are skipped, so an import can be re-run.
+    The settings of existing quizzes are only changed with ``update_quizzes``.
+    """
+
+    def __init__(self, batch_size=1000, update_quizzes=False):
+        self.batch_size = batch_size
+        self.update_quizzes = update_quizzes
+        self.categories = {}
+        self.quizzes = {}
+        self.existing_questions = {}
+        self.pending = []
+        self.touched_quiz_ids = set()
+        self.stats = {"quizzes": 0, "updated": 0, "questions": 0, "answers": 0, "skipped": 0}
+        self.errors = []
+        self.warnings = []
+
+    def run(self, records):
+        for number, record in records:
+            try:
+                if isinstance(record, ValidationError):
+                    raise record
+                self.add(record)
+            except (ValidationError, KeyError, TypeError, ValueError) as exc:
+                self.errors.append((number, exc))
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        self.flush()
+
+        # bulk inserts bypass the signals maintaining the caches and the search index
+        for quiz_id in self.touched_quiz_ids:
+            bump_content_version(quiz_id)
+        touch_catalogue(*{quiz.category_id for quiz in self.quizzes.values()})
+        get_search_backend().index_quizzes(self.touched_quiz_ids)
+        return self.stats
+
+    def get_category(self, name):
+        category = self.categories.get(name)
+        if category is None:
+            category = Category.objects.filter(name=name).first() or Category.objects.create(name=name)
+            self.categories[name] = category
+        return category
+
+    def get_quiz(self, record):
+        key = (record["category"], record["quiz"])
+        quiz = self.quizzes.get(key)
+        if quiz is None:
+            category = self.get_category(record["category"])
+            quiz = Quiz.objects.filter(category=category, name=record["quiz"]).first()
+            if quiz is None:
+                # Quiz.save runs full_clean, and with it the Quiz.clean rules
+                quiz = Quiz(category=category, name=record["quiz"], **{field: record[field] for field in QUIZ_FIELDS})
+                quiz.save()
+                self.stats["quizzes"] += 1
+            else:
+                self.check_settings(quiz, record)
+            self.quizzes[key] = quiz
+            self.existing_questions[quiz.id] = set(quiz.questions.values_list("text", flat=True))
+        return quiz
+
+    def check_settings(self, quiz, record):
+        """Apply the settings of the record to an existing quiz, or report how they differ."""
+
+        changes = {}
+        for field in QUIZ_FIELDS:
+            if record.get(field) in (None, ""):
+                continue
+            value = Quiz._meta.get_field(field).to_python(record[field])
+            if value != getattr(quiz, field):
+                changes[field] = (getattr(quiz, field), value)
+        if not changes:
+            return
+
+        if self.update_quizzes:
+            for field, (_, value) in changes.items():
+                setattr(quiz, field, value)
+            try:
+                quiz.save()
+            except ValidationError:
+                quiz.refresh_from_db()
+                raise
+            self.stats["updated"] += 1
+        else:
+            differences = ", ".join(f"{field} {current} (file: {value})" for field, (current, value) in changes.items())
+            self.warnings.append(f"Quiz {quiz.name!r} of {record['category']!r} keeps its settings: {differences}.")
+
+    def add(self, record):
+        quiz = self.get_quiz(record)
+        question = Question(quiz=quiz, text=record["question"], question_type=record.get("question_type") or "MC")
+        question.full_clean(exclude=["quiz"])
+
+        if question.text in self.existing_questions[quiz.id]:
+            self.stats["skipped"] += 1
+            return
+
+        answers = []
+        seen = set()
+        for answer in record["answers"]:
+            # (question, text) is unique, keep the first of duplicated answers
+            if answer["text"] in seen:
+                continue
+            seen.add(answer["text"])
+            answer = Answer(text=answer["text"], is_correct=parse_is_correct(answer.get("is_correct")))
+            answer.full_clean(exclude=["question"])
+            answers.append(answer)
+        if not any(answer.is_correct for answer in answers):
+            raise ValidationError("A question needs at least one correct answer.")
+
+        self.existing_questions[quiz.id].add(question.text)
+        self.pending.append((question, answers))
+
+    def flush(self):
+        if not self.pending:
+            return
+        with transaction.atomic():
+            questions = Question.objects.bulk_create(
+                [question for question, _ in self.pending], batch_size=self.batch_size
+            )
+            answers = []
+            for question, question_answers in self.pending:
+                for answer in question_answers:
+                    answer.question = question
+                    answers.append(answer)
+            Answer.objects.bulk_create(answers, batch_size=self.batch_size)
+            for category_id, count in Counter(question.quiz.category_id for question in questions).items():
+                add_to_category(category_id, questions=count)
+        self.touched_quiz_ids.update(question.quiz_id for question in questions)
+        self.stats["questions"] += len(questions)
+        self.stats["answers"] += len(answers)
+        self.pending = []
+
+
+def export_records(quizzes, chunk_size=1000):
+    """Yield a record per question of the given quizzes, reading the questions in chunks."""
+
+    questions = (
+        Question.objects.filter(quiz__in=quizzes)
+        .select_related("quiz__category")
+        .prefetch_related("answers")
+        .order_by("quiz_id", "id")
+    )
+    for question in questions.iterator(chunk_size=chunk_size):
+        quiz = question.quiz
+        yield {
+            "category": quiz.category.name,
+            "quiz": quiz.name,
+            **{field: getattr(quiz, field) for field in QUIZ_FIELDS},
+            "question": question.text,
+            "question_type": question.question_type,
+            "answers": [{"text": answer.text, "is_correct": answer.is_correct} for answer in question.answers.all()],
+        }
+
+
+class Echo:
+    """File-like object handing back what is written, to stream ``csv.writer`` output."""
+
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def csv_lines(records):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for record in records:
+        quiz_values = [record["category"], record["quiz"], *(record[field] for field in QUIZ_FIELDS)]
+        for answer in record["answers"]:
+            yield writer.writerow(
+                [*quiz_values, record["question"], record["question_type"], answer["text"], answer["is_correct"]]
+            )
+
+
+def export_lines(records, format):
+    if format == "csv":
+        return csv_lines(records)
+    return jsonl_lines(records)
@@ -0,0 +1,194 @@
+"""
+Benchmarks of the quiz views against the current database.
+
+Every scenario issues real requests through the Django test client and records
+wall time and SQL query counts. Run them with ``python manage.py benchmark`` on
+a dataset made by ``python manage.py generate_fake_data``.
+"""
+
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from quiz.counters import popularity_buffer
+from quiz.models import Attempt, Category, Question, Quiz
+from quiz.question_bank import get_question_bank
+
+User = get_user_model()
+
+BENCHMARK_USERNAME = "benchmark"
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(samples, percent):
+    samples = sorted(samples)
+    index = min(len(samples) - 1, max(0, round(percent / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+class BenchmarkContext:
+    """Picks the objects the scenarios request and keeps a logged-in client."""
+
+    def __init__(self):
+        self.quiz = Quiz.objects.filter(questions__isnull=False).order_by("id").first()
+        if self.quiz is None:
+            raise ValueError("The database has no quiz with questions, run generate_fake_data first.")
+        self.category = Category.objects.filter(quizzes__isnull=False).order_by("id").first()
+        self.search_term = self.quiz.name.split()[0]
+        self.user = User.objects.filter(username=BENCHMARK_USERNAME).first()
+        if self.user is None:
+            self.user = User.objects.create_user(
+                username=BENCHMARK_USERNAME, email="benchmark@example.com", password=None
+            )
+        # outside INTERNAL_IPS so the debug toolbar stays out of the measurements
+        self.anonymous = Client(REMOTE_ADDR="192.0.2.1")
+        self.client = Client(REMOTE_ADDR="192.0.2.1")
+        self.client.force_login(self.user)
+
+    def submission_data(self):
+        """Start an attempt and answer it with the first answer of every question."""
+
+        response = self.client.get(self.quiz.get_assessment_attempt_url())
+        assert response.status_code == 200, response.status_code
+        attempt = Attempt.objects.filter(quiz=self.quiz, user=self.user).order_by("-started_at").first()
+        questions = get_question_bank(self.quiz.id).questions_by_id
+        data = {"attempt": str(attempt.id)}
+        for question_id in attempt.question_ids:
+            question = questions[question_id]
+            answer_id = str(question.answers[0].id)
+            if question.question_type == Question.QuestionType.MULTI_SELECT_MULTIPLE_CHOICE:
+                data[f"question_{question_id}"] = [answer_id]
+            else:
+                data[f"question_{question_id}"] = answer_id
+        return data
+
+
+def on_commit_per_request(request):
+    """
+    Run the ``on_commit`` callbacks of a request when it returns, as they would run after
+    its own commit, instead of never in the transaction that is rolled back.
+    """
+
+    def run(context, prepared):
+        with TestCase.captureOnCommitCallbacks(using=DEFAULT_DB_ALIAS, execute=True):
+            return request(context, prepared)
+
+    return run
+
+
+def get(client_name, url):
+    @on_commit_per_request
+    def request(context, prepared):
+        return getattr(context, client_name).get(url(context))
+
+    return request
+
+
+@on_commit_per_request
+def submit(context, prepared):
+    return context.client.post(context.quiz.get_assessment_attempt_url(), prepared)
+
+
+# name: (request, prepare); ``prepare`` runs untimed before every request
+SCENARIOS = {
+    "quiz_list": (get("anonymous", lambda context: reverse("quiz:quiz_list")), None),
+    "quiz_list_popular": (get("anonymous", lambda context: reverse("quiz:quiz_list_by_popularity")), None),
+    "quiz_list_category": (
+        get("anonymous", lambda context: reverse("quiz:quiz_list_by_category", args=[context.category.id])),
+        None,
+    ),
+    "quiz_list_search": (
+        get("anonymous", lambda context: f"{reverse('quiz:quiz_list')}?q={context.search_term}"),
+        None,
+    ),
+    "quiz_list_ordered": (get("anonymous", lambda context: f"{reverse('quiz:quiz_list')}?o=-name"), None),
+    "category_list": (get("anonymous", lambda context: reverse("quiz:category_list")), None),
+    "quiz_assessment": (get("client", lambda context: context.quiz.get_assessment_url()), None),
+    "quiz_attempt": (get("client", lambda context: context.quiz.get_assessment_attempt_url()), None),
+    "quiz_submission": (submit, BenchmarkContext.submission_data),
+    "api_quiz_list": (get("anonymous", lambda context: reverse("quiz:api_quiz_list")), None),
+    "api_quiz_detail": (
+        get("anonymous", lambda context: reverse("quiz:api_quiz_detail", args=[context.quiz.id])),
+        None,
+    ),
+}
+
+
+def run_scenario(context, name, iterations, warmup):
+    """Run a scenario and return its latency percentiles (ms) and query counts."""
+
+    request, prepare = SCENARIOS[name]
+    timings = []
+    query_counts = []
+    for iteration in range(warmup + iterations):
+        prepared = prepare(context) if prepare else None
+        with ExitStack() as stack:
+            # replicas included, so that routing reads away from the primary does not hide them
+            queries = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+            started = time.perf_counter()
+            response = request(context, prepared)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise ValueError(f"{name} answered with status {response.status_code}.")
+        if iteration >= warmup:
+            timings.append(elapsed)
+            query_counts.append(sum(len(captured) for captured in queries))
+
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p90_ms": round(percentile(timings, 90), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": max(query_counts),
+    }
+
+
+def run_benchmarks(names, iterations, warmup):
+    """
+    Run the given scenarios inside a transaction that is rolled back,
+    so attempts and results written by the benchmark do not pile up in the dataset.
+
+    Popularity is flushed inside the transaction rather than by the timer thread, and the
+    cache, which saw the rolled back writes, is cleared afterwards.
+    """
+
+    report = {}
+    try:
+        with override_settings(QUIZ_POPULARITY_FLUSH_TIMER=False), transaction.atomic():
+            context = BenchmarkContext()
+            for name in names:
+                report[name] = run_scenario(context, name, iterations, warmup)
+            popularity_buffer.flush()
+            raise Rollback
+    except Rollback:
+        pass
+    finally:
+        cache.clear()
+    return report
+
+
+def check_budgets(report, budgets):
+    """Return the budget violations of a report as readable messages."""
+
+    violations = []
+    for name, budget in budgets.items():
+        measured = report.get(name)
+        if measured is None:
+            continue
+        for metric, limit in budget.items():
+            key = "queries" if metric == "max_queries" else metric
+            if measured[key] > limit:
+                violations.append(f"{name}: {key} {measured[key]} exceeds the budget of {limit}")
+    return violations
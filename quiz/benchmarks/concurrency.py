@@ -0,0 +1,105 @@
+"""
+Throughput and tail latency of the read-only quiz views under concurrent load.
+
+Requests go through Django's WSGI handler from a pool of threads, or through its
+ASGI handler from a single event loop, in this process and against the current
+database. Whether the sync or the async views answer depends on ``QUIZ_ASYNC_VIEWS``.
+Like the real servers, and unlike the test client alone, database connections are
+closed after every request unless ``CONN_MAX_AGE`` keeps them.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from . import BenchmarkContext, percentile
+
+SERVERS = ("wsgi", "asgi")
+
+# name: (logged in, url)
+SCENARIOS = {
+    "quiz_list": (False, lambda context: reverse("quiz:quiz_list")),
+    "quiz_list_popular": (False, lambda context: reverse("quiz:quiz_list_by_popularity")),
+    "quiz_list_search": (False, lambda context: f"{reverse('quiz:quiz_list')}?q={context.search_term}"),
+    "category_list": (False, lambda context: reverse("quiz:category_list")),
+    "quiz_assessment": (True, lambda context: context.quiz.get_assessment_url()),
+}
+
+
+def summarize(timings, elapsed):
+    return {
+        "requests": len(timings),
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def run_wsgi(url, cookies, requests, concurrency):
+    local = threading.local()
+
+    def request(_):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = Client(REMOTE_ADDR="192.0.2.1")
+            client.cookies = cookies.copy()
+        started = time.perf_counter()
+        response = client.get(url)
+        close_old_connections()
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise ValueError(f"{url} answered with status {response.status_code}.")
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(request, range(requests)))
+    return timings, time.perf_counter() - started
+
+
+def run_asgi(url, cookies, requests, concurrency):
+    async def worker(counter, timings):
+        client = AsyncClient()
+        client.cookies = cookies.copy()
+        while next(counter) < requests:
+            started = time.perf_counter()
+            # like ASGIHandler, give every request its own thread for sync code
+            async with ThreadSensitiveContext():
+                response = await client.get(url)
+                await sync_to_async(close_old_connections)()
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise ValueError(f"{url} answered with status {response.status_code}.")
+
+    async def main():
+        counter = itertools.count()
+        timings = []
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(counter, timings) for _ in range(concurrency)))
+        return timings, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def run_concurrency_benchmarks(server, names, requests, concurrency, warmup):
+    """Run every scenario with ``concurrency`` clients in flight and return its throughput and latency."""
+
+    context = BenchmarkContext()
+    run = run_wsgi if server == "wsgi" else run_asgi
+    report = {}
+    for name in names:
+        logged_in, url = SCENARIOS[name]
+        cookies = (context.client if logged_in else context.anonymous).cookies
+        url = url(context)
+        if warmup:
+            run(url, cookies, warmup, concurrency)
+        report[name] = summarize(*run(url, cookies, requests, concurrency))
+    return report
@@ -0,0 +1,100 @@
+"""
+Quiz, question and attempt counts kept on every ``Category``.
+
+The counters are moved with ``F()`` updates in the transaction that adds or removes
+what they count, by the signals of ``Quiz``, ``Question`` and ``Result`` and by the
+bulk writers that bypass them. ``reconcile_category_counters`` recounts them.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F
+
+from .models import Category, Question, Quiz, Result
+
+CATEGORY_LIST_KEY = "quiz:category-list"
+COUNTERS = ("quiz_count", "question_count", "attempt_count")
+
+
+def invalidate_category_list():
+    transaction.on_commit(lambda: cache.delete(CATEGORY_LIST_KEY))
+
+
+def add_to_categories(categories, quizzes=0, questions=0, attempts=0):
+    """Add to the counters of a ``Category`` queryset; negative amounts subtract."""
+
+    increments = {
+        field: F(field) + amount
+        for field, amount in zip(COUNTERS, (quizzes, questions, attempts))
+        if amount
+    }
+    if not increments:
+        return
+    categories.update(**increments)
+    # the list may show attempt counts up to QUIZ_CATEGORY_LIST_CACHE_TIMEOUT old
+    if quizzes or questions:
+        invalidate_category_list()
+
+
+def add_to_category(category_id, **amounts):
+    add_to_categories(Category.objects.filter(id=category_id), **amounts)
+
+
+def add_to_quiz_category(quiz_id, **amounts):
+    add_to_categories(Category.objects.filter(quizzes=quiz_id), **amounts)
+
+
+def get_category_list():
+    """
+    Return the categories with their counters, cached for ``QUIZ_CATEGORY_LIST_CACHE_TIMEOUT``
+    seconds.
+    """
+
+    categories = cache.get(CATEGORY_LIST_KEY)
+    if categories is None:
+        # the cache is cleared on commit of a change, refill it from the primary
+        categories = list(Category.objects.using(DEFAULT_DB_ALIAS).order_by("name", "id"))
+        cache.set(CATEGORY_LIST_KEY, categories, getattr(settings, "QUIZ_CATEGORY_LIST_CACHE_TIMEOUT", 60))
+    return categories
+
+
+def count_categories():
+    """Count the quizzes, questions and attempts of every category from the tables themselves."""
+
+    counts = {}
+    for field, queryset, category in (
+        ("quiz_count", Quiz.objects, "category_id"),
+        ("question_count", Question.objects, "quiz__category_id"),
+        ("attempt_count", Result.objects, "quiz__category_id"),
+    ):
+        rows = queryset.values_list(category).annotate(count=Count("id")).order_by()
+        for category_id, count in rows:
+            counts.setdefault(category_id, dict.fromkeys(COUNTERS, 0))[field] = count
+    return counts
+
+
+def reconcile_category_counters(fix=False):
+    """
+    Compare the counters of every category with a recount and return the drifted ones as
+    ``(category, field, stored, counted)`` tuples; with ``fix``, store the recounts.
+    """
+
+    counts = count_categories()
+    drifted = []
+    categories = []
+    with transaction.atomic():
+        for category in Category.objects.select_for_update().order_by("id"):
+            counted = counts.get(category.id, dict.fromkeys(COUNTERS, 0))
+            changed = False
+            for field in COUNTERS:
+                if getattr(category, field) != counted[field]:
+                    drifted.append((category, field, getattr(category, field), counted[field]))
+                    setattr(category, field, counted[field])
+                    changed = True
+            if changed:
+                categories.append(category)
+        if fix and categories:
+            Category.objects.bulk_update(categories, COUNTERS)
+            invalidate_category_list()
+    return drifted
@@ -0,0 +1,157 @@
+"""
+Conditional GET for the catalogue and assessment pages.
+
+Pages are validated against versions kept in the cache, so that a request whose
+``If-None-Match`` or ``If-Modified-Since`` still matches gets a ``304 Not Modified``
+before the view runs its queries or renders its template:
+
+* the catalogue of all quizzes and of every category is stamped with the time of its
+  last change by the signals of ``Category``, ``Quiz`` and ``Question``, and the
+  popular ordering with the time of the last popularity flush;
+* every quiz is stamped when its row, the name of its category or its popularity
+  changes, for the API details of that quiz alone;
+* the assessment page of a quiz is versioned by the content version of the quiz and,
+  for users, by a version of their summary bumped on every result.
+
+A missing stamp or version starts again from now, never from an earlier time, so an
+evicted key can only cost a full render.
+"""
+
+import hashlib
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+CATALOGUE_MODIFIED_KEY = "quiz:catalogue-modified:{scope}"
+POPULARITY_MODIFIED_KEY = "quiz:popularity-modified"
+QUIZ_MODIFIED_KEY = "quiz:quiz-modified:{quiz_id}"
+SUMMARY_VERSION_KEY = "quiz:summary-version:{user_id}:{quiz_id}"
+
+
+def get_stamp(key):
+    """Return the time stored under ``key``, storing now if there is none."""
+
+    stamp = cache.get(key)
+    if stamp is None:
+        stamp = time.time()
+        if not cache.add(key, stamp, None):
+            stamp = cache.get(key, stamp)
+    return stamp
+
+
+def set_stamp(*keys):
+    stamp = time.time()
+    cache.set_many(dict.fromkeys(keys, stamp), None)
+
+
+def get_catalogue_modified(category_id=None):
+    return get_stamp(CATALOGUE_MODIFIED_KEY.format(scope=category_id or "all"))
+
+
+def touch_catalogue(*category_ids):
+    """Stamp the catalogue and the given categories as changed, once the transaction commits."""
+
+    keys = [CATALOGUE_MODIFIED_KEY.format(scope=scope) for scope in ("all", *category_ids) if scope]
+    transaction.on_commit(lambda: set_stamp(*keys))
+
+
+def get_popularity_modified():
+    return get_stamp(POPULARITY_MODIFIED_KEY)
+
+
+def touch_popularity(*quiz_ids):
+    """Stamp the popular ordering and the quizzes whose popularity was flushed as changed."""
+
+    set_stamp(POPULARITY_MODIFIED_KEY, *(QUIZ_MODIFIED_KEY.format(quiz_id=quiz_id) for quiz_id in quiz_ids))
+
+
+def get_quiz_modified(quiz_id):
+    return get_stamp(QUIZ_MODIFIED_KEY.format(quiz_id=quiz_id))
+
+
+def touch_quizzes(*quiz_ids):
+    """Stamp the given quizzes as changed, once the transaction commits."""
+
+    keys = [QUIZ_MODIFIED_KEY.format(quiz_id=quiz_id) for quiz_id in quiz_ids]
+    if keys:
+        transaction.on_commit(lambda: set_stamp(*keys))
+
+
+def get_summary_version(user_id, quiz_id):
+    key = SUMMARY_VERSION_KEY.format(user_id=user_id, quiz_id=quiz_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_summary_version(user_id, quiz_id):
+    key = SUMMARY_VERSION_KEY.format(user_id=user_id, quiz_id=quiz_id)
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(":".join(map(str, parts)).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET requests with ``304 Not Modified`` when the validators returned by
+    ``get_validators`` match, before the view runs. Anonymous responses may be stored
+    by shared caches, the others only by the browser, and all of them vary on cookies.
+    """
+
+    def get_validators(self):
+        """
+        Return the ``(etag, last_modified)`` of the page, as a string and a whole timestamp or
+        ``None``. Without either the page is always rendered, with its caching headers.
+        """
+
+        return None, None
+
+    def get_conditional_state(self):
+        # reads the session and the user, and the cache
+        return (*self.get_validators(), self.request.user.is_authenticated)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        if self.view_is_async:
+            return self.adispatch_conditional(request, *args, **kwargs)
+
+        etag, last_modified, private = self.get_conditional_state()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.add_validators(super().dispatch(request, *args, **kwargs), etag, last_modified)
+        return self.patch_caching(response, private)
+
+    async def adispatch_conditional(self, request, *args, **kwargs):
+        etag, last_modified, private = await sync_to_async(self.get_conditional_state)()
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.add_validators(await super().dispatch(request, *args, **kwargs), etag, last_modified)
+        return self.patch_caching(response, private)
+
+    def add_validators(self, response, etag, last_modified):
+        if response.status_code == 200:
+            if etag:
+                response.headers.setdefault("ETag", etag)
+            if last_modified:
+                response.headers.setdefault("Last-Modified", http_date(last_modified))
+        return response
+
+    def patch_caching(self, response, private):
+        if private or response.cookies:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=getattr(settings, "QUIZ_PUBLIC_CACHE_MAX_AGE", 0))
+        patch_vary_headers(response, ["Cookie"])
+        return response
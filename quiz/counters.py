@@ -0,0 +1,130 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class PopularityBuffer:
+    """
+    Write-behind buffer for quiz popularity.
+    Increments are kept in memory and applied in bulk as atomic ``F("popularity") + n``
+    updates, at most every ``QUIZ_POPULARITY_FLUSH_INTERVAL`` seconds or as soon as
+    ``QUIZ_POPULARITY_FLUSH_THRESHOLD`` increments are pending.
+
+    Besides the flushes after requests, a daemon thread of every process can flush each
+    interval (``QUIZ_POPULARITY_FLUSH_TIMER``), so idle processes do not sit on increments.
+    Increments pending when a process is killed are lost, at most an interval's worth.
+    """
+
+    def __init__(self):
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # the timer thread does not survive a fork, children start their own
+        self._timer_pid = None
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, "QUIZ_POPULARITY_FLUSH_INTERVAL", 10)
+
+    @property
+    def flush_threshold(self):
+        return getattr(settings, "QUIZ_POPULARITY_FLUSH_THRESHOLD", 500)
+
+    def increment(self, quiz_id, amount=1):
+        with self._lock:
+            self._pending[quiz_id] += amount
+        if self._timer_pid != os.getpid():
+            self.start_timer()
+
+    def start_timer(self):
+        """Start the thread flushing the buffer every interval, if ``QUIZ_POPULARITY_FLUSH_TIMER`` is on."""
+
+        if not getattr(settings, "QUIZ_POPULARITY_FLUSH_TIMER", False):
+            return
+        with self._lock:
+            if self._timer_pid == os.getpid():
+                return
+            self._timer_pid = os.getpid()
+        threading.Thread(target=self._run_timer, name="popularity-flush", daemon=True).start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                if self.flush_if_due():
+                    # the connections of this thread
+                    connections.close_all()
+            except Exception:
+                # the thread must outlive any error, or the process stops flushing for good
+                logger.exception("The popularity flush timer failed")
+
+    def pending(self, quiz_id):
+        """Return the number of increments of a quiz not yet written to the database."""
+        return self._pending.get(quiz_id, 0)
+
+    def is_due(self):
+        with self._lock:
+            if not self._pending:
+                return False
+            elapsed = time.monotonic() - self._last_flush
+            return elapsed >= self.flush_interval or sum(self._pending.values()) >= self.flush_threshold
+
+    def flush(self):
+        """Apply the pending increments, issuing one UPDATE per distinct increment size."""
+        from .conditional import touch_popularity
+        from .models import Quiz
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        quiz_ids_by_amount = defaultdict(list)
+        for quiz_id, amount in pending.items():
+            quiz_ids_by_amount[amount].append(quiz_id)
+        try:
+            with transaction.atomic():
+                for amount, quiz_ids in quiz_ids_by_amount.items():
+                    Quiz.objects.filter(id__in=quiz_ids).update(popularity=F("popularity") + amount)
+        except Exception:
+            # keep the increments for the next flush
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        touch_popularity(*pending)
+        return sum(pending.values())
+
+    def flush_if_due(self):
+        """
+        Flush if due. Errors are logged, not raised: the increments stay pending for the next
+        flush, and neither the timer thread nor the request that triggered the flush fails.
+        """
+
+        try:
+            if not self.is_due():
+                return 0
+            return self.flush()
+        except Exception:
+            logger.exception("Could not flush pending quiz popularity")
+            return 0
+
+
+popularity_buffer = PopularityBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        popularity_buffer.flush()
+    except Exception as exc:
+        logger.warning("Could not flush pending quiz popularity on exit: %s", exc)
@@ -13,3 +13,10 @@ class QuizFilter(django_filters.FilterSet):
     class Meta:
         model = Quiz
         fields = ["difficulty_level"]
+
+
+class QuizApiFilter(QuizFilter):
+    category = django_filters.NumberFilter(field_name="category_id")
+
+    class Meta(QuizFilter.Meta):
+        fields = ["difficulty_level", "category"]
@@ -1,6 +1,71 @@
 from django import forms
 
+from .bank_io import FORMATS
 from .models import Question
+from .result_export import FORMATS as RESULT_FORMATS, filter_results
+from .search import get_search_backend
+
+
+class AnswerChoiceField(forms.ChoiceField):
+    """Radio field whose submitted answer is validated against a precomputed set of answer ids."""
+
+    def __init__(self, *, answer_ids, **kwargs):
+        super().__init__(**kwargs)
+        self.answer_ids = answer_ids
+
+    def valid_value(self, value):
+        return value in self.answer_ids
+
+
+class MultipleAnswerChoiceField(forms.MultipleChoiceField):
+    """Checkbox field whose submitted answers are validated against a precomputed set of answer ids."""
+
+    def __init__(self, *, answer_ids, **kwargs):
+        super().__init__(**kwargs)
+        self.answer_ids = answer_ids
+
+    def valid_value(self, value):
+        return value in self.answer_ids
+
+
+class FieldSpec:
+    """Everything needed to instantiate the form field of a question, compiled once per question."""
+
+    __slots__ = ("name", "label", "multiple", "choices", "answer_ids")
+
+    def __init__(self, question):
+        answers = question.get_answers()
+        self.name = f"question_{question.id}"
+        self.label = question.text
+        self.multiple = question.question_type == Question.QuestionType.MULTI_SELECT_MULTIPLE_CHOICE
+        self.choices = tuple((answer.id, answer.text) for answer in answers)
+        self.answer_ids = frozenset(str(answer.id) for answer in answers)
+
+    def build(self):
+        if self.multiple:
+            # checkbox for MSMC questions
+            return MultipleAnswerChoiceField(
+                label=self.label,
+                choices=self.choices,
+                answer_ids=self.answer_ids,
+                widget=forms.CheckboxSelectMultiple(attrs={"class": "form-check-input"}),
+            )
+        # handles Multiple Choice question type
+        return AnswerChoiceField(
+            label=self.label,
+            choices=self.choices,
+            answer_ids=self.answer_ids,
+            widget=forms.RadioSelect(attrs={"class": "form-check-input"}),
+        )
+
+
+def get_field_spec(question):
+    """
+    Return the compiled field spec of a question.
+    Question snapshots are built with theirs, once per cached content version.
+    """
+
+    return getattr(question, "field_spec", None) or FieldSpec(question)
 
 
 class QuizForm(forms.Form):
@@ -8,21 +73,8 @@ class QuizForm(forms.Form):
         questions = kwargs.pop("questions", [])
         super(QuizForm, self).__init__(*args, **kwargs)
         for question in questions:
-            if question.question_type == Question.QuestionType.MULTI_SELECT_MULTIPLE_CHOICE:
-                choice_list = [(answer.id, answer.text) for answer in question.get_answers()]
-                # checkbox for MSMC questions
-                self.fields[f"question_{question.id}"] = forms.MultipleChoiceField(
-                    label=question.text,
-                    choices=choice_list,
-                    widget=forms.CheckboxSelectMultiple(attrs={"class": "form-check-input"}),
-                )
-            else:  # handles Multiple Choice question type
-                choice_list = [(answer.id, answer.text) for answer in question.get_answers()]
-                self.fields[f"question_{question.id}"] = forms.ChoiceField(
-                    label=question.text,
-                    choices=choice_list,
-                    widget=forms.RadioSelect(attrs={"class": "form-check-input"}),
-                )
+            spec = get_field_spec(question)
+            self.fields[spec.name] = spec.build()
 
 
 class QuizSearchForm(forms.Form):
@@ -32,3 +84,37 @@ class QuizSearchForm(forms.Form):
             attrs={"class": "form-control", "placeholder": "Search quizzes"}
         ),
     )
+
+    def search(self, queryset):
+        """Narrow a quiz queryset down to the matches of the search query, ranked by relevance."""
+        query = self.cleaned_data.get("q", "").strip()
+        if not query:
+            return queryset
+        return get_search_backend().search(queryset, query)
+
+
+class QuestionBankImportForm(forms.Form):
+    file = forms.FileField(help_text="One question per line (JSON Lines) or one answer per row (CSV).")
+    format = forms.ChoiceField(choices=[(format, format.upper()) for format in FORMATS])
+
+
+class ResultExportForm(forms.Form):
+    format = forms.ChoiceField(choices=[(format, format.upper()) for format in RESULT_FORMATS])
+    quiz = forms.IntegerField(required=False, min_value=1, help_text="Only results of this quiz id.")
+    category = forms.IntegerField(required=False, min_value=1, help_text="Only results of this category id.")
+    since = forms.DateField(required=False, help_text="First submission date to include.")
+    until = forms.DateField(required=False, help_text="Last submission date to include.")
+    after = forms.IntegerField(
+        required=False, min_value=0, help_text="Resume after this result id, the last one already exported."
+    )
+    compress = forms.BooleanField(required=False, label="Gzip")
+
+    def filter_results(self):
+        data = self.cleaned_data
+        return filter_results(
+            quiz_ids=[data["quiz"]] if data["quiz"] else None,
+            category_ids=[data["category"]] if data["category"] else None,
+            since=data["since"],
+            until=data["until"],
+            after_id=data["after"],
+        )
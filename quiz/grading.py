@@ -0,0 +1,90 @@
+from .models import Question
+from .question_bank import get_question_bank
+
+
+def get_answer_key(quiz_id):
+    """
+    Return the answer key of a quiz from its cached question bank.
+    Maps every question id to a ``(question_type, frozenset(correct_answer_ids))`` pair.
+    """
+
+    return get_question_bank(quiz_id).answer_key
+
+
+def grade_answers(answer_key, cleaned_data):
+    """
+    Grade every answered question of a quiz form.
+    Yields ``(question_id, selected_answer_ids, is_correct)`` for each question.
+    """
+
+    for field_name, value in cleaned_data.items():
+        if not field_name.startswith("question_"):
+            continue
+        question_id = int(field_name.removeprefix("question_"))
+        question_type, correct_answer_ids = answer_key.get(question_id, (None, frozenset()))
+
+        if question_type == Question.QuestionType.MULTI_SELECT_MULTIPLE_CHOICE:
+            selected_answer_ids = list(map(int, value))
+            # only count score if all the submitted answers are correct without incorrect answer
+            is_correct = all(answer_id in correct_answer_ids for answer_id in selected_answer_ids)
+        else:  # handles Multiple Choice question type
+            selected_answer_ids = [int(value)]
+            is_correct = selected_answer_ids[0] in correct_answer_ids
+        yield question_id, selected_answer_ids, is_correct
+
+
+def grade_submission(answer_key, cleaned_data):
+    """
+    Grade the submitted answers of a quiz form in memory.
+    Returns the number of correctly answered questions, the number of graded
+    questions and the list of submitted answer ids.
+    """
+
+    score = 0
+    total_questions = 0
+    submitted_answers_ids = []
+
+    for _, selected_answer_ids, is_correct in grade_answers(answer_key, cleaned_data):
+        total_questions += 1
+        submitted_answers_ids.extend(selected_answer_ids)
+        if is_correct:
+            score += 1
+
+    return score, total_questions, submitted_answers_ids
+
+
+def build_question_results(questions, submitted_answers_ids):
+    """
+    Prepare the result page in a single pass over the answers.
+    For every question, lists its answers with selected/correct flags and the text
+    of its correct answers, so the template only has to iterate.
+    """
+
+    submitted_answers_ids = set(submitted_answers_ids)
+    question_results = []
+    for question in questions:
+        answers = []
+        correct_answers = []
+        for answer in question.get_answers():
+            answers.append(
+                {
+                    "text": answer.text,
+                    "is_selected": answer.id in submitted_answers_ids,
+                    "is_correct": answer.is_correct,
+                }
+            )
+            if answer.is_correct:
+                correct_answers.append(answer.text)
+        question_results.append(
+            {
+                "text": question.text,
+                "input_type": (
+                    "checkbox"
+                    if question.question_type == Question.QuestionType.MULTI_SELECT_MULTIPLE_CHOICE
+                    else "radio"
+                ),
+                "answers": answers,
+                "correct_answers": correct_answers,
+            }
+        )
+    return question_results
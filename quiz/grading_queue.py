@@ -0,0 +1,158 @@
+"""
+Database-backed queue of quiz submissions.
+
+With ``QUIZ_GRADING_QUEUE`` set, the submission view only stores the answers in a
+``GradingJob`` and redirects to the result page of the attempt, which waits until
+a ``grade_submissions`` worker has graded the job and saved its result.
+"""
+
+import logging
+import os
+import socket
+from collections import Counter
+from datetime import timedelta
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .analytics import record_responses
+from .category_counters import add_to_category
+from .counters import popularity_buffer
+from .models import Attempt, GradingJob, Result, UserQuizSummary
+
+logger = logging.getLogger(__name__)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def release_stale_jobs(stale_after):
+    """Put back the jobs claimed by workers that died before finishing them."""
+
+    return GradingJob.objects.filter(
+        status=GradingJob.Status.RUNNING, claimed_at__lt=timezone.now() - timedelta(seconds=stale_after)
+    ).update(status=GradingJob.Status.PENDING, worker="")
+
+
+def claim_jobs(worker, batch_size):
+    """
+    Claim up to ``batch_size`` pending jobs, oldest first, for this worker.
+    The claim is a conditional UPDATE, so concurrent workers never claim the same job.
+    """
+
+    pending = GradingJob.objects.filter(status=GradingJob.Status.PENDING).order_by("created_at", "id")
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        job_ids = list(pending.values_list("id", flat=True)[:batch_size])
+        GradingJob.objects.filter(id__in=job_ids, status=GradingJob.Status.PENDING).update(
+            status=GradingJob.Status.RUNNING, worker=worker, claimed_at=timezone.now()
+        )
+    return list(
+        GradingJob.objects.filter(id__in=job_ids, status=GradingJob.Status.RUNNING, worker=worker).select_related(
+            "attempt__quiz"
+        )
+    )
+
+
+def lock_claimed(jobs, worker):
+    """
+    Return the jobs still claimed by ``worker``, locked until the end of the transaction.
+    A job released as stale may have been claimed by another worker meanwhile, which then
+    saves it instead. The conditional UPDATE takes the locks before the jobs are read back.
+    """
+
+    if not jobs:
+        return []
+    claimed = GradingJob.objects.filter(
+        id__in=[job.id for job in jobs], status=GradingJob.Status.RUNNING, worker=worker
+    )
+    claimed.update(claimed_at=timezone.now())
+    claimed_ids = set(claimed.values_list("id", flat=True))
+    if len(claimed_ids) < len(jobs):
+        logger.warning("%d jobs were claimed by another worker", len(jobs) - len(claimed_ids))
+    return [job for job in jobs if job.id in claimed_ids]
+
+
+def fail_job(job, error, max_tries):
+    job.tries += 1
+    job.error = error
+    job.worker = ""
+    job.status = GradingJob.Status.FAILED if job.tries >= max_tries else GradingJob.Status.PENDING
+
+
+def grade_jobs(jobs, max_tries=3):
+    """
+    Grade the claimed jobs and save their results, summaries and grades in one transaction.
+    Returns the number of graded jobs; failed jobs are retried until ``max_tries``.
+    """
+
+    if not jobs:
+        return 0
+    # fail_job releases the jobs it fails
+    worker = jobs[0].worker
+    graded = []
+    failed = []
+    for job in jobs:
+        quiz = job.attempt.quiz
+        try:
+            score, score_percentage, passed, submitted_answers_ids = quiz.calculate_score(
+                job.answers, attempt=job.attempt
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            fail_job(job, f"Could not grade the answers: {exc!r}", max_tries)
+            failed.append(job)
+            continue
+        job.score = score
+        job.score_percentage = score_percentage
+        job.passed = passed
+        job.submitted_answers_ids = submitted_answers_ids
+        graded.append(job)
+
+    try:
+        with transaction.atomic():
+            graded = lock_claimed(graded, worker)
+            for job in [job for job in graded if job.attempt.submitted_at is not None]:
+                # graded in a request already, Result.attempt is unique
+                fail_job(job, "The attempt was already submitted.", max_tries=0)
+                graded.remove(job)
+                failed.append(job)
+            finished_at = timezone.now()
+            Attempt.objects.filter(id__in=[job.attempt_id for job in graded]).update(submitted_at=finished_at)
+            results = Result.objects.bulk_create(
+                [
+                    Result(
+                        quiz=job.attempt.quiz, user_id=job.attempt.user_id, score=job.score_percentage, attempt=job.attempt
+                    )
+                    for job in graded
+                ]
+            )
+            # bulk_create sends no post_save, count the attempts here
+            for category_id, attempts in Counter(job.attempt.quiz.category_id for job in graded).items():
+                add_to_category(category_id, attempts=attempts)
+            for job, result in zip(graded, results):
+                UserQuizSummary.record(result, job.attempt.quiz.pass_percentage)
+                record_responses(result, job.answers, bank=job.attempt.question_bank)
+                job.result = result
+                job.status = GradingJob.Status.DONE
+                job.error = ""
+                job.finished_at = finished_at
+            GradingJob.objects.bulk_update(
+                graded,
+                ["status", "error", "finished_at", "result", "score", "score_percentage", "passed", "submitted_answers_ids"],
+            )
+    except DatabaseError as exc:
+        logger.exception("Could not save a batch of %d graded submissions", len(graded))
+        for job in graded:
+            fail_job(job, f"Could not save the result: {exc!r}", max_tries)
+        failed.extend(graded)
+        graded = []
+
+    if failed:
+        with transaction.atomic():
+            GradingJob.objects.bulk_update(lock_claimed(failed, worker), ["status", "tries", "error", "worker"])
+    for job in graded:
+        job.attempt.quiz.increment_popularity()
+    popularity_buffer.flush_if_due()
+    return len(graded)
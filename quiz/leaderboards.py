@@ -0,0 +1,148 @@
+"""
+Per-quiz leaderboards of best scores and a global leaderboard of total scores.
+
+Every board keeps a histogram of its scores in ``LeaderboardBucket`` rows, updated
+with the summaries. The rank of a score is one plus the entries in the buckets
+above it plus the better entries in its own bucket, so it costs a sum over at most
+a few hundred rows and an index range count, however many users are ranked.
+Tied scores are ordered by when they were first reached, so the order of a board
+only changes with its scores, and its top is cached until one of them changes.
+"""
+
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import LeaderboardBucket, UserQuizSummary, UserScore
+
+GLOBAL_BOARD = "global"
+LEADERBOARD_KEY = "quiz:leaderboard:{board}"
+# quiz scores are percentages, totals add up to a hundred points per quiz
+QUIZ_BUCKET_WIDTH = 1
+GLOBAL_BUCKET_WIDTH = 100
+
+
+def quiz_board(quiz_id):
+    return f"quiz:{quiz_id}"
+
+
+def bucket_width(board):
+    return GLOBAL_BUCKET_WIDTH if board == GLOBAL_BOARD else QUIZ_BUCKET_WIDTH
+
+
+def bucket_of(board, score):
+    return int(score // bucket_width(board))
+
+
+def board_rows(board):
+    """Return the entries of a board, best first, and the name of their score field."""
+
+    if board == GLOBAL_BOARD:
+        return UserScore.objects.order_by("-total_score", "user_id"), "total_score"
+    quiz_id = int(board.removeprefix("quiz:"))
+    rows = UserQuizSummary.objects.filter(quiz_id=quiz_id).order_by("-best_score", "best_score_at", "id")
+    return rows, "best_score"
+
+
+def move_entry(board, old_score, new_score):
+    """
+    Move an entry of a board from the bucket of ``old_score`` to the bucket of ``new_score``;
+    ``None`` stands for no entry. Call it in the transaction that changed the score.
+    """
+
+    changes = Counter()
+    if old_score is not None:
+        changes[bucket_of(board, old_score)] -= 1
+    if new_score is not None:
+        changes[bucket_of(board, new_score)] += 1
+    changes = {bucket: delta for bucket, delta in changes.items() if delta}
+
+    if changes:
+        LeaderboardBucket.objects.bulk_create(
+            [LeaderboardBucket(board=board, bucket=bucket) for bucket in changes], ignore_conflicts=True
+        )
+        for bucket, delta in changes.items():
+            LeaderboardBucket.objects.filter(board=board, bucket=bucket).update(count=F("count") + delta)
+    # the order within a bucket may have changed even if no entry changed buckets
+    key = LEADERBOARD_KEY.format(board=board)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def record_best_score(summary, previous_best_score, previously_passed):
+    """Update the leaderboards after the best score of a summary changed."""
+
+    move_entry(quiz_board(summary.quiz_id), previous_best_score, summary.best_score)
+
+    user_score, created = UserScore.objects.select_for_update().get_or_create(user_id=summary.user_id)
+    previous_total_score = None if created else user_score.total_score
+    user_score.total_score += summary.best_score - (previous_best_score or 0)
+    user_score.quizzes_taken += previous_best_score is None
+    user_score.quizzes_passed += summary.passed - previously_passed
+    user_score.save(update_fields=["total_score", "quizzes_taken", "quizzes_passed"])
+    move_entry(GLOBAL_BOARD, previous_total_score, user_score.total_score)
+
+
+def get_top(board):
+    """Return the cached top ``QUIZ_LEADERBOARD_SIZE`` entries of a board as dicts with their rank."""
+
+    key = LEADERBOARD_KEY.format(board=board)
+    entries = cache.get(key)
+    if entries is None:
+        rows, score_field = board_rows(board)
+        rows = rows.values_list("user_id", "user__username", score_field)[: getattr(settings, "QUIZ_LEADERBOARD_SIZE", 20)]
+        entries = []
+        for position, (user_id, username, score) in enumerate(rows):
+            # tied scores share the rank of the first of them
+            rank = entries[-1]["rank"] if entries and entries[-1]["score"] == score else position + 1
+            entries.append({"rank": rank, "user_id": user_id, "username": username, "score": score})
+        cache.set(key, entries, getattr(settings, "QUIZ_LEADERBOARD_CACHE_TIMEOUT", 300))
+    return entries
+
+
+def get_rank(board, score):
+    """Return the rank of a score on a board: one plus the number of strictly better entries."""
+
+    bucket = bucket_of(board, score)
+    above = LeaderboardBucket.objects.filter(board=board, bucket__gt=bucket).aggregate(count=Sum("count"))["count"]
+    rows, score_field = board_rows(board)
+    better_in_bucket = rows.filter(
+        **{f"{score_field}__gt": score, f"{score_field}__lt": (bucket + 1) * bucket_width(board)}
+    ).count()
+    return 1 + (above or 0) + better_in_bucket
+
+
+def rebuild_leaderboards():
+    """Recompute the global totals and every bucket from the summaries."""
+
+    totals = (
+        UserQuizSummary.objects.values("user_id")
+        .annotate(
+            total_score=Sum("best_score"),
+            quizzes_taken=Count("id"),
+            quizzes_passed=Count("id", filter=Q(passed=True)),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        UserScore.objects.all().delete()
+        user_scores = UserScore.objects.bulk_create([UserScore(**row) for row in totals], batch_size=1000)
+
+        buckets = Counter()
+        summaries = UserQuizSummary.objects.values_list("quiz_id", "best_score").iterator(chunk_size=5000)
+        for quiz_id, best_score in summaries:
+            board = quiz_board(quiz_id)
+            buckets[board, bucket_of(board, best_score)] += 1
+        for user_score in user_scores:
+            buckets[GLOBAL_BOARD, bucket_of(GLOBAL_BOARD, user_score.total_score)] += 1
+
+        LeaderboardBucket.objects.all().delete()
+        LeaderboardBucket.objects.bulk_create(
+            [LeaderboardBucket(board=board, bucket=bucket, count=count) for (board, bucket), count in buckets.items()],
+            batch_size=1000,
+        )
+        boards = {board for board, _ in buckets}
+    cache.delete_many([LEADERBOARD_KEY.format(board=board) for board in boards])
+    return len(user_scores)
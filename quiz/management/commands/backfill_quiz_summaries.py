@@ -0,0 +1,105 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum
+
+from quiz.leaderboards import rebuild_leaderboards
+from quiz.models import Result, UserCategorySummary, UserQuizSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user quiz and category summaries from the existing results"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of users whose results are aggregated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_user_id = 0
+        total = 0
+
+        while True:
+            user_ids = list(
+                Result.objects.filter(user_id__gt=last_user_id)
+                .order_by("user_id")
+                .values_list("user_id", flat=True)
+                .distinct()[:chunk_size]
+            )
+            if not user_ids:
+                break
+
+            last_score = (
+                Result.objects.filter(user_id=OuterRef("user_id"), quiz_id=OuterRef("quiz_id"))
+                .order_by("-submitted_date", "-id")
+                .values("score")[:1]
+            )
+            best_score_at = (
+                Result.objects.filter(user_id=OuterRef("user_id"), quiz_id=OuterRef("quiz_id"))
+                .order_by("-score", "submitted_date", "id")
+                .values("submitted_date")[:1]
+            )
+            rows = (
+                Result.objects.filter(user_id__in=user_ids)
+                .values("user_id", "quiz_id", pass_percentage=F("quiz__pass_percentage"))
+                .annotate(
+                    best_score=Max("score"),
+                    last_score=Subquery(last_score),
+                    attempt_count=Count("id"),
+                    last_attempt_at=Max("submitted_date"),
+                    best_score_at=Subquery(best_score_at),
+                )
+                .order_by()
+            )
+            summaries = [
+                UserQuizSummary(
+                    user_id=row["user_id"],
+                    quiz_id=row["quiz_id"],
+                    best_score=row["best_score"],
+                    last_score=row["last_score"],
+                    attempt_count=row["attempt_count"],
+                    last_attempt_at=row["last_attempt_at"],
+                    best_score_at=row["best_score_at"],
+                    passed=row["best_score"] >= row["pass_percentage"],
+                )
+                for row in rows
+            ]
+            with transaction.atomic():
+                UserQuizSummary.objects.bulk_create(
+                    summaries,
+                    update_conflicts=True,
+                    unique_fields=["user", "quiz"],
+                    update_fields=[
+                        "best_score", "best_score_at", "last_score", "attempt_count", "last_attempt_at", "passed"
+                    ],
+                )
+                self.rebuild_category_summaries(user_ids)
+
+            total += len(summaries)
+            last_user_id = user_ids[-1]
+            self.stdout.write(f"Rebuilt {total} summaries (up to user {last_user_id}).")
+
+        self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt {total} quiz summaries."))
+
+        ranked = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt the leaderboards of {ranked} users."))
+
+    def rebuild_category_summaries(self, user_ids):
+        rows = (
+            UserQuizSummary.objects.filter(user_id__in=user_ids)
+            .values("user_id", category_id=F("quiz__category_id"))
+            .annotate(
+                quizzes_taken=Count("id"),
+                quizzes_passed=Count("id", filter=Q(passed=True)),
+                attempt_count=Sum("attempt_count"),
+                best_score_sum=Sum("best_score"),
+                last_attempt_at=Max("last_attempt_at"),
+            )
+            .order_by()
+        )
+        category_summaries = [UserCategorySummary(**row) for row in rows]
+        UserCategorySummary.objects.filter(user_id__in=user_ids).delete()
+        UserCategorySummary.objects.bulk_create(category_summaries)
@@ -0,0 +1,77 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from quiz.benchmarks import SCENARIOS, check_budgets, run_benchmarks
+
+DEFAULT_BUDGETS = Path(__file__).resolve().parents[2] / "benchmarks" / "budgets.json"
+
+
+class Command(BaseCommand):
+    help = "Benchmark the quiz views (latency percentiles and SQL query counts) against the current database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(SCENARIOS),
+            help="Scenario to run, may be repeated. Runs every scenario by default.",
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--budgets", default=str(DEFAULT_BUDGETS), help="JSON file of per-scenario budgets.")
+        parser.add_argument("--no-budgets", action="store_true", help="Report only, never fail.")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument("--compare", help="Previous JSON report to print the p50 and query count changes against.")
+
+    def handle(self, *args, **options):
+        names = options["scenario"] or list(SCENARIOS)
+        # the test client talks to "testserver"
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            try:
+                scenarios = run_benchmarks(names, options["iterations"], options["warmup"])
+            except ValueError as exc:
+                raise CommandError(exc)
+
+        report = {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "iterations": options["iterations"],
+            },
+            "scenarios": scenarios,
+        }
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if options["compare"]:
+            self.compare(json.loads(Path(options["compare"]).read_text())["scenarios"], scenarios)
+
+        if not options["no_budgets"]:
+            budgets = json.loads(Path(options["budgets"]).read_text())
+            violations = check_budgets(scenarios, budgets)
+            if violations:
+                raise CommandError("Benchmark budgets exceeded:\n" + "\n".join(violations))
+            self.stderr.write(self.style.SUCCESS("All benchmark budgets met."))
+
+    def compare(self, previous, current):
+        for name, measured in current.items():
+            before = previous.get(name)
+            if not before:
+                continue
+            change = (measured["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+            self.stderr.write(
+                f"{name}: p50 {before['p50_ms']} -> {measured['p50_ms']} ms ({change:+.1f}%), "
+                f"queries {before['queries']} -> {measured['queries']}"
+            )
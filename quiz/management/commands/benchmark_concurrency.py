@@ -0,0 +1,113 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from quiz.benchmarks.concurrency import SCENARIOS, SERVERS, run_concurrency_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark requests/sec and p99 of the read-only quiz views under concurrent load, "
+        "comparing WSGI with sync views against ASGI with async views"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--server",
+            choices=SERVERS,
+            help="Run only this handler with the views routed in this process. Compares both by default.",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(SCENARIOS),
+            help="Scenario to run, may be repeated. Runs every scenario by default.",
+        )
+        parser.add_argument("--requests", type=int, default=500, help="Requests per scenario.")
+        parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight.")
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options["server"]:
+            report = {options["server"]: self.run(options)}
+        else:
+            # the views are routed when the URLconf is imported, so each handler runs in its own process
+            report = {
+                "wsgi": self.run_subprocess("wsgi", async_views=False, options=options),
+                "asgi": self.run_subprocess("asgi", async_views=True, options=options),
+            }
+
+        output = json.dumps(
+            {
+                "meta": {
+                    "created_at": timezone.now().isoformat(),
+                    "python": platform.python_version(),
+                    "django": django.get_version(),
+                    "database": connection.vendor,
+                    "requests": options["requests"],
+                    "concurrency": options["concurrency"],
+                },
+                "servers": report,
+            },
+            indent=2,
+        )
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        if len(report) == 2:
+            self.compare(report["wsgi"]["scenarios"], report["asgi"]["scenarios"])
+
+    def run(self, options):
+        names = options["scenario"] or list(SCENARIOS)
+        # the test client talks to "testserver"
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            try:
+                scenarios = run_concurrency_benchmarks(
+                    options["server"], names, options["requests"], options["concurrency"], options["warmup"]
+                )
+            except ValueError as exc:
+                raise CommandError(exc)
+        return {"async_views": settings.QUIZ_ASYNC_VIEWS, "scenarios": scenarios}
+
+    def run_subprocess(self, server, async_views, options):
+        command = [
+            sys.executable,
+            sys.argv[0],
+            "benchmark_concurrency",
+            f"--server={server}",
+            f"--requests={options['requests']}",
+            f"--concurrency={options['concurrency']}",
+            f"--warmup={options['warmup']}",
+        ]
+        command += [f"--scenario={name}" for name in options["scenario"] or []]
+        self.stderr.write(f"Benchmarking {server}...")
+        completed = subprocess.run(
+            command,
+            env={**os.environ, "QUIZ_ASYNC_VIEWS": "1" if async_views else "0"},
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode:
+            raise CommandError(f"The {server} benchmark failed:\n{completed.stderr}")
+        return json.loads(completed.stdout)["servers"][server]
+
+    def compare(self, wsgi, asgi):
+        for name, measured in wsgi.items():
+            other = asgi[name]
+            self.stderr.write(
+                f"{name}: {measured['requests_per_second']} -> {other['requests_per_second']} req/s, "
+                f"p99 {measured['p99_ms']} -> {other['p99_ms']} ms (wsgi -> asgi)"
+            )
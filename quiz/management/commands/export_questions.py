@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from quiz.bank_io import FORMATS, export_lines, export_records
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Export question banks as JSON Lines or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="jsonl")
+        parser.add_argument("--quiz", type=int, action="append", help="Quiz id to export, may be repeated.")
+        parser.add_argument("--category", type=int, action="append", help="Category id to export, may be repeated.")
+        parser.add_argument("--output", help="File to write to. Defaults to stdout.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Questions read per query.")
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.all()
+        if options["quiz"]:
+            quizzes = quizzes.filter(id__in=options["quiz"])
+        if options["category"]:
+            quizzes = quizzes.filter(category_id__in=options["category"])
+
+        lines = export_lines(export_records(quizzes, chunk_size=options["chunk_size"]), options["format"])
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as output:
+                output.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
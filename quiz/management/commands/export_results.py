@@ -0,0 +1,52 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand
+
+from quiz.result_export import FORMATS, encode_chunks, export_lines, export_records, filter_results
+
+
+class Command(BaseCommand):
+    help = "Stream quiz results as CSV or JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("--quiz", type=int, action="append", help="Quiz id to export, may be repeated.")
+        parser.add_argument("--category", type=int, action="append", help="Category id to export, may be repeated.")
+        parser.add_argument("--since", type=datetime.date.fromisoformat, help="First submission date (YYYY-MM-DD).")
+        parser.add_argument("--until", type=datetime.date.fromisoformat, help="Last submission date (YYYY-MM-DD).")
+        parser.add_argument(
+            "--after-id", type=int, default=None, help="Resume after this result id, the last one already exported."
+        )
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output.")
+        parser.add_argument("--output", help="File to write to. Defaults to stdout.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Results read per query.")
+
+    def handle(self, *args, **options):
+        results = filter_results(
+            quiz_ids=options["quiz"],
+            category_ids=options["category"],
+            since=options["since"],
+            until=options["until"],
+            after_id=options["after_id"],
+        )
+        self.count = 0
+        self.last_id = options["after_id"]
+        records = self.track(export_records(results, chunk_size=options["chunk_size"]))
+        chunks = encode_chunks(export_lines(records, options["format"]), compress=options["gzip"])
+
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
+            sys.stdout.flush()
+        self.stderr.write(f"Exported {self.count} results, last id {self.last_id}.")
+
+    def track(self, records):
+        """Remember the last exported id so an interrupted export can be resumed with --after-id."""
+
+        for record in records:
+            self.count += 1
+            self.last_id = record["id"]
+            yield record
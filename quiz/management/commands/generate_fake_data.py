@@ -1,20 +1,246 @@
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from quiz.factory import QuizFactory, QuestionFactory, AnswerFactory
+from django.db import connections, transaction
+from django.utils import timezone
+
+from quiz.models import Answer, Category, Question, Quiz, Result
+
+User = get_user_model()
+
+CATEGORY_NAMES = [
+    "Science", "History", "Geography", "Mathematics", "Literature",
+    "Programming", "Music", "Sports", "Art", "Technology",
+]
+WORDS = [
+    "atom", "river", "empire", "function", "planet", "novel", "algorithm", "melody",
+    "energy", "border", "theorem", "painting", "network", "battle", "cell", "poem",
+    "matrix", "climate", "protocol", "harmony", "volcano", "dynasty", "vector", "canvas",
+]
+# pass percentage ranges allowed by Quiz.clean for each difficulty level
+PASS_PERCENTAGES = {
+    Quiz.DifficultyLevel.EASY: (40, 60),
+    Quiz.DifficultyLevel.MEDIUM: (50, 70),
+    Quiz.DifficultyLevel.HARD: (75, 90),
+}
+
+
+def sentence(rng, words=6):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def setup_worker():
+    django.setup()
+    # never share the parent's database connections with a forked worker
+    connections.close_all()
+
+
+def generate_quizzes(category_ids, quiz_count, questions_per_quiz, answers_per_question, batch_size, seed):
+    """
+    Insert ``quiz_count`` quizzes with their questions and answers in batches.
+    Runs in the command process or in a worker process; returns the number of rows inserted per model.
+    """
+
+    rng = random.Random(seed)
+    # size the quiz batches so a batch holds about ``batch_size`` questions
+    quizzes_per_batch = max(1, batch_size // (questions_per_quiz or 60))
+    counts = {"quizzes": 0, "questions": 0, "answers": 0}
+
+    for offset in range(0, quiz_count, quizzes_per_batch):
+        size = min(quizzes_per_batch, quiz_count - offset)
+        quizzes = []
+        for _ in range(size):
+            difficulty_level = rng.choice(Quiz.DifficultyLevel.values)
+            number_of_questions = rng.randint(2, 60)
+            quizzes.append(
+                Quiz(
+                    name=sentence(rng, rng.randint(2, 4)),
+                    number_of_questions=number_of_questions,
+                    duration_in_minutes=rng.randint(1, 60),
+                    pass_percentage=rng.randint(*PASS_PERCENTAGES[difficulty_level]),
+                    difficulty_level=difficulty_level,
+                    category_id=rng.choice(category_ids),
+                    popularity=rng.randint(0, 10000),
+                )
+            )
+
+        with transaction.atomic():
+            Quiz.objects.bulk_create(quizzes, batch_size=batch_size)
+            questions = []
+            for quiz in quizzes:
+                for number in range(questions_per_quiz or quiz.number_of_questions):
+                    questions.append(
+                        Question(
+                            text=f"{sentence(rng)} ({number + 1})?",
+                            quiz=quiz,
+                            question_type=rng.choice(Question.QuestionType.values),
+                        )
+                    )
+            Question.objects.bulk_create(questions, batch_size=batch_size)
+
+            answers = []
+            for question in questions:
+                correct = set(rng.sample(range(answers_per_question), 1))
+                if question.question_type == Question.QuestionType.MULTI_SELECT_MULTIPLE_CHOICE:
+                    correct.update(rng.sample(range(answers_per_question), rng.randint(0, answers_per_question - 1)))
+                for number in range(answers_per_question):
+                    answers.append(
+                        Answer(
+                            # numbered so the (question, text) pair stays unique
+                            text=f"{sentence(rng, 3)} {number + 1}",
+                            question=question,
+                            is_correct=number in correct,
+                        )
+                    )
+            Answer.objects.bulk_create(answers, batch_size=batch_size)
+
+        counts["quizzes"] += len(quizzes)
+        counts["questions"] += len(questions)
+        counts["answers"] += len(answers)
+    return counts
 
 
 class Command(BaseCommand):
-    help = "Generate fake data for quizzes"
-
-    def handle(self, *args, **kwargs):
-        quiz_number = 100
-        for _ in range(quiz_number):
-            quiz = QuizFactory()
-            for _ in range(quiz.number_of_questions):
-                question = QuestionFactory(quiz=quiz)
-                for _ in range(4):  # assuming each question has 4 answers
-                    AnswerFactory(question=question)
+    help = "Generate fake quizzes, users and results in bulk for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--quizzes", type=int, default=100, help="Number of quizzes to create.")
+        parser.add_argument(
+            "--questions-per-quiz",
+            type=int,
+            default=None,
+            help="Size of each question bank. Defaults to the quiz's number of questions.",
+        )
+        parser.add_argument("--answers-per-question", type=int, default=4)
+        parser.add_argument("--users", type=int, default=100, help="Number of users to create.")
+        parser.add_argument("--results", type=int, default=1000, help="Number of results to create.")
+        parser.add_argument("--days", type=int, default=365, help="Spread the results over this many past days.")
+        parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible data.")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Rows per INSERT.")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes generating quizzes. SQLite serializes writers, so keep 1 there.",
+        )
+
+    def handle(self, *args, **options):
+        seed = options["seed"] if options["seed"] is not None else random.randrange(2**32)
+        rng = random.Random(seed)
+        batch_size = options["batch_size"]
+        started = time.perf_counter()
+        counts = {}
+
+        counts["categories"] = self.create_categories()
+        category_ids = list(Category.objects.values_list("id", flat=True))
+
+        phase_started = time.perf_counter()
+        counts["users"] = self.create_users(options["users"], seed, batch_size)
+        self.report("users", counts["users"], phase_started)
+
+        phase_started = time.perf_counter()
+        quiz_counts = self.create_quizzes(category_ids, options, seed)
+        counts.update(quiz_counts)
+        self.report("quizzes, questions and answers", sum(quiz_counts.values()), phase_started)
+
+        phase_started = time.perf_counter()
+        counts["results"] = self.create_results(options["results"], options["days"], rng, batch_size)
+        self.report("results", counts["results"], phase_started)
+
+        # bulk inserts bypass the signals maintaining the derived tables
+        call_command("rebuild_search_index", stdout=self.stdout)
+        call_command("backfill_quiz_summaries", stdout=self.stdout)
+        call_command("reconcile_category_counters", stdout=self.stdout)
+
+        total = sum(counts.values())
+        self.report("rows in total", total, started)
         self.stdout.write(
             self.style.SUCCESS(
-                f"Successfully generated {quiz_number} quizzes with questions and answers."
+                "Successfully generated "
+                + ", ".join(f"{count} {name}" for name, count in counts.items())
+                + f" (seed {seed})."
             )
         )
+
+    def report(self, label, rows, started):
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed else 0
+        self.stdout.write(f"Inserted {rows} {label} in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+
+    def create_categories(self):
+        existing = set(Category.objects.values_list("name", flat=True))
+        categories = [Category(name=name) for name in CATEGORY_NAMES if name not in existing]
+        Category.objects.bulk_create(categories)
+        return len(categories)
+
+    def create_users(self, user_count, seed, batch_size):
+        # hashing is deliberately slow, so every fake user shares one hash
+        password = make_password("password")
+        prefix = f"user-{seed}-"
+        users = [
+            User(username=f"{prefix}{number}", email=f"{prefix}{number}@example.com", password=password)
+            for number in range(user_count)
+        ]
+        # ignore_conflicts skips the users of an earlier run with this seed without saying so
+        existing = User.objects.filter(username__startswith=prefix).count()
+        User.objects.bulk_create(users, batch_size=batch_size, ignore_conflicts=True)
+        return User.objects.filter(username__startswith=prefix).count() - existing
+
+    def create_quizzes(self, category_ids, options, seed):
+        quiz_count = options["quizzes"]
+        workers = max(1, min(options["workers"], quiz_count))
+        arguments = [
+            (
+                category_ids,
+                quiz_count // workers + (1 if number < quiz_count % workers else 0),
+                options["questions_per_quiz"],
+                options["answers_per_question"],
+                options["batch_size"],
+                seed + number,
+            )
+            for number in range(workers)
+        ]
+        if workers == 1:
+            return generate_quizzes(*arguments[0])
+
+        connections.close_all()
+        counts = {"quizzes": 0, "questions": 0, "answers": 0}
+        with ProcessPoolExecutor(max_workers=workers, initializer=setup_worker) as executor:
+            for worker_counts in executor.map(generate_quizzes, *zip(*arguments)):
+                for name, count in worker_counts.items():
+                    counts[name] += count
+        return counts
+
+    def create_results(self, result_count, days, rng, batch_size):
+        user_ids = list(User.objects.values_list("id", flat=True))
+        quizzes = list(Quiz.objects.values_list("id", "number_of_questions"))
+        if not user_ids or not quizzes:
+            return 0
+
+        for offset in range(0, result_count, batch_size):
+            results = []
+            for _ in range(min(batch_size, result_count - offset)):
+                quiz_id, number_of_questions = rng.choice(quizzes)
+                correct = rng.randint(0, number_of_questions)
+                results.append(
+                    Result(
+                        quiz_id=quiz_id,
+                        user_id=rng.choice(user_ids),
+                        score=round(correct / number_of_questions * 100, 2),
+                    )
+                )
+            now = timezone.now()
+            with transaction.atomic():
+                Result.objects.bulk_create(results)
+                # submitted_date is auto_now, which bulk_create applies and bulk_update does not
+                for result in results:
+                    result.submitted_date = now - timedelta(seconds=rng.randint(0, days * 24 * 60 * 60))
+                Result.objects.bulk_update(results, ["submitted_date"], batch_size=batch_size)
+        return result_count
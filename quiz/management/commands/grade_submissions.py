@@ -0,0 +1,70 @@
+import multiprocessing
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from quiz.grading_queue import claim_jobs, grade_jobs, release_stale_jobs, worker_name
+
+
+def work(batch_size, poll_interval, max_tries, stale_after, once):
+    """Grade queued submissions until the queue is empty with ``once``, or forever."""
+
+    worker = worker_name()
+    graded = 0
+    while True:
+        release_stale_jobs(stale_after)
+        jobs = claim_jobs(worker, batch_size)
+        if jobs:
+            graded += grade_jobs(jobs, max_tries=max_tries)
+        elif once:
+            return graded
+        else:
+            time.sleep(poll_interval)
+
+
+def run_worker_process(*args):
+    django.setup()
+    # never share the parent's database connections with a forked worker
+    connections.close_all()
+    work(*args)
+
+
+class Command(BaseCommand):
+    help = "Grade the quiz submissions queued while QUIZ_GRADING_QUEUE is enabled"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Jobs claimed and saved together.")
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes to run.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--max-tries", type=int, default=3, help="Tries before a job is marked as failed.")
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=300,
+            help="Seconds after which a job claimed by a worker that did not finish it is queued again.",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        arguments = (
+            options["batch_size"],
+            options["poll_interval"],
+            options["max_tries"],
+            options["stale_after"],
+            options["once"],
+        )
+        if options["processes"] <= 1:
+            graded = work(*arguments)
+            self.stdout.write(self.style.SUCCESS(f"Graded {graded} submissions."))
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=run_worker_process, args=arguments) for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.bank_io import FORMATS, QuestionBankImporter, read_records
+
+
+class Command(BaseCommand):
+    help = "Import question banks from a JSON Lines or CSV file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Questions inserted per transaction.")
+        parser.add_argument(
+            "--update-quizzes",
+            action="store_true",
+            help="Apply the settings in the file to existing quizzes instead of reporting the differences.",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        format = options["format"] or path.suffix.lstrip(".")
+        if format not in FORMATS:
+            raise CommandError(f"Unknown format {format!r}, use --format.")
+
+        importer = QuestionBankImporter(batch_size=options["batch_size"], update_quizzes=options["update_quizzes"])
+        with path.open(newline="", encoding="utf-8") as lines:
+            stats = importer.run(read_records(lines, format))
+
+        for number, error in importer.errors:
+            self.stderr.write(f"Line {number}: {'; '.join(getattr(error, 'messages', [str(error)]))}")
+        for warning in importer.warnings:
+            self.stderr.write(warning)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {stats['quizzes']} quizzes, {stats['questions']} questions and {stats['answers']} answers "
+                f"({stats['updated']} existing quizzes updated, {stats['skipped']} existing questions skipped, "
+                f"{len(importer.errors)} invalid records)."
+            )
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from quiz.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = "Rebuild the global scores and leaderboard buckets from the per-user quiz summaries"
+
+    def handle(self, *args, **options):
+        ranked = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt the leaderboards of {ranked} users."))
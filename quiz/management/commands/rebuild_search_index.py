@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quiz.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the quiz search index"
+
+    def handle(self, *args, **kwargs):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Successfully rebuilt the search index with {type(backend).__name__}.")
+        )
@@ -0,0 +1,77 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, Q, Sum
+from django.db.models.functions import Cast, Round
+
+from quiz.models import Answer, AnswerStats, Question, QuestionResponse, QuestionStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the question and answer stats from the recorded question responses. "
+        "Results saved before responses were recorded cannot be included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of questions whose responses are aggregated per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        last_question_id = 0
+        total = 0
+
+        while True:
+            question_ids = list(
+                Question.objects.filter(id__gt=last_question_id).order_by("id").values_list("id", flat=True)[
+                    :chunk_size
+                ]
+            )
+            if not question_ids:
+                break
+
+            with transaction.atomic():
+                self.rebuild(question_ids)
+
+            total += len(question_ids)
+            last_question_id = question_ids[-1]
+            self.stdout.write(f"Recomputed the stats of {total} questions (up to question {last_question_id}).")
+
+        self.stdout.write(self.style.SUCCESS(f"Successfully recomputed the stats of {total} questions."))
+
+    def rebuild(self, question_ids):
+        responses = QuestionResponse.objects.filter(question_id__in=question_ids)
+        score = Cast(Round("result__score"), IntegerField())
+        rows = (
+            responses.values("question_id")
+            .annotate(
+                times_shown=Count("id"),
+                times_correct=Count("id", filter=Q(is_correct=True)),
+                score_sum=Sum(score),
+                score_square_sum=Sum(score * score),
+                correct_score_sum=Sum(score, filter=Q(is_correct=True), default=0),
+            )
+            .order_by()
+        )
+        question_stats = [QuestionStats(**row) for row in rows]
+
+        selections = Counter()
+        for selected_answers_ids in responses.values_list("selected_answers_ids", flat=True).iterator():
+            selections.update(selected_answers_ids)
+        answer_ids = set(Answer.objects.filter(question_id__in=question_ids).values_list("id", flat=True))
+        answer_stats = [
+            AnswerStats(answer_id=answer_id, times_selected=count)
+            for answer_id, count in selections.items()
+            if answer_id in answer_ids
+        ]
+
+        QuestionStats.objects.filter(question_id__in=question_ids).delete()
+        AnswerStats.objects.filter(answer__question_id__in=question_ids).delete()
+        QuestionStats.objects.bulk_create(question_stats)
+        AnswerStats.objects.bulk_create(answer_stats)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.category_counters import reconcile_category_counters
+
+
+class Command(BaseCommand):
+    help = "Recount the quizzes, questions and attempts of every category and fix the counters that drifted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report the drifted counters, and exit with an error if there are any.",
+        )
+
+    def handle(self, *args, **options):
+        drifted = reconcile_category_counters(fix=not options["check"])
+        for category, field, stored, counted in drifted:
+            self.stdout.write(f"{category} (id {category.id}): {field} is {stored}, counted {counted}.")
+        if drifted and options["check"]:
+            raise CommandError(f"{len(drifted)} category counters drifted.")
+        if drifted:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(drifted)} category counters."))
+        else:
+            self.stdout.write(self.style.SUCCESS("All category counters are correct."))
@@ -0,0 +1,49 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto the replica files of DATABASE_REPLICAS, "
+        "standing in for replication in development and benchmarks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Copy again every this many seconds instead of once.",
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != "sqlite":
+            raise CommandError("Only SQLite databases can be copied onto replicas.")
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No replicas are configured, set DJANGO_DB_REPLICAS.")
+
+        while True:
+            started = time.perf_counter()
+            self.sync()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"Copied the primary onto {len(settings.DATABASE_REPLICAS)} replicas in {elapsed:.2f}s.")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def sync(self):
+        source = sqlite3.connect(settings.DATABASES[DEFAULT_DB_ALIAS]["NAME"])
+        try:
+            for alias in settings.DATABASE_REPLICAS:
+                # the online backup API gives a consistent copy while the primary takes writes
+                target = sqlite3.connect(settings.DATABASES[alias]["NAME"], timeout=20)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+        finally:
+            source.close()
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+SEARCH_INDEX_TABLE = "quiz_search_index"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_INDEX_TABLE} "
+        "USING fts5(name, category, questions, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        f"""
+        INSERT INTO {SEARCH_INDEX_TABLE} (rowid, name, category, questions)
+        SELECT quiz.id, quiz.name, category.name,
+               COALESCE((SELECT group_concat(question.text, ' ')
+                         FROM quiz_question AS question
+                         WHERE question.quiz_id = quiz.id), '')
+        FROM quiz_quiz AS quiz
+        INNER JOIN quiz_category AS category ON category.id = quiz.category_id
+        """
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_INDEX_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0004_userquizsummary"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_gradingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerStats',
+            fields=[
+                ('answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz.answer')),
+                ('times_selected', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Answer stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz.question')),
+                ('times_shown', models.PositiveIntegerField(default=0)),
+                ('times_correct', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('score_square_sum', models.BigIntegerField(default=0)),
+                ('correct_score_sum', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Question stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionResponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('selected_answers_ids', models.JSONField(default=list)),
+                ('is_correct', models.BooleanField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='quiz.question')),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='quiz.result')),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_account_email'),
+        ('quiz', '0007_item_analytics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(max_length=32)),
+                ('bucket', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserScore',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_score', models.FloatField(default=0)),
+                ('quizzes_taken', models.PositiveIntegerField(default=0)),
+                ('quizzes_passed', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['quiz', '-score'], name='quiz_result_quiz_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userquizsummary',
+            index=models.Index(fields=['quiz', '-best_score'], name='quiz_summary_quiz_best_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userscore',
+            index=models.Index(fields=['-total_score'], name='quiz_userscore_total_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leaderboardbucket',
+            unique_together={('board', 'bucket')},
+        ),
+    ]
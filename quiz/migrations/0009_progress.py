@@ -0,0 +1,54 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0008_leaderboards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCategorySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quizzes_taken', models.PositiveIntegerField(default=0)),
+                ('quizzes_passed', models.PositiveIntegerField(default=0)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('best_score_sum', models.FloatField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userquizsummary',
+            name='last_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='result',
+            index=models.Index(fields=['user', '-submitted_date'], name='quiz_result_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userquizsummary',
+            index=models.Index(fields=['user', '-last_attempt_at', '-id'], name='quiz_summary_user_last_idx'),
+        ),
+        migrations.AddField(
+            model_name='usercategorysummary',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='quiz.category'),
+        ),
+        migrations.AddField(
+            model_name='usercategorysummary',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_summaries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='usercategorysummary',
+            unique_together={('user', 'category')},
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:39
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_categories(apps, schema_editor):
+    Category = apps.get_model("quiz", "Category")
+    Quiz = apps.get_model("quiz", "Quiz")
+    Question = apps.get_model("quiz", "Question")
+    Result = apps.get_model("quiz", "Result")
+
+    def count(model, category):
+        rows = model.objects.filter(**{category: OuterRef("pk")}).order_by().values(category)
+        return Coalesce(Subquery(rows.annotate(count=Count("pk")).values("count")), 0, output_field=IntegerField())
+
+    Category.objects.update(
+        quiz_count=count(Quiz, "category"),
+        question_count=count(Question, "quiz__category"),
+        attempt_count=count(Result, "quiz__category"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='quiz_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_categories, migrations.RunPython.noop),
+    ]
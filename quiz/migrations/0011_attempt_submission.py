@@ -0,0 +1,24 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_category_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='result',
+            name='attempt',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='result', to='quiz.attempt'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.13 on 2026-10-18 20:20
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_best_score_at(apps, schema_editor):
+    UserQuizSummary = apps.get_model("quiz", "UserQuizSummary")
+    Result = apps.get_model("quiz", "Result")
+
+    first_best = (
+        Result.objects.filter(user_id=OuterRef("user_id"), quiz_id=OuterRef("quiz_id"))
+        .order_by("-score", "submitted_date", "id")
+        .values("submitted_date")[:1]
+    )
+    UserQuizSummary.objects.update(best_score_at=Subquery(first_best))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_attempt_submission'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='userquizsummary',
+            name='quiz_summary_quiz_best_idx',
+        ),
+        migrations.AddField(
+            model_name='userquizsummary',
+            name='best_score_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='userquizsummary',
+            index=models.Index(fields=['quiz', '-best_score', 'best_score_at', 'id'], name='quiz_summary_quiz_best_idx'),
+        ),
+        migrations.RunPython(backfill_best_score_at, migrations.RunPython.noop),
+    ]
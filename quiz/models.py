@@ -1,15 +1,21 @@
-import random
+import uuid
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
-from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 
 class Category(models.Model):
     name = models.CharField(max_length=255)
+    # maintained by quiz.category_counters, recounted by reconcile_category_counters
+    quiz_count = models.PositiveIntegerField(default=0, editable=False)
+    question_count = models.PositiveIntegerField(default=0, editable=False)
+    attempt_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = "Category"
@@ -18,6 +24,16 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # never write back counters that may have moved since the row was read
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ("quiz_count", "question_count", "attempt_count")
+            ]
+        super().save(*args, **kwargs)
+
 
 class Quiz(models.Model):
     class DifficultyLevel(models.TextChoices):
@@ -72,6 +88,11 @@ class Quiz(models.Model):
         # call the clean method
         # With this wherever you create your object (form, view, shell, test) the validation will be called.
         self.full_clean()
+        # never write back a popularity that may have moved since the row was read
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name != "popularity"
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -83,44 +104,53 @@ class Quiz(models.Model):
     def get_assessment_attempt_url(self):
         return reverse("quiz:quiz_assessment_attempt", kwargs={"pk": self.id})
 
-    def get_questions(self):
-        questions = list(self.questions.prefetch_related("answers"))
-        random.shuffle(questions)
-        return questions[:self.number_of_questions]
+    def get_questions(self, seed=None):
+        """Draw ``number_of_questions`` questions at random; a ``seed`` makes the draw reproducible."""
+        from .sampling import draw_questions
+
+        return draw_questions(self.id, self.number_of_questions, seed=seed)
     
-    def calculate_score(self, cleaned_data):
-        questions = self.get_questions()
-        score = 0
-        submitted_answers_ids = []
-
-        for question in questions:
-            if question.question_type == Question.QuestionType.MULTI_SELECT_MULTIPLE_CHOICE:
-                selected_answer_ids = cleaned_data[f"question_{question.id}"]
-                selected_answers = [get_object_or_404(Answer, id=answer_id) for answer_id in selected_answer_ids]
-                submitted_answers_ids.extend(map(int, selected_answer_ids))
-                # only count score if all the submitted answers are correct without incorrect answer
-                if all(answer.is_correct for answer in selected_answers):
-                    score += 1
-            else:  # handles Multiple Choice question type
-                selected_answer_id = cleaned_data[f"question_{question.id}"]
-                selected_answer = get_object_or_404(Answer, id=selected_answer_id)
-                # convert the datatype 'str' into 'int'
-                submitted_answers_ids.append(int(selected_answer_id))
-                if selected_answer.is_correct:
-                    score += 1
-        
-        total_questions = len(questions)
-        score_percentage = round((score / total_questions) * 100, 2)
+    def start_attempt(self, user, questions):
+        """Record the questions drawn for an attempt so the submission is graded against them."""
+        return Attempt.objects.create(quiz=self, user=user, question_ids=[question.id for question in questions])
+
+    def calculate_score(self, cleaned_data, attempt=None):
+        """Grade the answers, against the questions drawn for the ``attempt`` when it is given."""
+        from .grading import get_answer_key, grade_submission
+
+        answer_key = attempt.question_bank.answer_key if attempt is not None else get_answer_key(self.id)
+        score, total_questions, submitted_answers_ids = grade_submission(answer_key, cleaned_data)
+
+        score_percentage = round((score / total_questions) * 100, 2) if total_questions else 0
         passed = score_percentage >= self.pass_percentage
 
         return score, score_percentage, passed, submitted_answers_ids
 
     def increment_popularity(self):
-        self.popularity += 1
-        self.save()
+        from .counters import popularity_buffer
+
+        popularity_buffer.increment(self.id)
+
+    def get_popularity(self):
+        """Return the popularity including increments not yet flushed to the database."""
+        from .counters import popularity_buffer
+
+        return self.popularity + popularity_buffer.pending(self.id)
     
-    def save_result(self, user, score):
-        result = Result.objects.get_or_create(quiz=self, user=user, score=score)
+    def save_result(self, user, score, answers=None, attempt=None):
+        """
+        Save a result with its summary, and with its item analytics when the answers are given.
+        The result of an ``attempt`` is saved only once: replays return ``None``.
+        """
+        from .analytics import record_responses
+
+        with transaction.atomic():
+            if attempt is not None and not attempt.claim_submission():
+                return None
+            result = Result.objects.create(quiz=self, user=user, score=score, attempt=attempt)
+            UserQuizSummary.record(result, self.pass_percentage)
+            if answers is not None:
+                record_responses(result, answers, bank=attempt.question_bank if attempt is not None else None)
         return result
 
 
@@ -166,8 +196,281 @@ class Answer(models.Model):
 class Result(models.Model):
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="results")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # unset for results imported or saved before attempts were recorded
+    attempt = models.OneToOneField(
+        "Attempt", on_delete=models.SET_NULL, null=True, blank=True, related_name="result"
+    )
     score = models.FloatField()
     submitted_date = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["quiz", "-score"], name="quiz_result_quiz_score_idx"),
+            models.Index(fields=["user", "-submitted_date"], name="quiz_result_user_date_idx"),
+        ]
+
     def __str__(self):
         return f"User: {self.user}, score: {self.score}"
+
+
+class UserQuizSummary(models.Model):
+    """Best and last score and attempt count of a user on a quiz, maintained by ``Quiz.save_result``."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="quiz_summaries")
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="summaries")
+    best_score = models.FloatField(default=0)
+    last_score = models.FloatField(default=0)
+    attempt_count = models.PositiveIntegerField(default=0)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    # when the best score was first reached, which breaks ties on the leaderboard
+    best_score_at = models.DateTimeField(null=True, blank=True)
+    passed = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ("user", "quiz")
+        indexes = [
+            models.Index(fields=["quiz", "-best_score", "best_score_at", "id"], name="quiz_summary_quiz_best_idx"),
+            models.Index(fields=["user", "-last_attempt_at", "-id"], name="quiz_summary_user_last_idx"),
+        ]
+
+    def __str__(self):
+        return f"User: {self.user}, quiz: {self.quiz}, best score: {self.best_score}"
+
+    @classmethod
+    def record(cls, result, pass_percentage):
+        """Fold a new result into the summary row. Must run inside the transaction that saved the result."""
+        from .conditional import bump_summary_version
+        from .leaderboards import record_best_score
+
+        summary, created = cls.objects.select_for_update().get_or_create(
+            user_id=result.user_id, quiz_id=result.quiz_id
+        )
+        previous_best_score = None if created else summary.best_score
+        previously_passed = summary.passed
+        if created or result.score > summary.best_score:
+            summary.best_score = result.score
+            summary.best_score_at = result.submitted_date
+        summary.last_score = result.score
+        summary.attempt_count += 1
+        summary.last_attempt_at = result.submitted_date
+        summary.passed = summary.best_score >= pass_percentage
+        summary.save(
+            update_fields=["best_score", "best_score_at", "last_score", "attempt_count", "last_attempt_at", "passed"]
+        )
+        UserCategorySummary.record(summary, result.quiz.category_id, previous_best_score, previously_passed)
+        bump_summary_version(summary.user_id, summary.quiz_id)
+        if summary.best_score != previous_best_score:
+            record_best_score(summary, previous_best_score, previously_passed)
+        return summary
+
+
+class UserCategorySummary(models.Model):
+    """Totals of the quiz summaries of a user in a category, maintained with them."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="category_summaries")
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="summaries")
+    quizzes_taken = models.PositiveIntegerField(default=0)
+    quizzes_passed = models.PositiveIntegerField(default=0)
+    attempt_count = models.PositiveIntegerField(default=0)
+    best_score_sum = models.FloatField(default=0)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("user", "category")
+
+    def __str__(self):
+        return f"User: {self.user}, category: {self.category}, quizzes taken: {self.quizzes_taken}"
+
+    @property
+    def average_best_score(self):
+        return self.best_score_sum / self.quizzes_taken if self.quizzes_taken else 0
+
+    @classmethod
+    def record(cls, summary, category_id, previous_best_score, previously_passed):
+        """
+        Fold the change of a quiz summary into the category totals; a single UPDATE
+        once the row exists. Must run inside the transaction that saved the summary.
+        """
+
+        increments = {
+            "quizzes_taken": F("quizzes_taken") + int(previous_best_score is None),
+            "quizzes_passed": F("quizzes_passed") + (int(summary.passed) - int(previously_passed)),
+            "attempt_count": F("attempt_count") + 1,
+            "best_score_sum": F("best_score_sum") + (summary.best_score - (previous_best_score or 0)),
+            "last_attempt_at": summary.last_attempt_at,
+        }
+        rows = cls.objects.filter(user_id=summary.user_id, category_id=category_id)
+        if rows.update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user_id=summary.user_id,
+                    category_id=category_id,
+                    quizzes_taken=1,
+                    quizzes_passed=int(summary.passed),
+                    attempt_count=1,
+                    best_score_sum=summary.best_score,
+                    last_attempt_at=summary.last_attempt_at,
+                )
+        except IntegrityError:
+            # created by a concurrent result of the same user in the category
+            rows.update(**increments)
+
+
+class Attempt(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="attempts")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    question_ids = models.JSONField(default=list)
+    started_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"User: {self.user}, quiz: {self.quiz}"
+
+    def claim_submission(self):
+        """
+        Mark the attempt as submitted, unless it already was. The conditional UPDATE lets
+        only one of concurrent submissions through; run it in the transaction saving the result.
+        """
+        submitted_at = timezone.now()
+        if not Attempt.objects.filter(pk=self.pk, submitted_at__isnull=True).update(submitted_at=submitted_at):
+            return False
+        self.submitted_at = submitted_at
+        return True
+
+    @cached_property
+    def question_bank(self):
+        """The bank the attempt is shown and graded from, read once per instance."""
+        from .sampling import get_attempt_bank
+
+        return get_attempt_bank(self.quiz_id, self.question_ids)
+
+    def get_questions(self):
+        """Return the questions of the attempt in the order they were shown."""
+        from .sampling import get_questions
+
+        return get_questions(self.quiz_id, self.question_ids, bank=self.question_bank)
+
+    def get_result_url(self):
+        return reverse("quiz:quiz_attempt_result", kwargs={"pk": self.quiz_id, "attempt_id": self.id})
+
+
+class GradingJob(models.Model):
+    """
+    A submitted attempt waiting to be graded by the ``grade_submissions`` worker.
+    There is at most one job per attempt, so a resubmitted attempt is never counted twice.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    attempt = models.OneToOneField(Attempt, on_delete=models.CASCADE, related_name="grading_job")
+    answers = models.JSONField(default=dict)
+    status = models.CharField(max_length=7, choices=Status.choices, default=Status.PENDING)
+    tries = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # the grade, filled in by the worker
+    result = models.OneToOneField(Result, on_delete=models.SET_NULL, null=True, blank=True, related_name="grading_job")
+    score = models.PositiveIntegerField(null=True, blank=True)
+    score_percentage = models.FloatField(null=True, blank=True)
+    passed = models.BooleanField(null=True, blank=True)
+    submitted_answers_ids = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"{self.attempt}: {self.get_status_display()}"
+
+    @classmethod
+    def enqueue(cls, attempt, cleaned_data):
+        """Queue the submitted answers of an attempt, or return the job already queued for it."""
+        answers = {name: value for name, value in cleaned_data.items() if name.startswith("question_")}
+        job, _ = cls.objects.get_or_create(attempt=attempt, defaults={"answers": answers})
+        return job
+
+
+class QuestionResponse(models.Model):
+    """How a question was answered in a result, recorded for the item analytics."""
+
+    result = models.ForeignKey(Result, on_delete=models.CASCADE, related_name="responses")
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="responses")
+    selected_answers_ids = models.JSONField(default=list)
+    is_correct = models.BooleanField()
+
+    def __str__(self):
+        return f"{self.result}: {self.question}"
+
+
+class QuestionStats(models.Model):
+    """
+    Running aggregates of the responses to a question, updated with every result.
+    Scores are the whole-number percentage of the result, so the sums stay exact.
+    """
+
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    times_shown = models.PositiveIntegerField(default=0)
+    times_correct = models.PositiveIntegerField(default=0)
+    score_sum = models.BigIntegerField(default=0)
+    score_square_sum = models.BigIntegerField(default=0)
+    correct_score_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Question stats"
+
+    def __str__(self):
+        return f"Stats of {self.question}"
+
+
+class AnswerStats(models.Model):
+    answer = models.OneToOneField(Answer, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    times_selected = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Answer stats"
+
+    def __str__(self):
+        return f"Stats of {self.answer}"
+
+
+class UserScore(models.Model):
+    """Totals of the best scores of a user over all quizzes, ranked by the global leaderboard."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="score"
+    )
+    total_score = models.FloatField(default=0)
+    quizzes_taken = models.PositiveIntegerField(default=0)
+    quizzes_passed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["-total_score"], name="quiz_userscore_total_idx")]
+
+    def __str__(self):
+        return f"User: {self.user}, total score: {self.total_score}"
+
+
+class LeaderboardBucket(models.Model):
+    """
+    Number of entries of a leaderboard whose score falls in a bucket, so that a rank is
+    a sum over the buckets above plus a count within one bucket.
+    """
+
+    board = models.CharField(max_length=32)
+    bucket = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("board", "bucket")
+
+    def __str__(self):
+        return f"{self.board} [{self.bucket}]: {self.count}"
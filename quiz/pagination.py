@@ -0,0 +1,171 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = "quiz.pagination.cursor"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorSerializer:
+    """JSON serializer of signed cursors, keeping datetimes to the microsecond as ISO 8601 strings."""
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"), default=lambda value: value.isoformat()).encode("latin-1")
+
+    def loads(self, data):
+        return json.loads(data.decode("latin-1"))
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator serving an estimated count: the ``COUNT(*)`` of a queryset is cached
+    for ``QUIZ_LIST_COUNT_CACHE_TIMEOUT`` seconds instead of being run on every page.
+    """
+
+    @cached_property
+    def count(self):
+        query = str(self.object_list.query).encode()
+        key = f"quiz:list-count:{hashlib.md5(query).hexdigest()}"
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, getattr(settings, "QUIZ_LIST_COUNT_CACHE_TIMEOUT", 60))
+        return count
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # query strings of the neighbouring pages, filled in by the view
+        self.next_querystring = None
+        self.previous_querystring = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset paginator: pages are fetched with a ``WHERE`` on the ordering columns of the
+    last row seen instead of an ``OFFSET``, and the total count is never computed.
+    Cursors are signed so they cannot be forged or reused with another ordering.
+    """
+
+    # supported orderings, the primary key breaks ties
+    orderings = {
+        "id": ("id",),
+        "name": ("name", "id"),
+        "-name": ("-name", "-id"),
+        "-popularity": ("-popularity", "-id"),
+        # best matches first, on querysets annotated by a search backend
+        "search_rank": ("search_rank", "id"),
+    }
+
+    def __init__(self, queryset, per_page, ordering):
+        if ordering not in self.orderings:
+            raise ValueError(f"Unsupported cursor ordering: {ordering}")
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+        self.fields = self.orderings[ordering]
+
+    def encode_cursor(self, obj, direction):
+        # rows are model instances, or dicts when paginating a values() queryset
+        names = [field.lstrip("-") for field in self.fields]
+        values = [obj[name] for name in names] if isinstance(obj, dict) else [getattr(obj, name) for name in names]
+        return signing.dumps(
+            {"o": self.ordering, "d": direction, "v": values},
+            salt=CURSOR_SALT,
+            serializer=CursorSerializer,
+            compress=True,
+        )
+
+    def decode_cursor(self, cursor):
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT, serializer=CursorSerializer)
+        except signing.BadSignature:
+            raise InvalidCursor("Invalid cursor.")
+        if payload.get("o") != self.ordering or payload.get("d") not in ("next", "previous"):
+            raise InvalidCursor("Cursor does not match the ordering.")
+        return payload["d"], payload["v"]
+
+    def keyset_filter(self, values, reverse):
+        """
+        Build ``(a > x) OR (a = x AND b > y) ...`` over the ordering fields,
+        flipping the comparisons of descending fields and of backward pages.
+        """
+
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.fields, values):
+            name = field.lstrip("-")
+            descending = field.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def page(self, cursor=None):
+        direction, values = ("next", None) if not cursor else self.decode_cursor(cursor)
+        backwards = direction == "previous"
+
+        ordering = self.fields
+        if backwards:
+            ordering = [field[1:] if field.startswith("-") else f"-{field}" for field in self.fields]
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values, reverse=backwards))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(rows[-1], "next")
+            if values is not None and (has_more or not backwards):
+                previous_cursor = self.encode_cursor(rows[0], "previous")
+        return CursorPage(rows, self, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+
+class ProgressPaginator(CursorPaginator):
+    """Keyset paginator of the quiz summaries of a user, served by their ``(user, last_attempt_at)`` index."""
+
+    orderings = {
+        "-last_attempt_at": ("-last_attempt_at", "-id"),
+    }
+
+
+class ResultPaginator(CursorPaginator):
+    """Keyset paginator of the results of a user, served by their ``(user, submitted_date)`` index."""
+
+    orderings = {
+        "-submitted_date": ("-submitted_date", "-id"),
+    }
@@ -0,0 +1,188 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.functional import cached_property
+
+from .models import Question
+
+CONTENT_VERSION_KEY = "quiz:content-version:{quiz_id}"
+QUESTION_BANK_KEY = "quiz:question-bank:{quiz_id}:{version}"
+
+
+def get_content_version(quiz_id):
+    """Return the current content version of a quiz, starting a new one if none is cached."""
+
+    key = CONTENT_VERSION_KEY.format(quiz_id=quiz_id)
+    version = cache.get(key)
+    if version is None:
+        # a fresh random version never collides with snapshots cached before an eviction
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_content_version(quiz_id):
+    """
+    Invalidate everything cached for the content of a quiz, once the transaction commits.
+    Bumped any earlier, a concurrent reader could cache the old content under the new version.
+    """
+
+    key = CONTENT_VERSION_KEY.format(quiz_id=quiz_id)
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, None))
+
+
+class AnswerSnapshot:
+    __slots__ = ("id", "text", "is_correct")
+
+    def __init__(self, id, text, is_correct):
+        self.id = id
+        self.text = text
+        self.is_correct = is_correct
+
+    def __str__(self):
+        return self.text
+
+
+class QuestionSnapshot:
+    """Read-only stand-in for a ``Question`` with its answers, as used by the forms and templates."""
+
+    __slots__ = ("id", "text", "question_type", "answers", "field_spec")
+
+    def __init__(self, id, text, question_type, answers):
+        self.id = id
+        self.text = text
+        self.question_type = question_type
+        self.answers = answers
+        # compiled form field of the question, built with the snapshot and never changed
+        self.field_spec = None
+
+    def __str__(self):
+        return self.text
+
+    def get_answers(self):
+        return self.answers
+
+
+class QuestionBank:
+    """
+    The questions and answers of a quiz.
+    Cached as plain tuples ``(id, text, type, ((answer_id, text, is_correct), ...))``
+    so that any cache backend can pickle it.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def load(cls, quiz_id, question_ids=None):
+        """Read the question bank of a quiz, or only the given questions of it, with a single query."""
+
+        # cached under the current content version, so never read from a lagging replica
+        questions = Question.objects.using(DEFAULT_DB_ALIAS).filter(quiz_id=quiz_id)
+        if question_ids is not None:
+            questions = questions.filter(id__in=question_ids)
+        values = (
+            questions.order_by("id", "answers__id")
+            .values_list("id", "text", "question_type", "answers__id", "answers__text", "answers__is_correct")
+        )
+        questions = {}
+        for question_id, text, question_type, answer_id, answer_text, is_correct in values:
+            _, _, _, answers = questions.setdefault(question_id, (question_id, text, question_type, []))
+            if answer_id is not None:
+                answers.append((answer_id, answer_text, is_correct))
+        return cls(tuple((*question[:3], tuple(question[3])) for question in questions.values()))
+
+    @cached_property
+    def questions(self):
+        from .forms import FieldSpec
+
+        questions = [
+            QuestionSnapshot(
+                question_id,
+                text,
+                question_type,
+                [AnswerSnapshot(*answer) for answer in answers],
+            )
+            for question_id, text, question_type, answers in self.rows
+        ]
+        # snapshots are shared by every request served from this bank, so nothing writes to them later
+        for question in questions:
+            question.field_spec = FieldSpec(question)
+        return questions
+
+    @cached_property
+    def questions_by_id(self):
+        return {question.id: question for question in self.questions}
+
+    @cached_property
+    def answer_key(self):
+        """Map every question id to a ``(question_type, frozenset(correct_answer_ids))`` pair."""
+
+        return {
+            question_id: (question_type, frozenset(answer[0] for answer in answers if answer[2]))
+            for question_id, _, question_type, answers in self.rows
+        }
+
+
+class LocalBankCache:
+    """
+    Process-local LRU of hydrated question banks keyed by quiz and content version.
+    Sits in front of the shared cache so hot quizzes skip unpickling, and keeps
+    anything compiled from a bank (such as form fields) for as long as its version lives.
+    """
+
+    def __init__(self):
+        self._banks = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, "QUIZ_QUESTION_BANK_LOCAL_CACHE_SIZE", 128)
+
+    def get(self, key):
+        with self._lock:
+            bank = self._banks.get(key)
+            if bank is not None:
+                self._banks.move_to_end(key)
+            return bank
+
+    def set(self, key, bank):
+        with self._lock:
+            self._banks[key] = bank
+            self._banks.move_to_end(key)
+            while len(self._banks) > self.max_size:
+                self._banks.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._banks.clear()
+
+
+local_banks = LocalBankCache()
+
+
+def get_question_bank(quiz_id):
+    """
+    Return the question bank of a quiz from the process-local or the shared cache,
+    reading it from the database on a miss.
+    """
+
+    version = get_content_version(quiz_id)
+    bank = local_banks.get((quiz_id, version))
+    if bank is not None:
+        return bank
+
+    key = QUESTION_BANK_KEY.format(quiz_id=quiz_id, version=version)
+    rows = cache.get(key)
+    if rows is None:
+        bank = QuestionBank.load(quiz_id)
+        cache.set(key, bank.rows, getattr(settings, "QUIZ_QUESTION_BANK_CACHE_TIMEOUT", 60 * 60 * 24))
+    else:
+        bank = QuestionBank(rows)
+    local_banks.set((quiz_id, version), bank)
+    return bank
@@ -0,0 +1,102 @@
+"""
+Streaming export of quiz results as JSON Lines or CSV.
+
+Results are read in primary key order with ``iterator(chunk_size=...)`` so memory
+stays flat however many rows are exported, and an export that was cut short can be
+resumed from the id of the last exported result.
+"""
+
+import csv
+import datetime
+import zlib
+
+from django.utils import timezone
+
+from .bank_io import Echo, jsonl_lines
+from .models import Result
+
+FORMATS = ("csv", "jsonl")
+COLUMNS = ("id", "quiz_id", "quiz", "category", "user_id", "username", "score", "submitted_date")
+# bytes gathered before handing a chunk to the response, one write per line is slow
+BUFFER_SIZE = 64 * 1024
+
+
+def filter_results(quiz_ids=None, category_ids=None, since=None, until=None, after_id=None):
+    """Return the results to export; ``since`` and ``until`` are inclusive dates."""
+
+    results = Result.objects.all()
+    if quiz_ids:
+        results = results.filter(quiz_id__in=quiz_ids)
+    if category_ids:
+        results = results.filter(quiz__category_id__in=category_ids)
+    # compare against datetimes rather than with __date so an index on the column can be used
+    if since:
+        results = results.filter(submitted_date__gte=start_of_day(since))
+    if until:
+        results = results.filter(submitted_date__lt=start_of_day(until + datetime.timedelta(days=1)))
+    if after_id:
+        results = results.filter(id__gt=after_id)
+    return results
+
+
+def start_of_day(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def export_records(results, chunk_size=2000):
+    """Yield a record per result in id order, reading the results in chunks."""
+
+    results = (
+        results.select_related("quiz__category", "user")
+        .only("id", "score", "submitted_date", "quiz__name", "quiz__category__name", "user__username")
+        .order_by("id")
+    )
+    for result in results.iterator(chunk_size=chunk_size):
+        yield {
+            "id": result.id,
+            "quiz_id": result.quiz_id,
+            "quiz": result.quiz.name,
+            "category": result.quiz.category.name,
+            "user_id": result.user_id,
+            "username": result.user.username,
+            "score": result.score,
+            "submitted_date": result.submitted_date.isoformat(),
+        }
+
+
+def csv_lines(records):
+    writer = csv.writer(Echo())
+    yield writer.writerow(COLUMNS)
+    for record in records:
+        yield writer.writerow([record[column] for column in COLUMNS])
+
+
+def export_lines(records, format):
+    if format == "csv":
+        return csv_lines(records)
+    return jsonl_lines(records)
+
+
+def encode_chunks(lines, compress=False):
+    """Encode lines to bytes in chunks of about ``BUFFER_SIZE``, gzipped when ``compress`` is set."""
+
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            chunk = b"".join(buffer)
+            buffer = []
+            size = 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,103 @@
+"""
+Random draws of the questions of an attempt.
+
+Questions are drawn as ids from a cached list of the ids and types of a quiz, and only
+the drawn questions are then read with their answers, in one query. Banks of up to
+``QUIZ_SAMPLING_FULL_BANK_SIZE`` questions are cheap to keep whole, so their drawn
+questions are taken from the cached question bank instead. Submissions are graded
+from the same questions, so a large bank is never read whole.
+"""
+
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Question
+from .question_bank import QuestionBank, get_content_version, get_question_bank
+
+QUESTION_IDS_KEY = "quiz:question-ids:{quiz_id}:{version}"
+
+
+def get_question_ids(quiz_id):
+    """Return the ``(id, question_type)`` pairs of the questions of a quiz, ordered by id."""
+
+    key = QUESTION_IDS_KEY.format(quiz_id=quiz_id, version=get_content_version(quiz_id))
+    question_ids = cache.get(key)
+    if question_ids is None:
+        questions = Question.objects.using(DEFAULT_DB_ALIAS).filter(quiz_id=quiz_id)
+        question_ids = tuple(questions.order_by("id").values_list("id", "question_type"))
+        cache.set(key, question_ids, getattr(settings, "QUIZ_QUESTION_BANK_CACHE_TIMEOUT", 60 * 60 * 24))
+    return question_ids
+
+
+def allocate(sizes, k):
+    """
+    Split ``k`` draws between strata of the given sizes in proportion to them, giving the
+    draws left over by rounding down to the largest remainders.
+    """
+
+    total = sum(sizes.values())
+    k = min(k, total)
+    if not total:
+        return {}
+    quotas = {stratum: k * size // total for stratum, size in sizes.items()}
+    remainders = sorted(sizes, key=lambda stratum: (-(k * sizes[stratum] % total), stratum))
+    for stratum in remainders[: k - sum(quotas.values())]:
+        quotas[stratum] += 1
+    return quotas
+
+
+def sample_question_ids(quiz_id, k, seed=None, stratified=False):
+    """
+    Draw ``k`` question ids of a quiz in random order; the same ``seed`` draws the same ids
+    as long as the questions do not change. A stratified draw keeps the mix of question
+    types of the bank.
+    """
+
+    question_ids = get_question_ids(quiz_id)
+    rng = random.Random(seed) if seed is not None else random
+    if not stratified:
+        return rng.sample([question_id for question_id, _ in question_ids], min(k, len(question_ids)))
+
+    strata = {}
+    for question_id, question_type in question_ids:
+        strata.setdefault(question_type, []).append(question_id)
+    quotas = allocate({question_type: len(ids) for question_type, ids in strata.items()}, k)
+    drawn = []
+    for question_type in sorted(strata):
+        drawn.extend(rng.sample(strata[question_type], quotas[question_type]))
+    rng.shuffle(drawn)
+    return drawn
+
+
+def get_attempt_bank(quiz_id, question_ids):
+    """
+    Return a question bank holding the given questions: the cached bank of the quiz when
+    it is small, or a bank of only those questions read from the database.
+    """
+
+    if len(get_question_ids(quiz_id)) <= getattr(settings, "QUIZ_SAMPLING_FULL_BANK_SIZE", 200):
+        return get_question_bank(quiz_id)
+    return QuestionBank.load(quiz_id, question_ids=question_ids)
+
+
+def get_questions(quiz_id, question_ids, bank=None):
+    """
+    Return the question snapshots of the given ids in their order, skipping deleted questions.
+    Pass the ``bank`` of :func:`get_attempt_bank` when it was read already.
+    """
+
+    if bank is None:
+        bank = get_attempt_bank(quiz_id, question_ids)
+    questions_by_id = bank.questions_by_id
+    return [questions_by_id[question_id] for question_id in question_ids if question_id in questions_by_id]
+
+
+def draw_questions(quiz_id, k, seed=None, stratified=None):
+    """Draw the questions of a new attempt, stratified by type when ``QUIZ_STRATIFIED_SAMPLING`` is set."""
+
+    if stratified is None:
+        stratified = getattr(settings, "QUIZ_STRATIFIED_SAMPLING", False)
+    return get_questions(quiz_id, sample_question_ids(quiz_id, k, seed=seed, stratified=stratified))
@@ -0,0 +1,149 @@
+import functools
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Question, Quiz
+
+SEARCH_INDEX_TABLE = "quiz_search_index"
+
+# one row per quiz: its name, its category name and the text of its questions
+INDEX_ROWS_SQL = f"""
+    INSERT INTO {SEARCH_INDEX_TABLE} (rowid, name, category, questions)
+    SELECT quiz.id, quiz.name, category.name,
+           COALESCE((SELECT group_concat(question.text, ' ')
+                     FROM quiz_question AS question
+                     WHERE question.quiz_id = quiz.id), '')
+    FROM quiz_quiz AS quiz
+    INNER JOIN quiz_category AS category ON category.id = quiz.category_id
+"""
+
+
+class BaseSearchBackend:
+    """Interface of the quiz search backends."""
+
+    def search(self, queryset, query):
+        """
+        Filter a ``Quiz`` queryset down to the quizzes matching the query.
+        The result is annotated with ``search_rank``; lower ranks are better matches.
+        """
+        raise NotImplementedError
+
+    def index_quizzes(self, quiz_ids):
+        """(Re)index the given quizzes."""
+
+    def remove_quizzes(self, quiz_ids):
+        """Drop the given quizzes from the index."""
+
+    def rebuild(self):
+        """Rebuild the whole index."""
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Portable fallback for databases without a full-text index.
+    Every term has to appear in the quiz name, the category name or a question,
+    and name matches rank before category and question matches.
+    """
+
+    def search(self, queryset, query):
+        terms = query.split()
+        for term in terms:
+            question_matches = Question.objects.filter(quiz_id=OuterRef("pk"), text__icontains=term)
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(category__name__icontains=term) | Exists(question_matches)
+            )
+        return queryset.annotate(
+            search_rank=Case(
+                When(name__icontains=query, then=Value(0)),
+                When(category__name__icontains=query, then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField(),
+            )
+        )
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """
+    Search backed by the SQLite FTS5 table created by the quiz migrations.
+    Terms are prefix matched so the results can follow the search keystrokes,
+    and matches are ranked with bm25.
+    """
+
+    # bm25 weights of the name, category and questions columns
+    weights = (10.0, 2.0, 1.0)
+
+    def __init__(self, using="default"):
+        self.using = using
+
+    @staticmethod
+    def to_match_expression(query):
+        terms = re.findall(r"\w+", query)
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        expression = self.to_match_expression(query)
+        if not expression:
+            return queryset.annotate(search_rank=Value(0)).none()
+
+        weights = ", ".join(str(weight) for weight in self.weights)
+        matches = RawSQL(
+            f"SELECT rowid FROM {SEARCH_INDEX_TABLE} WHERE {SEARCH_INDEX_TABLE} MATCH %s",
+            (expression,),
+        )
+        rank = RawSQL(
+            f"SELECT bm25({SEARCH_INDEX_TABLE}, {weights}) FROM {SEARCH_INDEX_TABLE} "
+            f"WHERE {SEARCH_INDEX_TABLE} MATCH %s AND rowid = {Quiz._meta.db_table}.id",
+            (expression,),
+        )
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+    def index_quizzes(self, quiz_ids):
+        quiz_ids = list(quiz_ids)
+        if not quiz_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(quiz_ids))
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_INDEX_TABLE} WHERE rowid IN ({placeholders})", quiz_ids)
+            cursor.execute(f"{INDEX_ROWS_SQL} WHERE quiz.id IN ({placeholders})", quiz_ids)
+
+    def remove_quizzes(self, quiz_ids):
+        quiz_ids = list(quiz_ids)
+        if not quiz_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(quiz_ids))
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_INDEX_TABLE} WHERE rowid IN ({placeholders})", quiz_ids)
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_INDEX_TABLE}")
+            cursor.execute(INDEX_ROWS_SQL)
+
+
+def has_fts_index(using="default"):
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        return SEARCH_INDEX_TABLE in connection.introspection.table_names(cursor)
+
+
+@functools.cache
+def get_search_backend():
+    """
+    Return the configured search backend.
+    ``QUIZ_SEARCH_BACKEND`` may hold the dotted path of a backend class; by default
+    the FTS5 backend is used when its index table exists and the portable one otherwise.
+    """
+
+    backend_path = getattr(settings, "QUIZ_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+    if has_fts_index():
+        return SQLiteFTSSearchBackend()
+    return DatabaseSearchBackend()
@@ -0,0 +1,117 @@
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .category_counters import add_to_category, add_to_quiz_category, invalidate_category_list
+from .conditional import touch_catalogue, touch_quizzes
+from .counters import popularity_buffer
+from .models import Answer, Category, Question, Quiz, Result
+from .question_bank import bump_content_version
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    quiz_ids = list(Quiz.objects.filter(category=instance).values_list("id", flat=True))
+    get_search_backend().index_quizzes(quiz_ids)
+    invalidate_category_list()
+    touch_catalogue(instance.id)
+    # the API details of its quizzes show its name
+    touch_quizzes(*quiz_ids)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    invalidate_category_list()
+    touch_catalogue(instance.id)
+
+
+@receiver(pre_save, sender=Quiz)
+def quiz_saving(sender, instance, **kwargs):
+    instance._previous_category_id = None
+    if not instance._state.adding:
+        instance._previous_category_id = (
+            Quiz.objects.filter(id=instance.id).values_list("category_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, created, **kwargs):
+    bump_content_version(instance.id)
+    get_search_backend().index_quizzes([instance.id])
+    touch_catalogue(instance.category_id, instance._previous_category_id)
+    touch_quizzes(instance.id)
+
+    if created:
+        add_to_category(instance.category_id, quizzes=1)
+    elif instance._previous_category_id not in (None, instance.category_id):
+        # the quiz moves its questions and attempts to the new category
+        questions = instance.questions.count()
+        attempts = instance.results.count()
+        add_to_category(instance._previous_category_id, quizzes=-1, questions=-questions, attempts=-attempts)
+        add_to_category(instance.category_id, quizzes=1, questions=questions, attempts=attempts)
+
+
+@receiver(pre_delete, sender=Quiz)
+def quiz_deleting(sender, instance, **kwargs):
+    # its questions are subtracted one by one by question_deleted, its results are not
+    add_to_category(instance.category_id, quizzes=-1, attempts=-instance.results.count())
+
+
+@receiver(post_delete, sender=Quiz)
+def quiz_deleted(sender, instance, **kwargs):
+    bump_content_version(instance.id)
+    get_search_backend().remove_quizzes([instance.id])
+    touch_catalogue(instance.category_id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    bump_content_version(instance.quiz_id)
+    get_search_backend().index_quizzes([instance.quiz_id])
+    # searches match question texts, and the lists of the categories show question counts
+    quiz_ids = {instance.quiz_id, getattr(instance, "_previous_quiz_id", None)} - {None}
+    touch_catalogue(*Quiz.objects.filter(id__in=quiz_ids).values_list("category_id", flat=True))
+
+
+@receiver(pre_save, sender=Question)
+def question_saving(sender, instance, **kwargs):
+    instance._previous_quiz_id = None
+    if not instance._state.adding:
+        instance._previous_quiz_id = (
+            Question.objects.filter(id=instance.id).values_list("quiz_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, **kwargs):
+    if created:
+        add_to_quiz_category(instance.quiz_id, questions=1)
+    elif instance._previous_quiz_id not in (None, instance.quiz_id):
+        add_to_quiz_category(instance._previous_quiz_id, questions=-1)
+        add_to_quiz_category(instance.quiz_id, questions=1)
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    # runs before the quiz is deleted when the question goes with it
+    add_to_quiz_category(instance.quiz_id, questions=-1)
+
+
+@receiver(post_save, sender=Result)
+def result_saved(sender, instance, created, **kwargs):
+    if created:
+        add_to_quiz_category(instance.quiz_id, attempts=1)
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    quiz_id = Question.objects.filter(id=instance.question_id).values_list("quiz_id", flat=True).first()
+    if quiz_id is not None:
+        bump_content_version(quiz_id)
+
+
+@receiver(request_finished)
+def flush_popularity(sender, **kwargs):
+    # once the response is sent, outside the routing state, so the writes pin no client
+    popularity_buffer.flush_if_due()
@@ -1,3 +1,1213 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import sqlite3
+import statistics
+import tempfile
+from datetime import date, datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import F
+from django.test import AsyncRequestFactory, Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from config.database import PIN_COOKIE, PrimaryReplicaRouter, RoutingState, routing_state
+from config.profiling import Histogram, request_histograms
+
+from . import async_views
+from .analytics import with_metrics
+from .bank_io import FORMATS, QuestionBankImporter, export_lines, export_records, read_records
+from .category_counters import reconcile_category_counters
+from .counters import popularity_buffer
+from .grading import build_question_results, get_answer_key, grade_submission
+from .grading_queue import claim_jobs, release_stale_jobs
+from .models import (
+    Answer,
+    AnswerStats,
+    Attempt,
+    Category,
+    GradingJob,
+    LeaderboardBucket,
+    Question,
+    QuestionResponse,
+    QuestionStats,
+    Quiz,
+    Result,
+    UserCategorySummary,
+    UserQuizSummary,
+    UserScore,
+)
+from .leaderboards import GLOBAL_BOARD, get_rank, get_top, quiz_board, rebuild_leaderboards
+from .pagination import CursorPaginator, InvalidCursor
+from .question_bank import get_content_version, get_question_bank, local_banks
+from .sampling import allocate, get_questions, sample_question_ids
+from .result_export import (
+    COLUMNS as RESULT_COLUMNS,
+    encode_chunks,
+    export_lines as export_result_lines,
+    export_records as export_result_records,
+    filter_results,
+)
+from .search import SEARCH_INDEX_TABLE, DatabaseSearchBackend, SQLiteFTSSearchBackend, get_search_backend
+
+User = get_user_model()
+
+
+def create_quiz(name="Physics basics", category=None, questions=6):
+    """Create a quiz whose every third question is multi-select, with the first answers correct."""
+
+    category = category or Category.objects.create(name="Science")
+    quiz = Quiz.objects.create(
+        name=name,
+        # every attempt draws all the questions
+        number_of_questions=questions,
+        duration_in_minutes=10,
+        pass_percentage=50,
+        difficulty_level="MEDIUM",
+        category=category,
+    )
+    for number in range(questions):
+        question_type = "MSMC" if number % 3 == 0 else "MC"
+        question = Question.objects.create(text=f"Question {number}", quiz=quiz, question_type=question_type)
+        for index in range(4):
+            is_correct = index == 0 or (question_type == "MSMC" and index == 1)
+            Answer.objects.create(text=f"Answer {index}", question=question, is_correct=is_correct)
+    return quiz
+
+
+def answer(questions, correct=True):
+    """Return the form data answering every question correctly, or wrongly."""
+
+    data = {}
+    for question in questions:
+        answer_ids = [str(answer.id) for answer in question.get_answers() if answer.is_correct == correct]
+        if question.question_type == "MSMC":
+            data[f"question_{question.id}"] = answer_ids
+        else:
+            data[f"question_{question.id}"] = answer_ids[0]
+    return data
+
+
+class QuizTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz = create_quiz()
+        self.user = User.objects.create_user(username="student", email="student@example.com", password="secret")
+
+    def start_attempt(self, client=None):
+        client = client or self.client
+        response = client.get(self.quiz.get_assessment_attempt_url())
+        self.assertEqual(response.status_code, 200)
+        return response.context["attempt"], response.context["questions"]
+
+    def submit(self, attempt, questions, correct=True):
+        data = {"attempt": str(attempt.id), **answer(questions, correct)}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(self.quiz.get_assessment_attempt_url(), data)
+
+
+class GradingTests(QuizTestCase):
+    def test_grade_submission(self):
+        questions = self.quiz.get_questions()
+        answer_key = get_answer_key(self.quiz.id)
+
+        data = answer(questions)
+        self.assertEqual(grade_submission(answer_key, data)[:2], (6, 6))
+
+        msmc = next(question for question in questions if question.question_type == "MSMC")
+        data[f"question_{msmc.id}"] = [str(answer.id) for answer in msmc.get_answers()]
+        self.assertEqual(grade_submission(answer_key, data)[:2], (5, 6))
+
+    def test_calculate_score(self):
+        questions = self.quiz.get_questions()
+        self.assertEqual(self.quiz.calculate_score(answer(questions))[1:3], (100, True))
+        self.assertEqual(self.quiz.calculate_score(answer(questions, correct=False))[1:3], (0, False))
+        self.assertEqual(self.quiz.calculate_score({})[1], 0)
+
+
+class AttemptSubmissionTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_submit(self):
+        attempt, questions = self.start_attempt()
+        response = self.submit(attempt, questions)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["score_percentage"], 100)
+
+        summary = UserQuizSummary.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual((summary.best_score, summary.attempt_count, summary.passed), (100, 1, True))
+        self.assertEqual(Result.objects.get().attempt, attempt)
+
+    def test_wrong_answers(self):
+        attempt, questions = self.start_attempt()
+        response = self.submit(attempt, questions, correct=False)
+        self.assertEqual(response.context["score_percentage"], 0)
+        self.assertContains(response, "Correct answer: Answer 0")
+
+    def test_replay_redirects_to_the_result(self):
+        attempt, questions = self.start_attempt()
+        self.submit(attempt, questions)
+        response = self.submit(attempt, questions, correct=False)
+        self.assertRedirects(response, attempt.get_result_url(), fetch_redirect_response=False)
+        self.assertEqual(Result.objects.count(), 1)
+        self.assertEqual(self.client.get(attempt.get_result_url()).context["score_percentage"], 100)
+
+    def test_unknown_attempt(self):
+        response = self.client.post(self.quiz.get_assessment_attempt_url(), {"attempt": "unknown"})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Result.objects.exists())
+
+    def test_invalid_answer(self):
+        attempt, questions = self.start_attempt()
+        data = {"attempt": str(attempt.id), **answer(questions)}
+        data[f"question_{questions[0].id}"] = ["0"] if questions[0].question_type == "MSMC" else "0"
+        response = self.client.post(self.quiz.get_assessment_attempt_url(), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors)
+        self.assertIsNone(Attempt.objects.get(pk=attempt.pk).submitted_at)
+
+
+class GradingQueueTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    @override_settings(QUIZ_GRADING_QUEUE=True)
+    def test_queued_submission(self):
+        attempt, questions = self.start_attempt()
+        response = self.submit(attempt, questions)
+        self.assertRedirects(response, attempt.get_result_url(), fetch_redirect_response=False)
+        self.submit(attempt, questions)
+        self.assertEqual(GradingJob.objects.count(), 1)
+        self.assertContains(self.client.get(attempt.get_result_url()), "Grading your submission")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("grade_submissions", once=True, verbosity=0, stdout=StringIO())
+        self.assertEqual(Result.objects.get().score, 100)
+        self.assertEqual(UserQuizSummary.objects.get().attempt_count, 1)
+        self.assertEqual(self.client.get(attempt.get_result_url()).context["score_percentage"], 100)
+
+    def test_result_of_another_user(self):
+        attempt, questions = self.start_attempt()
+        self.submit(attempt, questions)
+        other = User.objects.create_user(username="other", email="other@example.com", password="secret")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(attempt.get_result_url()).status_code, 404)
+
+    def test_failing_job(self):
+        attempt = Attempt.objects.create(quiz=self.quiz, user=self.user, question_ids=[])
+        GradingJob.objects.create(attempt=attempt, answers={"question_1": "unknown"})
+        call_command("grade_submissions", once=True, max_tries=2, verbosity=0, stdout=StringIO())
+        job = GradingJob.objects.get()
+        self.assertEqual((job.status, job.tries), (GradingJob.Status.FAILED, 2))
+
+    def test_stale_jobs(self):
+        attempt = Attempt.objects.create(quiz=self.quiz, user=self.user, question_ids=[])
+        GradingJob.objects.create(attempt=attempt, answers={})
+        self.assertEqual(len(claim_jobs("first", 10)), 1)
+        self.assertEqual(claim_jobs("second", 10), [])
+        self.assertEqual(release_stale_jobs(-1), 1)
+        self.assertEqual(len(claim_jobs("second", 10)), 1)
+
+
+@override_settings(QUIZ_LIST_PAGINATION="cursor")
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Science")
+        Quiz.objects.bulk_create(
+            Quiz(
+                name=f"Quiz {number % 7:02d}",
+                number_of_questions=2,
+                duration_in_minutes=5,
+                pass_percentage=50,
+                difficulty_level="MEDIUM",
+                category=category,
+                popularity=number % 3,
+            )
+            for number in range(60)
+        )
+
+    def walk(self, query=""):
+        response = self.client.get(f"{reverse('quiz:quiz_list')}?{query}")
+        pages = [list(response.context["quizzes"])]
+        while response.context["page_obj"].has_next():
+            response = self.client.get(f"{reverse('quiz:quiz_list')}?{response.context['page_obj'].next_querystring}")
+            pages.append(list(response.context["quizzes"]))
+        return pages, response
+
+    def test_every_quiz_once_in_order(self):
+        for query, key in (("", lambda quiz: quiz.id), ("o=name", lambda quiz: (quiz.name, quiz.id))):
+            pages, _ = self.walk(query)
+            quizzes = [quiz for page in pages for quiz in page]
+            self.assertEqual(len(quizzes), 60)
+            self.assertEqual(quizzes, sorted(quizzes, key=key))
+
+    def test_back_to_the_first_page(self):
+        pages, response = self.walk("o=-popularity")
+        back = [list(response.context["quizzes"])]
+        while response.context["page_obj"].has_previous():
+            response = self.client.get(
+                f"{reverse('quiz:quiz_list')}?{response.context['page_obj'].previous_querystring}"
+            )
+            back.append(list(response.context["quizzes"]))
+        self.assertEqual(back[::-1], pages)
+
+    def test_invalid_cursor(self):
+        quiz = Quiz.objects.first()
+        cursor = CursorPaginator(Quiz.objects.all(), 20, "name").encode_cursor(quiz, "next")
+        self.assertEqual(CursorPaginator(Quiz.objects.all(), 20, "name").decode_cursor(cursor), ("next", [quiz.name, quiz.id]))
+        with self.assertRaises(InvalidCursor):
+            CursorPaginator(Quiz.objects.all(), 20, "-name").decode_cursor(cursor)
+        self.assertEqual(self.client.get(reverse("quiz:quiz_list"), {"cursor": "bogus"}).status_code, 404)
+
+
+class ConditionalGetTests(QuizTestCase):
+    def assertNotModified(self, url, response, queries=0):
+        with CaptureQueriesContext(connection) as captured:
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304, url)
+        if queries is not None:
+            self.assertEqual(len(captured), queries, url)
+
+    def test_not_modified(self):
+        urls = (
+            reverse("quiz:quiz_list"),
+            reverse("quiz:category_list"),
+            reverse("quiz:quiz_list_by_category", args=[self.quiz.category_id]),
+            self.quiz.get_assessment_url(),
+        )
+        for url in urls:
+            response = self.client.get(url)
+            self.assertIn("public", response["Cache-Control"])
+            self.assertNotModified(url, response)
+            if response.has_header("Last-Modified"):
+                modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+                self.assertEqual(modified.status_code, 304, url)
+
+    def test_catalogue_change(self):
+        url = reverse("quiz:quiz_list")
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Quiz.objects.filter(pk=self.quiz.pk).update(name="Renamed")
+            self.quiz.refresh_from_db()
+            self.quiz.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Renamed")
+
+    def test_question_change_stamps_its_category(self):
+        url = reverse("quiz:quiz_list_by_category", args=[self.quiz.category_id])
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.create(text="Question 6", quiz=self.quiz)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_list_survives_a_refill(self):
+        url = reverse("quiz:category_list")
+        response = self.client.get(url)
+        cache.delete("quiz:category-list")
+        # refilled with one query, the validators do not change
+        self.assertNotModified(url, response, queries=1)
+
+    def test_new_result(self):
+        self.client.force_login(self.user)
+        url = self.quiz.get_assessment_url()
+        response = self.client.get(url)
+        self.assertIn("private", response["Cache-Control"])
+        self.assertNotModified(url, response, queries=None)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.save_result(self.user, 90)
+        self.assertContains(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]), "90")
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRouterTests(QuizTestCase):
+    """Reads of a request go to a replica, a copy of the primary in a second SQLite file."""
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        path = str(Path(directory.name) / "replica.sqlite3")
+        # copied before the test transaction starts, the replica has the schema of the primary
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        target = sqlite3.connect(path)
+        primary.connection.backup(target)
+        target.close()
+        super().setUpClass()
+        connections.settings["replica1"] = {**primary.settings_dict, "NAME": path}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica1"].close()
+        del connections["replica1"]
+        del connections.settings["replica1"]
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        # the replica lags behind the primary
+        Category.objects.using("replica1").bulk_create(Category.objects.filter(pk=self.quiz.category_id))
+        Quiz.objects.using("replica1").bulk_create(Quiz.objects.filter(pk=self.quiz.pk))
+        Quiz.objects.using("replica1").filter(pk=self.quiz.pk).update(name="Replica copy")
+        self.addCleanup(self.clear_replica)
+
+    def clear_replica(self):
+        with connections["replica1"].cursor() as cursor:
+            for model in (Quiz, Category):
+                cursor.execute(f"DELETE FROM {model._meta.db_table}")
+
+    def test_routing(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Quiz), DEFAULT_DB_ALIAS)
+        token = routing_state.set(RoutingState(pinned=False))
+        try:
+            self.assertEqual(router.db_for_read(Quiz), "replica1")
+            self.assertEqual(router.db_for_read(Attempt), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_write(Quiz), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(Quiz), DEFAULT_DB_ALIAS)
+        finally:
+            routing_state.reset(token)
+
+    def test_writers_read_the_primary(self):
+        leaderboard = reverse("quiz:quiz_leaderboard", args=[self.quiz.id])
+        self.assertContains(self.client.get(leaderboard), "Replica copy")
+        self.client.force_login(self.user)
+        response = self.client.get(self.quiz.get_assessment_attempt_url())
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = self.client.get(leaderboard)
+        self.assertContains(response, "Physics basics")
+        self.assertNotContains(response, "Replica copy")
+
+    def test_conditional_pages_read_the_primary(self):
+        # their validators are stamped on the primary, a lagging replica would be cached under them
+        for url in (reverse("quiz:quiz_list"), reverse("quiz:api_quiz_list")):
+            response = self.client.get(url)
+            self.assertContains(response, "Physics basics", msg_prefix=url)
+            self.assertNotContains(response, "Replica copy", msg_prefix=url)
+        response = self.client.get(self.quiz.get_assessment_url())
+        self.assertEqual(response.context["quiz"]._state.db, DEFAULT_DB_ALIAS)
+
+
+class CounterTests(QuizTestCase):
+    def test_category_counters(self):
+        category = self.quiz.category
+        category.refresh_from_db()
+        self.assertEqual((category.quiz_count, category.question_count, category.attempt_count), (1, 6, 0))
+
+        self.quiz.save_result(self.user, 50)
+        other = Category.objects.create(name="History")
+        self.quiz.category = other
+        self.quiz.save()
+        Question.objects.filter(quiz=self.quiz).first().delete()
+        other.refresh_from_db()
+        self.assertEqual((other.quiz_count, other.question_count, other.attempt_count), (1, 5, 1))
+        self.assertEqual(reconcile_category_counters(), [])
+
+        self.quiz.delete()
+        other.refresh_from_db()
+        self.assertEqual((other.quiz_count, other.question_count, other.attempt_count), (0, 0, 0))
+
+    def test_reconcile(self):
+        Category.objects.filter(pk=self.quiz.category_id).update(quiz_count=7)
+        self.assertEqual(len(reconcile_category_counters(fix=True)), 1)
+        self.assertEqual(reconcile_category_counters(), [])
+
+    def test_popularity_buffer(self):
+        popularity_buffer.flush()
+        self.quiz.refresh_from_db()
+        popularity = self.quiz.popularity
+        self.quiz.increment_popularity()
+        self.quiz.increment_popularity()
+        self.assertEqual(self.quiz.get_popularity(), popularity + 2)
+        self.assertEqual(popularity_buffer.flush(), 2)
+        self.quiz.refresh_from_db()
+        self.assertEqual((self.quiz.popularity, self.quiz.get_popularity()), (popularity + 2, popularity + 2))
+
+    def test_save_keeps_the_popularity(self):
+        Quiz.objects.filter(pk=self.quiz.pk).update(popularity=F("popularity") + 5)
+        self.quiz.name = "Renamed"
+        self.quiz.save()
+        self.quiz.refresh_from_db()
+        self.assertEqual((self.quiz.name, self.quiz.popularity), ("Renamed", 5))
+
+    @override_settings(QUIZ_POPULARITY_FLUSH_THRESHOLD=1)
+    def test_failed_flush_is_logged(self):
+        popularity_buffer.flush()
+        self.quiz.increment_popularity()
+        with mock.patch.object(popularity_buffer, "flush", side_effect=RuntimeError("boom")):
+            with self.assertLogs("quiz.counters", "ERROR"):
+                self.assertEqual(popularity_buffer.flush_if_due(), 0)
+        self.assertEqual(popularity_buffer.flush(), 1)
+
+
+class ApiTests(QuizTestCase):
+    def test_quiz_list(self):
+        for number in range(2):
+            create_quiz(f"Extra {number}", category=self.quiz.category, questions=2)
+        url = reverse("quiz:api_quiz_list")
+        with self.settings(QUIZ_API_PAGE_SIZE=2):
+            response = self.client.get(url, {"fields": "id,name"})
+            page = response.json()
+            self.assertEqual(page["results"][0], {"id": self.quiz.id, "name": "Physics basics"})
+            following = self.client.get(url, {"fields": "id,name", "cursor": page["next"]}).json()
+            self.assertEqual(len(following["results"]), 1)
+            self.assertIsNone(following["next"])
+            not_modified = self.client.get(url, {"fields": "id,name"}, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(len(self.client.get(url, {"q": "Physics"}).json()["results"]), 1)
+        self.assertEqual(self.client.get(url, {"fields": "unknown"}).status_code, 400)
+
+    def test_search_keeps_the_ranking(self):
+        Question.objects.create(text="Some chemistry too?", quiz=self.quiz)
+        chemistry = create_quiz("Chemistry", category=self.quiz.category, questions=2)
+        url = reverse("quiz:api_quiz_list")
+        with self.settings(QUIZ_API_PAGE_SIZE=1):
+            page = self.client.get(url, {"q": "chemistry", "fields": "id"}).json()
+            following = self.client.get(url, {"q": "chemistry", "fields": "id", "cursor": page["next"]}).json()
+        self.assertEqual(page["results"] + following["results"], [{"id": chemistry.id}, {"id": self.quiz.id}])
+        self.assertIsNone(following["next"])
+        by_id = self.client.get(url, {"q": "chemistry", "fields": "id", "o": "id"}).json()["results"]
+        self.assertEqual(by_id, [{"id": self.quiz.id}, {"id": chemistry.id}])
+        self.assertEqual(self.client.get(url, {"o": "search_rank"}).status_code, 400)
+
+    def test_token_authentication(self):
+        client = Client(enforce_csrf_checks=True)
+        token_url = reverse("quiz:api_token")
+        credentials = {"username": "student", "password": "wrong"}
+        self.assertEqual(client.post(token_url, credentials, content_type="application/json").status_code, 401)
+        response = client.post(token_url, {"username": "student"}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        credentials["password"] = "secret"
+        response = client.post(token_url, credentials, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        token = response.json()["token"]
+        authorization = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+        start = reverse("quiz:api_attempt_start", args=[self.quiz.id])
+        response = client.post(start, **authorization)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Attempt.objects.get(pk=response.json()["id"]).user, self.user)
+        results = client.get(reverse("quiz:api_quiz_results", args=[self.quiz.id]), **authorization)
+        self.assertIn("private", results["Cache-Control"])
+        self.assertEqual(client.post(start, HTTP_AUTHORIZATION=f"Bearer {token}x").status_code, 401)
+        self.assertEqual(client.post(start, HTTP_AUTHORIZATION=f"Basic {token}").status_code, 401)
+
+        # session writes still need the CSRF token
+        client.force_login(self.user)
+        response = client.post(start)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("CSRF failed", response.json()["error"])
+        client.get(self.quiz.get_assessment_attempt_url())
+        response = client.post(start, HTTP_X_CSRFTOKEN=client.cookies[settings.CSRF_COOKIE_NAME].value)
+        self.assertEqual(response.status_code, 201)
+
+        self.user.set_password("changed")
+        self.user.save()
+        self.assertEqual(client.post(start, **authorization).status_code, 401)
+
+    def test_quiz_detail(self):
+        url = reverse("quiz:api_quiz_detail", args=[self.quiz.id])
+        self.assertEqual(self.client.get(url).json()["name"], "Physics basics")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.client.get(reverse("quiz:api_quiz_detail", args=[0])).status_code, 404)
+
+    def test_quiz_detail_validators(self):
+        url = reverse("quiz:api_quiz_detail", args=[self.quiz.id])
+
+        def assertChanged(changed, field=None, value=None):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=self.etag)
+            self.assertEqual(response.status_code, 200 if changed else 304)
+            if changed:
+                self.etag = response["ETag"]
+                self.assertEqual(response.json()[field], value)
+
+        # increments left pending by earlier tests
+        popularity_buffer.flush()
+        self.etag = self.client.get(url)["ETag"]
+        # other quizzes and their popularity leave the details valid
+        with self.captureOnCommitCallbacks(execute=True):
+            other = create_quiz("Chemistry", category=Category.objects.create(name="Other"), questions=2)
+        other.increment_popularity()
+        popularity_buffer.flush()
+        assertChanged(False)
+
+        self.quiz.increment_popularity()
+        popularity_buffer.flush()
+        self.quiz.refresh_from_db()
+        assertChanged(True, "popularity", self.quiz.popularity)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.category.name = "Natural sciences"
+            self.quiz.category.save()
+        assertChanged(True, "category_name", "Natural sciences")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.name = "Physics"
+            self.quiz.save()
+        assertChanged(True, "name", "Physics")
+
+    def test_attempt(self):
+        start = reverse("quiz:api_attempt_start", args=[self.quiz.id])
+        self.assertEqual(self.client.post(start).status_code, 401)
+        self.client.force_login(self.user)
+        response = self.client.post(start)
+        self.assertEqual(response.status_code, 201)
+        attempt = response.json()
+        self.assertNotIn("is_correct", attempt["questions"][0]["answers"][0])
+
+        answers = {
+            str(question["id"]): [question["answers"][0]["id"]] for question in attempt["questions"]
+        }
+        url = reverse("quiz:api_attempt", args=[self.quiz.id, attempt["id"]])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {"answers": answers}, content_type="application/json")
+        self.assertEqual(response.json()["score_percentage"], 100)
+        replay = self.client.post(url, {"answers": {}}, content_type="application/json")
+        self.assertEqual(replay.status_code, 303)
+        grade = self.client.get(url).json()
+        self.assertEqual((grade["status"], grade["score_percentage"]), ("DONE", 100))
+
+        results = self.client.get(reverse("quiz:api_quiz_results", args=[self.quiz.id])).json()
+        self.assertEqual(len(results["results"]), 1)
+
+
+class SamplingTests(QuizTestCase):
+    def test_allocate(self):
+        self.assertEqual(allocate({"MC": 4, "MSMC": 2}, 3), {"MC": 2, "MSMC": 1})
+        self.assertEqual(allocate({"MC": 2, "MSMC": 1}, 5), {"MC": 2, "MSMC": 1})
+        self.assertEqual(allocate({"MC": 1, "MSMC": 1}, 1), {"MC": 1, "MSMC": 0})
+        self.assertEqual(allocate({}, 3), {})
+
+    def test_seeded_draw(self):
+        drawn = sample_question_ids(self.quiz.id, 4, seed=7)
+        self.assertEqual(len(set(drawn)), 4)
+        self.assertEqual(sample_question_ids(self.quiz.id, 4, seed=7), drawn)
+        self.assertEqual(len(sample_question_ids(self.quiz.id, 10)), 6)
+
+    def test_stratified_draw_keeps_the_mix(self):
+        types = dict(self.quiz.questions.values_list("id", "question_type"))
+        for seed in range(10):
+            drawn = sample_question_ids(self.quiz.id, 3, seed=seed, stratified=True)
+            self.assertEqual(sorted(types[question_id] for question_id in drawn), ["MC", "MC", "MSMC"])
+
+    def test_questions_in_the_drawn_order(self):
+        question_ids = sample_question_ids(self.quiz.id, 6, seed=3)
+        self.assertEqual([question.id for question in get_questions(self.quiz.id, question_ids)], question_ids)
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.get(id=question_ids[0]).delete()
+        self.assertEqual(len(get_questions(self.quiz.id, question_ids)), 5)
+
+    @override_settings(QUIZ_SAMPLING_FULL_BANK_SIZE=4)
+    def test_large_bank_graded_from_the_drawn_questions(self):
+        Quiz.objects.filter(id=self.quiz.id).update(number_of_questions=3)
+        self.client.force_login(self.user)
+        attempt, questions = self.start_attempt()
+        self.assertEqual(len(questions), 3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.submit(attempt, questions)
+        self.assertEqual(response.context["score_percentage"], 100)
+        bank_reads = [query["sql"] for query in queries if '"quiz_answer"."is_correct"' in query["sql"]]
+        self.assertEqual(len(bank_reads), 1)
+        self.assertIn('"quiz_question"."id" IN', bank_reads[0])
+        self.assertEqual(QuestionResponse.objects.filter(result__attempt=attempt).count(), 3)
+
+
+class SearchTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        history = Category.objects.create(name="History")
+        self.physicists = create_quiz("Famous scientists", category=history, questions=2)
+        Question.objects.create(text="Who wrote on physics first?", quiz=self.physicists)
+        self.battles = create_quiz("Battles", category=history, questions=2)
+
+    def search(self, backend, query):
+        return list(backend.search(Quiz.objects.all(), query).order_by("search_rank", "id"))
+
+    def test_fts_backend(self):
+        backend = get_search_backend()
+        self.assertIsInstance(backend, SQLiteFTSSearchBackend)
+        # prefix matches, the name match ranks before the question match
+        self.assertEqual(self.search(backend, "phys"), [self.quiz, self.physicists])
+        self.assertEqual(self.search(backend, "history battles"), [self.battles])
+        self.assertEqual(self.search(backend, "?!"), [])
+
+        self.battles.name = "Naval physics"
+        self.battles.save()
+        self.quiz.delete()
+        self.assertEqual(self.search(backend, "physics")[0], self.battles)
+        self.assertNotIn(self.quiz, self.search(backend, "physics"))
+
+    def test_database_backend(self):
+        backend = DatabaseSearchBackend()
+        self.assertEqual(self.search(backend, "physics"), [self.quiz, self.physicists])
+        self.assertEqual(self.search(backend, "history battles"), [self.battles])
+        self.assertEqual(self.search(backend, "chemistry"), [])
+
+    def test_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_INDEX_TABLE}")
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.search(get_search_backend(), "battles"), [self.battles])
+
+    def test_quiz_list_ranks_the_matches(self):
+        response = self.client.get(reverse("quiz:quiz_list"), {"q": "physics"})
+        self.assertEqual(list(response.context["quizzes"]), [self.quiz, self.physicists])
+
+
+class QuestionBankTests(QuizTestCase):
+    def test_cached_bank(self):
+        bank = get_question_bank(self.quiz.id)
+        self.assertEqual(len(bank.questions), 6)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIs(get_question_bank(self.quiz.id), bank)
+            local_banks.clear()
+            self.assertEqual(get_question_bank(self.quiz.id).rows, bank.rows)
+        self.assertEqual(len(queries), 0)
+
+        question = bank.questions[0]
+        self.assertEqual(question.field_spec.name, f"question_{question.id}")
+        correct_ids = frozenset(answer.id for answer in question.answers[:2])
+        self.assertEqual(bank.answer_key[question.id], ("MSMC", correct_ids))
+
+    def test_edit_starts_a_new_version_on_commit(self):
+        version = get_content_version(self.quiz.id)
+        question = self.quiz.questions.first()
+        with self.captureOnCommitCallbacks() as callbacks:
+            question.text = "Edited"
+            question.save()
+            self.assertEqual(get_content_version(self.quiz.id), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_content_version(self.quiz.id), version)
+        self.assertEqual(get_question_bank(self.quiz.id).questions_by_id[question.id].text, "Edited")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Answer.objects.filter(question=question, is_correct=False).first().delete()
+        self.assertEqual(len(get_question_bank(self.quiz.id).questions_by_id[question.id].answers), 3)
+
+    @override_settings(QUIZ_QUESTION_BANK_LOCAL_CACHE_SIZE=1)
+    def test_local_cache_size(self):
+        other = create_quiz("Other", category=self.quiz.category, questions=2)
+        get_question_bank(self.quiz.id)
+        get_question_bank(other.id)
+        self.assertIsNone(local_banks.get((self.quiz.id, get_content_version(self.quiz.id))))
+        self.assertIsNotNone(local_banks.get((other.id, get_content_version(other.id))))
+
+
+class ResultViewModelTests(QuizTestCase):
+    def test_question_results(self):
+        questions = self.quiz.get_questions()
+        msmc = next(question for question in questions if question.question_type == "MSMC")
+        selected = [answer.id for answer in msmc.get_answers()[1:3]]
+        results = build_question_results([msmc], selected)
+        self.assertEqual(
+            results,
+            [
+                {
+                    "text": msmc.text,
+                    "input_type": "checkbox",
+                    "answers": [
+                        {"text": "Answer 0", "is_selected": False, "is_correct": True},
+                        {"text": "Answer 1", "is_selected": True, "is_correct": True},
+                        {"text": "Answer 2", "is_selected": True, "is_correct": False},
+                        {"text": "Answer 3", "is_selected": False, "is_correct": False},
+                    ],
+                    "correct_answers": ["Answer 0", "Answer 1"],
+                }
+            ],
+        )
+
+    def test_result_page(self):
+        self.client.force_login(self.user)
+        attempt, questions = self.start_attempt()
+        response = self.submit(attempt, questions, correct=False)
+        self.assertEqual(len(response.context["question_results"]), 6)
+        # one wrong answer to each of the 4 single choice questions and two to each of the 2 others,
+        # every one followed by the correct answers of its question
+        self.assertContains(response, "checked disabled", count=8)
+        self.assertContains(response, ">Incorrect<", count=8)
+        self.assertContains(response, "Correct answer: Answer 0", count=8)
+        self.assertContains(response, "Correct answer: Answer 1", count=4)
+
+
+class FakeDataTests(TestCase):
+    def generate(self, **options):
+        stdout = StringIO()
+        options = {"quizzes": 3, "questions_per_quiz": 3, "users": 4, "results": 20, "days": 30, "seed": 1, **options}
+        call_command("generate_fake_data", stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_generate(self):
+        output = self.generate()
+        self.assertIn("10 categories, 4 users, 3 quizzes, 9 questions, 36 answers, 20 results", output)
+        self.assertEqual(Result.objects.count(), 20)
+        self.assertEqual(
+            UserQuizSummary.objects.count(), Result.objects.values("user", "quiz").distinct().count()
+        )
+        self.assertEqual(reconcile_category_counters(), [])
+
+    def test_results_spread_over_the_days(self):
+        started = timezone.now()
+        self.generate()
+        dates = list(Result.objects.values_list("submitted_date", flat=True))
+        self.assertGreater(len(set(dates)), 1)
+        finished = timezone.now()
+        self.assertTrue(all(started - timedelta(days=30) <= date <= finished for date in dates))
+
+    def test_rerun_reports_only_new_users(self):
+        self.generate()
+        self.assertIn("0 users", self.generate(results=0))
+        self.assertEqual(User.objects.count(), 4)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1)
+class ProfilingTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        request_histograms._windows.clear()
+
+    def test_server_timing_for_staff(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("quiz:quiz_list"))
+        db, template, total = response["Server-Timing"].split(", ")
+        self.assertRegex(db, r'^db;dur=[\d.]+;desc="[1-9]\d* queries"$')
+        self.assertRegex(template, r"^tpl;dur=[\d.]+$")
+        self.assertRegex(total, r"^total;dur=[\d.]+$")
+
+        stats = self.client.get(reverse("request_stats")).json()
+        self.assertEqual(stats["views"]["quiz:quiz_list"]["count"], 1)
+        self.assertGreater(stats["views"]["quiz:quiz_list"]["mean_queries"], 0)
+
+    def test_hidden_from_other_users(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("quiz:quiz_list"))
+        self.assertFalse(response.has_header("Server-Timing"))
+        self.assertEqual(request_histograms.snapshot()["quiz:quiz_list"]["count"], 1)
+        self.assertEqual(self.client.get(reverse("request_stats")).status_code, 302)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse("quiz:quiz_list"))
+        self.assertFalse(response.has_header("Server-Timing"))
+        self.assertEqual(request_histograms.snapshot(), {})
+
+    @override_settings(PROFILING_SLOW_REQUEST_MS=0)
+    def test_slow_request_logged(self):
+        with self.assertLogs("config.profiling", "WARNING") as logs:
+            self.client.get(reverse("quiz:quiz_list"))
+        self.assertIn("Slow request GET / (quiz:quiz_list)", logs.output[0])
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for duration_ms in (0.5, 3, 3, 40, 7000):
+            histogram.add(duration_ms, queries=2)
+        self.assertEqual(
+            histogram.as_dict(),
+            {
+                "count": 5,
+                "mean_ms": 1409.3,
+                "p50_ms": 5,
+                "p90_ms": 7000,
+                "p99_ms": 7000,
+                "max_ms": 7000,
+                "mean_queries": 2,
+            },
+        )
+
+
+class QuestionBankIOTests(QuizTestCase):
+    def record(self, question="New question", **fields):
+        return {
+            "category": "Science",
+            "quiz": "Physics basics",
+            "number_of_questions": 6,
+            "duration_in_minutes": 10,
+            "pass_percentage": 50,
+            "difficulty_level": "MEDIUM",
+            "question": question,
+            "question_type": "MC",
+            "answers": [{"text": "Yes", "is_correct": True}, {"text": "No", "is_correct": False}],
+            **fields,
+        }
+
+    def import_records(self, records, **options):
+        importer = QuestionBankImporter(**options)
+        with self.captureOnCommitCallbacks(execute=True):
+            importer.run(enumerate(records, start=1))
+        return importer
+
+    def test_round_trip(self):
+        answer_key = get_answer_key(self.quiz.id)
+        for format in FORMATS:
+            with self.subTest(format=format):
+                lines = "".join(export_lines(export_records(Quiz.objects.all()), format))
+                with self.captureOnCommitCallbacks(execute=True):
+                    Quiz.objects.all().delete()
+                importer = QuestionBankImporter()
+                with self.captureOnCommitCallbacks(execute=True):
+                    stats = importer.run(read_records(StringIO(lines), format))
+                self.assertEqual(importer.errors, [])
+                self.assertEqual(
+                    (stats["quizzes"], stats["questions"], stats["answers"], stats["skipped"]), (1, 6, 24, 0)
+                )
+                quiz = Quiz.objects.get(name="Physics basics")
+                imported_key = get_answer_key(quiz.id)
+                self.assertEqual(
+                    sorted((question_type, len(correct)) for question_type, correct in imported_key.values()),
+                    sorted((question_type, len(correct)) for question_type, correct in answer_key.values()),
+                )
+                response = self.client.get(reverse("quiz:quiz_list"), {"q": "question"})
+                self.assertEqual(list(response.context["quizzes"]), [quiz])
+
+    def test_rerun_skips_existing_questions(self):
+        stats = self.import_records([self.record("Question 0"), self.record()]).stats
+        self.assertEqual((stats["questions"], stats["skipped"]), (1, 1))
+        self.quiz.category.refresh_from_db()
+        self.assertEqual(self.quiz.category.question_count, 7)
+        self.assertEqual(len(get_question_bank(self.quiz.id).questions), 7)
+
+    def test_is_correct(self):
+        answers = [{"text": "Yes", "is_correct": "TRUE"}, {"text": "No", "is_correct": "false"}]
+        self.import_records([self.record(answers=answers)])
+        question = Question.objects.get(text="New question")
+        self.assertEqual(list(question.answers.order_by("id").values_list("is_correct", flat=True)), [True, False])
+
+        invalid = [
+            [{"text": "Yes", "is_correct": True}, {"text": "No", "is_correct": "no"}],
+            [{"text": "Yes", "is_correct": 1}],
+            [{"text": "Yes"}],
+            [{"text": "Yes", "is_correct": False}],
+        ]
+        importer = self.import_records(
+            [self.record(f"Invalid {number}", answers=answers) for number, answers in enumerate(invalid)]
+        )
+        self.assertEqual([number for number, _ in importer.errors], [1, 2, 3, 4])
+        self.assertFalse(Question.objects.filter(text__startswith="Invalid").exists())
+
+    def test_existing_quiz_settings(self):
+        importer = self.import_records([self.record(number_of_questions="4", pass_percentage=60)])
+        self.assertEqual(
+            importer.warnings,
+            ["Quiz 'Physics basics' of 'Science' keeps its settings: number_of_questions 6 (file: 4), "
+             "pass_percentage 50 (file: 60)."],
+        )
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.number_of_questions, 6)
+
+        importer = self.import_records([self.record("Other question", number_of_questions=4)], update_quizzes=True)
+        self.assertEqual((importer.stats["updated"], importer.warnings), (1, []))
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.number_of_questions, 4)
+
+        # EASY quizzes pass at 60% at most
+        record = self.record("Third question", difficulty_level="EASY", pass_percentage=80)
+        importer = self.import_records([record], update_quizzes=True)
+        self.assertEqual(len(importer.errors), 1)
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.difficulty_level, "MEDIUM")
+
+    def test_import_command(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as file:
+            file.write(json.dumps(self.record(number_of_questions=4)) + "\n{oops\n")
+        self.addCleanup(Path(file.name).unlink)
+        stdout, stderr = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_questions", file.name, stdout=stdout, stderr=stderr)
+        self.assertIn("Imported 0 quizzes, 1 questions and 2 answers (0 existing quizzes updated", stdout.getvalue())
+        self.assertIn("Line 2: Invalid JSON", stderr.getvalue())
+        self.assertIn("keeps its settings: number_of_questions 6 (file: 4)", stderr.getvalue())
+
+
+class ResultExportTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = create_quiz("World history", category=Category.objects.create(name="History"), questions=2)
+        self.results = []
+        for day, quiz in ((1, self.quiz), (2, self.other), (3, self.quiz)):
+            result = Result.objects.create(quiz=quiz, user=self.user, score=day * 10)
+            submitted_date = timezone.make_aware(datetime(2024, 5, day, 23, 30))
+            Result.objects.filter(pk=result.pk).update(submitted_date=submitted_date)
+            self.results.append(result.id)
+
+    def export(self, format="jsonl", **filters):
+        lines = export_result_lines(export_result_records(filter_results(**filters)), format)
+        return b"".join(encode_chunks(lines)).decode()
+
+    def test_filters(self):
+        ids = lambda **filters: [json.loads(line)["id"] for line in self.export(**filters).splitlines()]  # noqa: E731
+        self.assertEqual(ids(), self.results)
+        self.assertEqual(ids(quiz_ids=[self.quiz.id]), [self.results[0], self.results[2]])
+        self.assertEqual(ids(category_ids=[self.other.category_id]), [self.results[1]])
+        self.assertEqual(ids(since=date(2024, 5, 2), until=date(2024, 5, 2)), [self.results[1]])
+        self.assertEqual(ids(after_id=self.results[0]), self.results[1:])
+
+    def test_formats(self):
+        rows = list(csv.reader(StringIO(self.export("csv"))))
+        self.assertEqual(rows[0], list(RESULT_COLUMNS))
+        self.assertEqual(
+            rows[1][1:7], [str(self.quiz.id), "Physics basics", "Science", str(self.user.id), "student", "10.0"]
+        )
+        record = json.loads(self.export().splitlines()[1])
+        self.assertEqual((record["quiz"], record["category"], record["score"]), ("World history", "History", 20.0))
+        self.assertEqual(datetime.fromisoformat(record["submitted_date"]).day, 2)
+
+    def test_gzip_chunks(self):
+        lines = list(export_result_lines(export_result_records(filter_results()), "csv"))
+        with mock.patch("quiz.result_export.BUFFER_SIZE", 100):
+            chunks = list(encode_chunks(lines))
+            compressed = b"".join(encode_chunks(lines, compress=True))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(compressed), "".join(lines).encode())
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "results.jsonl.gz"
+            stderr = StringIO()
+            call_command(
+                "export_results", format="jsonl", after_id=self.results[0], gzip=True, output=str(output), stderr=stderr
+            )
+            lines = gzip.decompress(output.read_bytes()).decode().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], self.results[1:])
+        self.assertIn(f"Exported 2 results, last id {self.results[2]}.", stderr.getvalue())
+
+    def test_admin_export(self):
+        url = reverse("admin:quiz_result_export")
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url, {"format": "csv"}).status_code, 302)
+
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="secret")
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url, {"format": "csv", "quiz": self.other.id})
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="results.csv"')
+        self.assertEqual(len(b"".join(response.streaming_content).decode().splitlines()), 2)
+        response = self.client.get(url, {"format": "jsonl", "compress": "on"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertEqual(len(gzip.decompress(b"".join(response.streaming_content)).splitlines()), 3)
+
+
+class AsyncViewTests(QuizTestCase):
+    """Calls the async views directly; the whole suite runs through them with ``QUIZ_ASYNC_VIEWS=1``."""
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+
+    async def call(self, view, request, user=None, **kwargs):
+        request.user = user or AnonymousUser()
+        response = await view.as_view()(request, **kwargs)
+        if hasattr(response, "render"):
+            # the template may still evaluate querysets
+            await sync_to_async(response.render)()
+        return response
+
+    async def test_quiz_list(self):
+        response = await self.call(async_views.QuizListView, self.factory.get("/", {"q": "physics"}))
+        self.assertEqual([quiz.id for quiz in response.context_data["quizzes"]], [self.quiz.id])
+        response = await self.call(async_views.CategoryListView, self.factory.get("/categories/"))
+        self.assertContains(response, "Science")
+
+    async def test_attempt(self):
+        url = self.quiz.get_assessment_attempt_url()
+        response = await self.call(async_views.QuizView, self.factory.get(url), pk=self.quiz.id)
+        self.assertEqual(response.status_code, 302)
+
+        response = await self.call(async_views.QuizView, self.factory.get(url), user=self.user, pk=self.quiz.id)
+        attempt, questions = response.context_data["attempt"], response.context_data["questions"]
+        self.assertEqual(await Attempt.objects.filter(user=self.user).acount(), 1)
+
+        request = self.factory.post(url, {"attempt": str(attempt.id), **answer(questions)})
+        response = await self.call(async_views.QuizView, request, user=self.user, pk=self.quiz.id)
+        self.assertEqual(response.context_data["score_percentage"], 100)
+        result = await Result.objects.aget(attempt=attempt)
+        self.assertEqual(result.score, 100)
+
+        request = self.factory.post(url, {"attempt": str(attempt.id), **answer(questions, correct=False)})
+        response = await self.call(async_views.QuizView, request, user=self.user, pk=self.quiz.id)
+        self.assertEqual(response["Location"], attempt.get_result_url())
+        self.assertEqual(await Result.objects.acount(), 1)
+
+    async def test_assessment_result(self):
+        await sync_to_async(self.quiz.save_result)(self.user, 80)
+        url = self.quiz.get_assessment_url()
+        view = async_views.QuizAssessmentResultView
+        response = await self.call(view, self.factory.get(url), user=self.user, pk=self.quiz.id)
+        self.assertEqual(response.context_data["quiz"], self.quiz)
+        self.assertEqual((response.context_data["quiz_score"], response.context_data["passed"]), (80, True))
+
+
+class ItemAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz = create_quiz(questions=2)
+        self.questions = list(get_question_bank(self.quiz.id).questions)
+        # which of the two questions each user answers correctly
+        self.patterns = [(True, True), (True, False), (False, False), (False, True)]
+        for number, pattern in enumerate(self.patterns):
+            user = User.objects.create_user(username=f"student{number}", email=f"student{number}@example.com")
+            data = {}
+            for question, correct in zip(self.questions, pattern):
+                data.update(answer([question], correct))
+            score_percentage = self.quiz.calculate_score(data)[1]
+            self.quiz.save_result(user, score_percentage, answers=data)
+
+    def assertStats(self):
+        scores = [50 * sum(pattern) for pattern in self.patterns]
+        stats = with_metrics(QuestionStats.objects.order_by("question_id"))
+        for index, (question, stat) in enumerate(zip(self.questions, stats)):
+            correct = [int(pattern[index]) for pattern in self.patterns]
+            self.assertEqual(stat.question_id, question.id)
+            self.assertEqual((stat.times_shown, stat.times_correct), (4, 2))
+            self.assertAlmostEqual(stat.difficulty, 0.5)
+            self.assertAlmostEqual(stat.discrimination, statistics.correlation(correct, scores))
+
+        msmc = self.questions[0]
+        times_selected = dict(AnswerStats.objects.values_list("answer_id", "times_selected"))
+        # both correct answers twice, both wrong ones twice
+        self.assertEqual([times_selected.get(answer.id) for answer in msmc.answers], [2, 2, 2, 2])
+
+    def test_stats(self):
+        self.assertEqual(QuestionResponse.objects.count(), 8)
+        self.assertStats()
+
+    def test_recompute(self):
+        QuestionStats.objects.update(times_shown=0, times_correct=0, score_sum=0)
+        AnswerStats.objects.all().delete()
+        call_command("recompute_item_stats", stdout=StringIO())
+        self.assertStats()
+
+    def test_undefined_discrimination(self):
+        QuestionStats.objects.update(times_correct=F("times_shown"))
+        self.assertIsNone(with_metrics(QuestionStats.objects.all()).first().discrimination)
+
+
+class LeaderboardTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = create_quiz("Chemistry", category=self.quiz.category, questions=2)
+        self.users = [self.user] + [
+            User.objects.create_user(username=f"student{number}", email=f"student{number}@example.com")
+            for number in range(1, 4)
+        ]
+
+    def save_results(self, quiz, *scores):
+        for user, score in zip(self.users, scores):
+            if score is not None:
+                with self.captureOnCommitCallbacks(execute=True):
+                    quiz.save_result(user, score)
+
+    def top(self, board):
+        return [(entry["rank"], entry["username"], entry["score"]) for entry in get_top(board)]
+
+    def test_quiz_board(self):
+        board = quiz_board(self.quiz.id)
+        self.save_results(self.quiz, 70, 90, None, 90)
+        self.assertEqual(self.top(board), [(1, "student1", 90), (1, "student3", 90), (3, "student", 70)])
+        self.assertEqual([get_rank(board, score) for score in (100, 90, 80, 70, 0)], [1, 1, 3, 3, 4])
+
+        # ties stay in the order they were reached, whoever scores them again
+        self.save_results(self.quiz, 60, None, 100, 90)
+        self.assertEqual(
+            self.top(board), [(1, "student2", 100), (2, "student1", 90), (2, "student3", 90), (4, "student", 70)]
+        )
+
+    def test_global_board(self):
+        self.save_results(self.quiz, 70, 90, 40)
+        self.save_results(self.other, 50, None, 60)
+        self.assertEqual(self.top(GLOBAL_BOARD), [(1, "student", 120), (2, "student2", 100), (3, "student1", 90)])
+        self.assertEqual(get_rank(GLOBAL_BOARD, 100), 2)
+        self.assertEqual(UserScore.objects.get(user=self.user).quizzes_taken, 2)
+
+    def test_rebuild(self):
+        self.save_results(self.quiz, 70, 90, 40, 90)
+        self.save_results(self.other, 50, None, 60)
+        buckets = set(LeaderboardBucket.objects.filter(count__gt=0).values_list("board", "bucket", "count"))
+        scores = set(UserScore.objects.values_list("user_id", "total_score", "quizzes_taken", "quizzes_passed"))
+        rebuild_leaderboards()
+        self.assertEqual(set(LeaderboardBucket.objects.values_list("board", "bucket", "count")), buckets)
+        self.assertEqual(
+            set(UserScore.objects.values_list("user_id", "total_score", "quizzes_taken", "quizzes_passed")), scores
+        )
+
+    def test_views(self):
+        self.save_results(self.quiz, 70, 90)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("quiz:quiz_leaderboard", args=[self.quiz.id]))
+        self.assertEqual((response.context["user_score"], response.context["user_rank"]), (70, 2))
+        self.assertEqual(len(response.context["entries"]), 2)
+        response = self.client.get(reverse("quiz:leaderboard"))
+        self.assertEqual((response.context["user_score"], response.context["user_rank"]), (70, 2))
+
+
+class ProgressTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = create_quiz("World history", category=Category.objects.create(name="History"), questions=2)
+        self.client.force_login(self.user)
+
+    def save_results(self, *results):
+        for quiz, score in results:
+            with self.captureOnCommitCallbacks(execute=True):
+                quiz.save_result(self.user, score)
+
+    def test_progress(self):
+        self.save_results((self.quiz, 40), (self.quiz, 80), (self.other, 30))
+        response = self.client.get(reverse("quiz:progress"))
+        summaries = response.context["summaries"]
+        self.assertEqual(
+            [(summary.quiz, summary.best_score, summary.attempt_count) for summary in summaries],
+            [(self.other, 30, 1), (self.quiz, 80, 2)],
+        )
+        self.assertEqual(
+            [response.context[name] for name in ("quizzes_taken", "quizzes_passed", "attempt_count")], [2, 1, 3]
+        )
+        self.assertEqual(
+            [(summary.category.name, summary.average_best_score) for summary in response.context["category_summaries"]],
+            [("History", 30), ("Science", 80)],
+        )
+        self.assertEqual(len(response.context["recent_results"]), 3)
+
+    def test_queries_do_not_grow_with_the_results(self):
+        self.save_results((self.quiz, 40))
+        # the session and the user may be cached by the first request
+        self.client.get(reverse("quiz:progress"))
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse("quiz:progress"))
+        self.save_results(*[(self.quiz, score) for score in range(20)], (self.other, 50))
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse("quiz:progress"))
+        self.assertEqual(len(many), len(few))
+
+    def test_backfill(self):
+        self.save_results((self.quiz, 40), (self.quiz, 80), (self.other, 30))
+        fields = ("user_id", "quiz_id", "best_score", "last_score", "attempt_count", "passed", "best_score_at")
+        summaries = set(UserQuizSummary.objects.values_list(*fields))
+        UserQuizSummary.objects.all().delete()
+        UserCategorySummary.objects.all().delete()
+        call_command("backfill_quiz_summaries", stdout=StringIO())
+        self.assertEqual(set(UserQuizSummary.objects.values_list(*fields)), summaries)
+        self.assertEqual(UserCategorySummary.objects.get(category=self.quiz.category).attempt_count, 2)
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("quiz:progress")).status_code, 302)
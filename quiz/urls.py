@@ -1,12 +1,18 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import api, async_views, views
+
+if getattr(settings, "QUIZ_ASYNC_VIEWS", False):
+    views = async_views
 
 app_name = "quiz"
 urlpatterns = [
     path("", views.QuizListView.as_view(), name="quiz_list"),
     path('popular/', views.QuizListView.as_view(), {"popular": True}, name="quiz_list_by_popularity"),
     path("categories/", views.CategoryListView.as_view(), name="category_list"),
+    path("leaderboard/", views.LeaderboardView.as_view(), name="leaderboard"),
+    path("progress/", views.ProgressView.as_view(), name="progress"),
     path(
         "category/<int:category_id>/",
         views.QuizListView.as_view(),
@@ -22,4 +28,20 @@ urlpatterns = [
         views.QuizView.as_view(),
         name="quiz_assessment_attempt",
     ),
+    path(
+        "<int:pk>/assessment/result/<uuid:attempt_id>/",
+        views.QuizAttemptResultView.as_view(),
+        name="quiz_attempt_result",
+    ),
+    path(
+        "<int:pk>/leaderboard/",
+        views.QuizLeaderboardView.as_view(),
+        name="quiz_leaderboard",
+    ),
+    path("api/token/", api.TokenView.as_view(), name="api_token"),
+    path("api/quizzes/", api.QuizListView.as_view(), name="api_quiz_list"),
+    path("api/quizzes/<int:pk>/", api.QuizDetailView.as_view(), name="api_quiz_detail"),
+    path("api/quizzes/<int:pk>/attempts/", api.AttemptStartView.as_view(), name="api_attempt_start"),
+    path("api/quizzes/<int:pk>/attempts/<uuid:attempt_id>/", api.AttemptView.as_view(), name="api_attempt"),
+    path("api/quizzes/<int:pk>/results/", api.QuizResultsView.as_view(), name="api_quiz_results"),
 ]
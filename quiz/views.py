@@ -1,29 +1,83 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Max
-from django.http import HttpResponseForbidden
-from django.shortcuts import render
-from django.views.generic.base import View
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404, HttpResponseForbidden
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.generic.base import TemplateView, View
 from django.views.generic.detail import DetailView, SingleObjectMixin
 from django.views.generic.edit import FormView
 from django.views.generic.list import ListView
 
 from django_filters.views import FilterView
 
+from .category_counters import get_category_list
+from .conditional import (
+    ConditionalGetMixin,
+    get_catalogue_modified,
+    get_popularity_modified,
+    get_summary_version,
+    make_etag,
+)
 from .filters import QuizFilter
 from .forms import QuizForm, QuizSearchForm
-from .models import Category, Quiz, Result
+from .grading import build_question_results
+from .leaderboards import GLOBAL_BOARD, get_rank, get_top, quiz_board
+from .models import (
+    Attempt,
+    Category,
+    GradingJob,
+    Quiz,
+    Result,
+    UserCategorySummary,
+    UserQuizSummary,
+    UserScore,
+)
+from .pagination import CachedCountPaginator, CursorPaginator, InvalidCursor, ProgressPaginator
+from .question_bank import get_content_version
 
 User = get_user_model()
 
 
-class CategoryListView(ListView):
+def paginate_by_cursor(request, paginator):
+    """Read the page of the ``cursor`` query parameter, in the ``paginate_queryset`` format of list views."""
+
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        raise Http404("Invalid cursor.")
+
+    params = request.GET.copy()
+    params.pop("page", None)
+    for name in ("next", "previous"):
+        cursor = getattr(page, f"{name}_cursor")
+        if cursor is not None:
+            params["cursor"] = cursor
+            setattr(page, f"{name}_querystring", params.urlencode())
+    return paginator, page, page.object_list, page.has_other_pages()
+
+
+class CategoryListView(ConditionalGetMixin, ListView):
+    """Displays the categories with their counters, read with one query or from the cache."""
+
     model = Category
     context_object_name = "categories"
     template_name = "quiz/category_list.html"
 
+    def get_validators(self):
+        self.categories = get_category_list()
+        modified = get_catalogue_modified()
+        # attempts do not stamp the catalogue, their counts refresh with the cached list
+        attempts = [category.attempt_count for category in self.categories]
+        user_id = self.request.user.pk or 0
+        return make_etag("categories", modified, attempts, user_id), int(modified)
 
-class QuizListView(FilterView):
+    def get_queryset(self):
+        return self.categories
+
+
+class QuizListView(ConditionalGetMixin, FilterView):
     """
     Display a list of quizzes.
     Optionally can be filtered by search query, difficulty level or category.
@@ -36,23 +90,25 @@ class QuizListView(FilterView):
     template_name = "quiz/index.html"
 
     def get_queryset(self):
-        queryset = Quiz.objects.all().select_related("category")
+        # validated by stamps set on the primary, so never rendered from a lagging replica
+        queryset = Quiz.objects.using(DEFAULT_DB_ALIAS).select_related("category")
         if "popular" in self.kwargs:
-            queryset = queryset.order_by("-popularity")
+            self.list_ordering = "-popularity"
         else:
-            queryset = queryset.order_by("id")
+            self.list_ordering = "id"
+
+        # filter quiz based on search params, best matches first
+        self.search_form = QuizSearchForm(self.request.GET)
+        if self.search_form.is_valid() and self.search_form.cleaned_data["q"]:
+            queryset = self.search_form.search(queryset)
+            if "popular" not in self.kwargs:
+                self.list_ordering = "search_rank"
 
         # sort quiz by name
         order = self.request.GET.get("o")  
-        if order == "name": # ascending order
-            queryset = queryset.order_by("name")
-        elif order == "-name":  # descending order
-            queryset = queryset.order_by("-name")
-
-        # filter quiz based on search params
-        query = self.request.GET.get("q")
-        if query:
-            queryset = queryset.filter(name__icontains=query)
+        if order in ("name", "-name"):  # ascending or descending order
+            self.list_ordering = order
+        queryset = queryset.order_by(self.list_ordering, "id")
 
         # filter quiz based on category
         category_id = self.kwargs.get("category_id")
@@ -61,19 +117,46 @@ class QuizListView(FilterView):
 
         return queryset
 
+    def get_validators(self):
+        modified = get_catalogue_modified(self.kwargs.get("category_id"))
+        if "popular" in self.kwargs:
+            modified = max(modified, get_popularity_modified())
+        etag = make_etag("quizzes", modified, self.request.get_full_path(), self.request.user.pk or 0)
+        return etag, int(modified)
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        if getattr(settings, "QUIZ_LIST_ESTIMATE_COUNT", False):
+            return CachedCountPaginator(queryset, per_page, **kwargs)
+        return super().get_paginator(queryset, per_page, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Paginate with cursors when ``QUIZ_LIST_PAGINATION`` is ``"cursor"`` and the
+        ordering supports it, and with page numbers otherwise.
+        """
+
+        if not self.uses_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        return paginate_by_cursor(self.request, CursorPaginator(queryset, page_size, self.list_ordering))
+
+    def uses_cursor_pagination(self):
+        use_cursor = getattr(settings, "QUIZ_LIST_PAGINATION", "offset") == "cursor"
+        return use_cursor and self.list_ordering in CursorPaginator.orderings
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         current_order = self.request.GET.get("o")
         context["toggle_order"] = "-name" if current_order == "name" else "name"
         context["popular"] = "popular" in self.kwargs
-        context["search_form"] = QuizSearchForm()
+        context["search_form"] = self.search_form
         return context
 
 
-class QuizAssessmentResultView(DetailView):
+class QuizAssessmentResultView(ConditionalGetMixin, DetailView):
     """Display quiz detail and user's result."""
     
-    model = Quiz
+    # validated by the content version, bumped on the primary
+    queryset = Quiz.objects.using(DEFAULT_DB_ALIAS)
     context_object_name = "quiz"
     template_name = "quiz/quiz_assessment.html"
 
@@ -82,14 +165,22 @@ class QuizAssessmentResultView(DetailView):
         quiz = self.object
         user = self.request.user
         if user.is_authenticated:
-            result = Result.objects.filter(quiz=quiz, user=user).select_related("user")
-            highest_score = result.aggregate(highest_score=Max("score", default=0))
-            quiz_score = highest_score["highest_score"] if result else 0
-            context["result"] = result
+            summary = self.get_summary()
+            quiz_score = summary.best_score if summary else 0
+            context["summary"] = summary
             context["quiz_score"] = quiz_score
             context['passed'] = quiz_score >= quiz.pass_percentage
         return context
 
+    def get_summary(self):
+        return UserQuizSummary.objects.filter(quiz=self.object, user=self.request.user).first()
+
+    def get_validators(self):
+        quiz_id = self.kwargs["pk"]
+        user_id = self.request.user.pk
+        summary_version = get_summary_version(user_id, quiz_id) if user_id else ""
+        return make_etag("assessment", quiz_id, get_content_version(quiz_id), user_id or 0, summary_version), None
+
 
 class QuizAssessmentAttemptView(DetailView):
     """Displays a quiz attempt form to the user."""
@@ -100,13 +191,30 @@ class QuizAssessmentAttemptView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        quiz = self.object
-        questions = quiz.get_questions()
+        questions, attempt = self.start_attempt()
+        context["attempt"] = attempt
         context["form"] = QuizForm(questions=questions)
         context["questions"] = questions
         context["total_questions"] = len(questions)
         return context
 
+    def start_attempt(self):
+        """Draw the questions of a new attempt and record it."""
+        quiz = self.object
+        questions = quiz.get_questions()
+        return questions, quiz.start_attempt(user=self.request.user, questions=questions)
+
+
+def get_result_context(quiz, questions, score, score_percentage, passed, submitted_answers_ids):
+    return {
+        "quiz": quiz,
+        "question_results": build_question_results(questions, submitted_answers_ids),
+        "score_percentage": score_percentage,
+        "total_questions": len(questions),
+        "score": score,
+        "passed": passed,
+    }
+
 
 class QuizAssessmentSubmissionFormView(SingleObjectMixin, FormView):
     """Handles the submission of a quiz attempt."""
@@ -119,50 +227,198 @@ class QuizAssessmentSubmissionFormView(SingleObjectMixin, FormView):
         if not request.user.is_authenticated:
             return HttpResponseForbidden()
         self.object = self.get_object()
+        try:
+            self.attempt = Attempt.objects.get(pk=request.POST.get("attempt"), quiz=self.object, user=request.user)
+        except (Attempt.DoesNotExist, ValidationError):
+            # unknown or tampered attempt, start over with a new one
+            return redirect(self.object.get_assessment_attempt_url())
+        if self.attempt.submitted_at is not None:
+            # a replayed submission, show the result saved the first time
+            return redirect(self.attempt.get_result_url())
+        self.questions = self.attempt.get_questions()
         return super().post(request, *args, **kwargs)
-    
+
     def form_valid(self, form):
         """
         Validate the form data and calculate the quiz score.
         """
 
-        quiz = self.get_object()
-        questions = quiz.get_questions()
-        score, score_percentage, passed, submitted_answers_ids = quiz.calculate_score(form.cleaned_data)
-        
+        quiz = self.object
+        if getattr(settings, "QUIZ_GRADING_QUEUE", False):
+            # acknowledge right away, a grade_submissions worker grades and saves the result
+            GradingJob.enqueue(self.attempt, form.cleaned_data)
+            return redirect(self.attempt.get_result_url())
+
+        score, score_percentage, passed, submitted_answers_ids = quiz.calculate_score(
+            form.cleaned_data, attempt=self.attempt
+        )
+
+        # Log/save the result, once per attempt
+        result = quiz.save_result(
+            user=self.request.user, score=score_percentage, answers=form.cleaned_data, attempt=self.attempt
+        )
+        if result is None:
+            return redirect(self.attempt.get_result_url())
+
         # Increment popularity counter after successful submission
         quiz.increment_popularity()
 
-        # Log/save the result
-        quiz.save_result(user=self.request.user, score=score_percentage)
-
-        context = {
-            "quiz": quiz,
-            "questions": questions,
-            "score_percentage": score_percentage,
-            "total_questions": len(questions),
-            "score": score,
-            "passed": passed,
-            "submitted_answers_ids": submitted_answers_ids,
-        }
+        context = self.get_result_context(score, score_percentage, passed, submitted_answers_ids)
         return render(self.request, "quiz/quiz_result.html", context)
+
+    def get_result_context(self, score, score_percentage, passed, submitted_answers_ids):
+        return get_result_context(self.object, self.questions, score, score_percentage, passed, submitted_answers_ids)
     
     def get_form_kwargs(self):
         """
         Get keyword arguments for the form initialization.
-        Fetch the quiz object and pass its questions as keyword argument to the form.
+        Pass the questions drawn for the attempt as keyword argument to the form.
         """
 
         kwargs = super().get_form_kwargs()
-        quiz = self.get_object()
-        kwargs["questions"] = quiz.get_questions()
+        kwargs["questions"] = self.questions
         return kwargs
-     
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["attempt"] = self.attempt
+        context["total_questions"] = len(self.questions)
+        return context
+
     def get_success_url(self):
         quiz = self.object
         return quiz.get_assessment_attempt_url()
 
 
+class QuizAttemptResultView(LoginRequiredMixin, DetailView):
+    """
+    Displays the result of a submitted attempt, or waits for a worker to grade a queued one.
+    """
+
+    context_object_name = "attempt"
+
+    def get_object(self, queryset=None):
+        attempt = get_object_or_404(
+            Attempt.objects.select_related("quiz", "grading_job", "result"),
+            pk=self.kwargs["attempt_id"],
+            quiz_id=self.kwargs["pk"],
+            user=self.request.user,
+        )
+        self.job = getattr(attempt, "grading_job", None)
+        self.result = getattr(attempt, "result", None)
+        if self.result is None and self.job is None:
+            raise Http404("The attempt was not submitted.")
+        return attempt
+
+    def get_template_names(self):
+        if self.job is None or self.job.status == GradingJob.Status.DONE:
+            return ["quiz/quiz_result.html"]
+        return ["quiz/quiz_result_pending.html"]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        attempt = self.object
+        context["job"] = self.job
+        if self.job is not None:
+            if self.job.status == GradingJob.Status.DONE:
+                context.update(
+                    get_result_context(
+                        attempt.quiz,
+                        attempt.get_questions(),
+                        self.job.score,
+                        self.job.score_percentage,
+                        self.job.passed,
+                        self.job.submitted_answers_ids,
+                    )
+                )
+            return context
+
+        # graded in the request: the responses recorded with the result hold the answers
+        responses = list(self.result.responses.values_list("selected_answers_ids", "is_correct"))
+        context.update(
+            get_result_context(
+                attempt.quiz,
+                attempt.get_questions(),
+                sum(is_correct for _, is_correct in responses),
+                self.result.score,
+                self.result.score >= attempt.quiz.pass_percentage,
+                [answer_id for answer_ids, _ in responses for answer_id in answer_ids],
+            )
+        )
+        return context
+
+
+class QuizLeaderboardView(DetailView):
+    """Displays the best scores of a quiz and the rank of the current user."""
+
+    model = Quiz
+    context_object_name = "quiz"
+    template_name = "quiz/leaderboard.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        board = quiz_board(self.object.pk)
+        context["entries"] = get_top(board)
+        if self.request.user.is_authenticated:
+            summary = UserQuizSummary.objects.filter(quiz=self.object, user=self.request.user).first()
+            if summary:
+                context["user_score"] = summary.best_score
+                context["user_rank"] = get_rank(board, summary.best_score)
+        return context
+
+
+class LeaderboardView(TemplateView):
+    """Displays the users with the highest total of best scores over all quizzes."""
+
+    template_name = "quiz/leaderboard.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["entries"] = get_top(GLOBAL_BOARD)
+        if self.request.user.is_authenticated:
+            user_score = UserScore.objects.filter(user=self.request.user).first()
+            if user_score:
+                context["user_score"] = user_score.total_score
+                context["user_rank"] = get_rank(GLOBAL_BOARD, user_score.total_score)
+        return context
+
+
+class ProgressView(LoginRequiredMixin, ListView):
+    """
+    Displays the quizzes taken by the current user, last taken first, with the totals of
+    their categories. Reads only the summary tables, so it runs the same queries however
+    many results the user has.
+    """
+
+    context_object_name = "summaries"
+    paginate_by = 50
+    template_name = "quiz/progress.html"
+
+    def get_queryset(self):
+        return UserQuizSummary.objects.filter(user=self.request.user, last_attempt_at__isnull=False).select_related(
+            "quiz__category"
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        return paginate_by_cursor(self.request, ProgressPaginator(queryset, page_size, "-last_attempt_at"))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        category_summaries = list(
+            UserCategorySummary.objects.filter(user=self.request.user)
+            .select_related("category")
+            .order_by("category__name")
+        )
+        context["category_summaries"] = category_summaries
+        context["quizzes_taken"] = sum(summary.quizzes_taken for summary in category_summaries)
+        context["quizzes_passed"] = sum(summary.quizzes_passed for summary in category_summaries)
+        context["attempt_count"] = sum(summary.attempt_count for summary in category_summaries)
+        context["recent_results"] = Result.objects.filter(user=self.request.user).select_related("quiz").order_by(
+            "-submitted_date"
+        )[:10]
+        return context
+
+
 class QuizView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         view = QuizAssessmentAttemptView.as_view()